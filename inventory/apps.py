@@ -1,6 +1,20 @@
+import os
+
 from django.apps import AppConfig
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Lets `loadtest_webhooks --url` drive a live server without hitting Groq, Meta or Cloudinary.
+        if os.getenv("LOADTEST_STUBS") == "1":
+            from .loadtest import stubs
+            stubs.install(
+                llm=float(os.getenv("LOADTEST_LLM_LATENCY", 0.4)),
+                send=float(os.getenv("LOADTEST_SEND_LATENCY", 0.15)),
+                upload=float(os.getenv("LOADTEST_UPLOAD_LATENCY", 0.5)),
+            )
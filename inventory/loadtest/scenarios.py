@@ -0,0 +1,137 @@
+import itertools
+import json
+import time
+from urllib.parse import urlencode
+
+from inventory.models import Broker, Property
+from inventory.services.redis_setup import clear_session
+
+# Synthetic webhook traffic. Each scenario creates the rows it needs and
+# yields (endpoint, content_type, body) requests ready to replay.
+
+ENDPOINTS = {
+    "meta": "/api/whatsapp_webhook_meta",
+    "twilio": "/api/twilio/webhook",
+    "customer": "/api/twilio/customer_webhook",
+}
+
+BROKER_PHONE_BASE = 7000000000
+ONBOARDING_PHONE_BASE = 7100000000
+CLIENT_NUMBER = "+919812345678"
+
+DESCRIPTIONS = [
+    "2bhk semi furnished flat in Pune, Baner. Rent 25k, deposit 1L, 950 sqft, gym and pool",
+    "3 BHK fully furnished apartment in Mumbai Andheri West for rent 65k, 1400 sqft",
+    "1RK unfurnished studio in Pune Kothrud, 9k rent, 350 sqft",
+    "2 bhk for sale in Bangalore Whitefield 85 lakh, 1100 sqft, covered parking",
+]
+
+_msg_ids = itertools.count(1)
+
+
+def meta_payload(phone, text):
+    msg = {
+        "from": f"91{phone}",
+        "id": f"wamid.loadtest.{time.time_ns()}.{next(_msg_ids)}",
+        "timestamp": str(int(time.time())),
+        "type": "text",
+        "text": {"body": text},
+    }
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "loadtest", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "messages": [msg],
+        }}]}],
+    })
+
+
+def twilio_payload(phone, text, to=None):
+    return urlencode({"Body": text, "From": f"whatsapp:{phone}", "To": f"whatsapp:{to or ''}"})
+
+
+def build_request(endpoint, phone, text, to=None):
+    if endpoint == "meta":
+        return endpoint, "application/json", meta_payload(phone, text)
+    return endpoint, "application/x-www-form-urlencoded", twilio_payload(phone, text, to)
+
+
+def ensure_brokers(count, properties_each=0):
+    brokers = []
+    for i in range(count):
+        phone = str(BROKER_PHONE_BASE + i)
+        broker, _ = Broker.objects.get_or_create(phone_number=phone, defaults={"name": f"Load Broker {i}"})
+        clear_session(broker.id)
+        missing = properties_each - broker.properties.count()
+        for n in range(max(missing, 0)):
+            Property.objects.create(
+                broker=broker,
+                title=f"Loadtest Home {n}",
+                description_raw=DESCRIPTIONS[n % len(DESCRIPTIONS)],
+                city="Pune",
+                bhk=2,
+                price=20000 + n * 500,
+                status="active",
+            )
+        brokers.append(broker)
+    return brokers
+
+
+def onboarding(n, endpoint="meta"):
+    for i in range(n):
+        phone = str(ONBOARDING_PHONE_BASE + i)
+        Broker.objects.filter(phone_number=phone).delete()
+        clear_session(phone)
+    return [build_request(endpoint, str(ONBOARDING_PHONE_BASE + i), "hi") for i in range(n)]
+
+
+def new_property(n, endpoint="meta"):
+    # A fresh broker per message: an open new_property session would
+    # otherwise short-circuit the next description.
+    brokers = ensure_brokers(n)
+    return [
+        build_request(endpoint, b.phone_number, DESCRIPTIONS[i % len(DESCRIPTIONS)])
+        for i, b in enumerate(brokers)
+    ]
+
+
+def list_properties(n, endpoint="meta", brokers=20):
+    pool = ensure_brokers(brokers, properties_each=30)
+    requests = []
+    for i in range(n):
+        broker = pool[i % len(pool)]
+        if endpoint == "customer":
+            requests.append(build_request(endpoint, f"+9198{i % 100:08d}", "list", to=broker.phone_number))
+        else:
+            requests.append(build_request(endpoint, broker.phone_number, "list" if i % 3 else "list 2"))
+    return requests
+
+
+def share_all_to_client(n, endpoint="meta", brokers=20):
+    pool = ensure_brokers(brokers, properties_each=10)
+    return [
+        build_request(endpoint, pool[i % len(pool)].phone_number, f"share all 2bhk in Pune to {CLIENT_NUMBER}")
+        for i in range(n)
+    ]
+
+
+SCENARIOS = {
+    "onboarding": onboarding,
+    "new_property": new_property,
+    "list": list_properties,
+    "share_all_to_client": share_all_to_client,
+}
+
+
+def load_recorded(path, endpoint=None):
+    """Reads payloads captured with WEBHOOK_RECORD_DIR (one JSON object per line)."""
+    requests = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if endpoint and row["endpoint"] != endpoint:
+                continue
+            requests.append((row["endpoint"], row["content_type"], row["body"]))
+    return requests
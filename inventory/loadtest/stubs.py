@@ -0,0 +1,203 @@
+import itertools
+import re
+import threading
+import time
+from unittest import mock
+
+from inventory.services import registry
+
+# Deterministic local stand-ins for Groq, the Graph API and Cloudinary so
+# webhook throughput can be measured without external calls. Each stand-in
+# sleeps for a configurable latency to model the real dependency.
+
+LATENCY = {
+    "llm": 0.0,
+    "send": 0.0,
+    "upload": 0.0,
+}
+
+CALLS = {
+    "llm": 0,
+    "send": 0,
+    "upload": 0,
+}
+
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def _hit(kind):
+    with _lock:
+        CALLS[kind] += 1
+    if LATENCY[kind]:
+        time.sleep(LATENCY[kind])
+
+
+def reset_calls():
+    with _lock:
+        for kind in CALLS:
+            CALLS[kind] = 0
+
+
+_ID_COMMANDS = {
+    "view": "view_property",
+    "share": "share_property",
+    "edit": "edit_property",
+    "delete": "delete_property",
+    "activate": "activate_property",
+    "disable": "disable_property",
+}
+
+
+def fake_user_intent(user_msg):
+    from inventory.services.ai_intent import UserIntent
+
+    text = user_msg.strip().lower()
+    words = text.split()
+    first = words[0] if words else ""
+    if first in ("help", "profile", "editprofile", "boturl"):
+        return UserIntent(action=first)
+    if first == "list":
+        page = int(words[1]) if len(words) > 1 and words[1].isdigit() else 1
+        return UserIntent(action="list_properties", filters={"page": page})
+    if first == "share" and " to " in text:
+        client = re.search(r"to\s+(\+?\d+)", text)
+        city = re.search(r"in\s+([a-z]+)", text)
+        return UserIntent(
+            action="share_all_to_client",
+            client_number=client.group(1) if client else None,
+            filters={"city": city.group(1).title()} if city else {},
+        )
+    if first in _ID_COMMANDS:
+        return UserIntent(action=_ID_COMMANDS[first], property_id=words[1] if len(words) > 1 else None)
+    return UserIntent(action="new_property")
+
+
+def fake_customer_intent(user_msg):
+    from inventory.services.ai_intent import CustomerIntent
+
+    words = user_msg.strip().lower().split()
+    if words and words[0] == "view":
+        return CustomerIntent(action="view_property", property_id=words[1] if len(words) > 1 else None)
+    if words and words[0] == "help":
+        return CustomerIntent(action="help")
+    return CustomerIntent(action="list_properties")
+
+
+def fake_property(description):
+    from inventory.services.schema import PropertySchema
+
+    bhk = re.search(r"(\d)\s*bhk", description, re.I)
+    price = re.search(r"(\d+)\s*k\b", description, re.I)
+    city = re.search(r"\bin\s+([A-Za-z]+)", description)
+    return PropertySchema(
+        title="Stub Residency",
+        description_beautified=description,
+        city=city.group(1).title() if city else "Pune",
+        locality=None,
+        bhk=int(bhk.group(1)) if bhk else 2,
+        bathrooms=None,
+        area_sqft=None,
+        floor=None,
+        total_floors=None,
+        furnishing=None,
+        age_of_property=None,
+        amenities=[],
+        sale_or_rent="rent",
+        price=float(price.group(1)) * 1000 if price else 25000.0,
+        maintenance=None,
+        deposit=None,
+        source=None,
+        source_broker_name=None,
+        source_broker_phone=None,
+    )
+
+
+class FakeChain:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def invoke(self, inputs, *args, **kwargs):
+        _hit("llm")
+        return self.fn(inputs.get("user_msg") or inputs.get("description") or "")
+
+
+class FakeJsonChain(FakeChain):
+    """Stands in for prompt | model, answering with the JSON the model would write."""
+
+    def invoke(self, inputs, *args, **kwargs):
+        return super().invoke(inputs).model_dump_json()
+
+
+class FakeBatchChain:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def invoke(self, inputs, *args, **kwargs):
+        _hit("llm")
+        lines = [line.split(". ", 1)[-1] for line in inputs["user_msgs"].splitlines()]
+        return mock.Mock(results=[self.fn(line) for line in lines])
+
+
+class FakeRouter:
+    def invoke(self, prompt, *args, **kwargs):
+        _hit("llm")
+        return mock.Mock(content="🏡 Stub property message\n\nContact Broker")
+
+
+def fake_send_text(to, text, *args, **kwargs):
+    _hit("send")
+    return {"messages": [{"id": f"wamid.stub.{next(_ids)}"}]}
+
+
+def fake_send_media(to, media_url, media_type="image", *args, **kwargs):
+    _hit("send")
+    return {"messages": [{"id": f"wamid.stub.{next(_ids)}"}]}
+
+
+def fake_upload(file, *args, **kwargs):
+    _hit("upload")
+    n = next(_ids)
+    return {
+        "secure_url": f"https://res.cloudinary.com/stub/image/upload/{n}.jpg",
+        "resource_type": "image",
+    }
+
+
+def fake_requests_get(url, *args, **kwargs):
+    response = mock.Mock(status_code=200, raw=b"", content=b"")
+    response.json.return_value = {"url": f"https://lookaside.stub/{next(_ids)}"}
+    response.raise_for_status.return_value = None
+    return response
+
+
+def patchers():
+    targets = {
+        "inventory.services.sharing_msg.get_router": FakeRouter,
+        "inventory.services.sender_meta.send_whatsapp_text": fake_send_text,
+        "inventory.services.sender_meta.send_whatsapp_media": fake_send_media,
+        "inventory.views_ai.send_whatsapp_text": fake_send_text,
+        "inventory.views_ai.send_whatsapp_media": fake_send_media,
+        "inventory.views_twilio.send_whatsapp_text": fake_send_text,
+        "inventory.views_twilio.send_whatsapp_media": fake_send_media,
+        "requests.get": fake_requests_get,
+        "cloudinary.uploader.upload": fake_upload,
+    }
+    chains = {
+        "intent.user.chain": FakeChain(fake_user_intent),
+        "intent.customer.chain": FakeChain(fake_customer_intent),
+        "intent.user_batch.chain": FakeBatchChain(fake_user_intent),
+        "intent.customer_batch.chain": FakeBatchChain(fake_customer_intent),
+        "extract.chain": FakeChain(fake_property),
+        "extract.llm": FakeJsonChain(fake_property),
+    }
+    return [mock.patch(target, new) for target, new in targets.items()] + [
+        mock.patch.dict(registry.instances(), chains),
+    ]
+
+
+def install(llm=0.0, send=0.0, upload=0.0):
+    """Patches the stand-ins in for the rest of the process (used by LOADTEST_STUBS=1)."""
+    LATENCY.update(llm=llm, send=send, upload=upload)
+    for patcher in patchers():
+        patcher.start()
@@ -0,0 +1,100 @@
+from django.db import connection
+
+from inventory.models import Broker, MediaAsset, Property, Session
+
+# Bulk synthetic inventory for the Postgres benchmarks, generated in SQL with
+# generate_series so a million rows take seconds rather than an ORM loop.
+# Row n belongs to broker (n % brokers) and is that broker's listing number
+# n / brokers + 1; everything else is a deterministic function of n, so the
+# data is identical between runs. Rows within a broker mix cities, sizes and
+# statuses (about 70% active).
+
+CITIES = ["Mumbai", "Pune", "Bangalore", "Delhi", "Hyderabad", "Chennai", "Noida", "Gurgaon"]
+LOCALITIES = [
+    "Andheri", "Bandra", "Powai", "Baner", "Kothrud", "Hinjewadi", "Whitefield", "Koramangala",
+    "Indiranagar", "Dwarka", "Saket", "Gachibowli", "Madhapur", "Adyar", "Velachery", "Sector 62",
+    "Golf Course Road", "Wakad", "Viman Nagar", "Malad",
+]
+AMENITIES = [
+    "gym", "swimming pool", "covered parking", "lift", "power backup", "garden", "clubhouse",
+    "security", "metro nearby", "balcony", "modular kitchen", "sea view", "play area", "servant room",
+]
+FURNISHING = ["unfurnished", "semi", "fully"]
+
+
+def _array(values):
+    return "ARRAY[" + ",".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+# Listing number within its broker, the basis for every per-row choice.
+_CYCLE = "(n / %(brokers)s)"
+
+
+def _pick(values, salt=0):
+    return f"({_array(values)})[({_CYCLE} + {salt}) %% {len(values)} + 1]"
+
+
+def broker_uuid_sql(expr):
+    return f"md5('broker' || ({expr}))::uuid"
+
+
+def seed_brokers(count):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {Broker._meta.db_table} (id, password, is_superuser, phone_number, name, is_active, is_staff,
+                                                 created_at, updated_at, broker_code)
+            SELECT {broker_uuid_sql('n')}, '!', false, '+91' || (9000000000 + n), 'Broker ' || n, true, false,
+                   now(), now(), 'KD-BROKER-' || {broker_uuid_sql('n')}
+            FROM generate_series(1, %s) n
+        """, [count])
+
+
+def seed_properties(brokers, start, stop):
+    """Inserts synthetic listings start..stop-1 spread over the first `brokers` brokers."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {Property._meta.db_table} (id, broker_id, short_code, property_id, title, description_raw,
+                                                   city, locality, bhk, furnishing, price, created_at, updated_at,
+                                                   sale_or_rent, currency, source, status)
+            SELECT md5('property' || n)::uuid, {broker_uuid_sql('n %% %(brokers)s + 1')}, 'SYN-' || n,
+                   ({_CYCLE} + 1)::text,
+                   ({_CYCLE} %% 4 + 1) || 'BHK in ' || {_pick(LOCALITIES)},
+                   ({_CYCLE} %% 4 + 1) || 'bhk ' || {_pick(FURNISHING)} || ' furnished flat in ' || {_pick(LOCALITIES)}
+                       || ', ' || {_pick(CITIES)} || ' with ' || {_pick(AMENITIES)} || ' and ' || {_pick(AMENITIES, 5)}
+                       || '. Listing ' || n,
+                   {_pick(CITIES)}, {_pick(LOCALITIES)}, {_CYCLE} %% 4 + 1, {_pick(FURNISHING)},
+                   10000 + (n * 7919) %% 90000,
+                   now() - (n || ' minutes')::interval, now(), 'rent', 'INR', 'direct',
+                   CASE WHEN {_CYCLE} %% 10 < 7 THEN 'active' WHEN {_CYCLE} %% 10 < 9 THEN 'draft' ELSE 'archived' END
+            FROM generate_series(%(start)s, %(stop)s - 1) n
+        """, {"brokers": brokers, "start": start, "stop": stop})
+
+
+def seed_sessions(brokers, count):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {Session._meta.db_table} (broker_id, client_phone, last_message_at)
+            SELECT {broker_uuid_sql('n %% %s + 1')}, '+1' || (5550000000 + n), now()
+            FROM generate_series(1, %s) n
+        """, [brokers, count])
+
+
+def seed_media(per_property, sample_brokers=50):
+    """per_property media rows for every listing of the first sample_brokers brokers."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {MediaAsset._meta.db_table} (id, property_id, media_type, storage_url, "order", created_at)
+            SELECT md5('media' || p.id || m)::uuid, p.id, 'image', 'https://example.com/' || p.id || '/' || m, m, now()
+            FROM {Property._meta.db_table} p, generate_series(1, %s) m
+            WHERE p.broker_id IN (SELECT id FROM {Broker._meta.db_table} ORDER BY id LIMIT %s)
+        """, [per_property, sample_brokers])
+
+
+def clear():
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {Broker._meta.db_table} CASCADE")
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
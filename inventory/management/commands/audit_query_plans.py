@@ -0,0 +1,98 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from inventory.loadtest import synthetic
+from inventory.models import Broker, MediaAsset, Property, Session
+
+_SCAN = re.compile(r"(Seq Scan|Parallel Seq Scan|Index Only Scan|Index Scan|Bitmap Heap Scan|Bitmap Index Scan)"
+                   r"(?: using (\S+))? on (\S+)")
+
+
+def hot_queries(broker, prop, session):
+    """The lookups the WhatsApp handlers run on nearly every message."""
+    return [
+        ("property by broker + property_id",
+         Property.objects.filter(broker=broker, property_id=prop.property_id)),
+        ("active listings, newest first",
+         Property.objects.filter(broker=broker, status="active").order_by("-created_at")[:10]),
+        ("all listings, newest first",
+         Property.objects.filter(broker=broker).order_by("-created_at")[:10]),
+        ("listings by city (iexact)",
+         Property.objects.filter(broker=broker, status="active", city__iexact=prop.city.lower()).order_by("-created_at")[:10]),
+        ("broker by phone",
+         Broker.objects.filter(phone_number=broker.phone_number)),
+        ("broker by code (iexact)",
+         Broker.objects.filter(broker_code__iexact=broker.broker_code.lower())),
+        ("session by client phone",
+         Session.objects.filter(client_phone=session.client_phone)),
+        ("media of a property",
+         MediaAsset.objects.filter(property=prop)),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN ANALYZE the hot WhatsApp queries against a synthetic dataset on a "
+        "Postgres test database and flag any that fall back to a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=1_000_000)
+        parser.add_argument("--brokers", type=int, default=2_000)
+        parser.add_argument("--sessions", type=int, default=50_000)
+        parser.add_argument("--media", type=int, default=3, help="Media assets per property, for a sample of brokers.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database and its data.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans are only meaningful on Postgres (DATABASE_URL).")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            if not Property.objects.exists():
+                self.seed(options)
+            flagged = self.audit()
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+        if flagged:
+            raise CommandError(f"{len(flagged)} hot queries use a sequential scan: {', '.join(flagged)}")
+
+    def seed(self, options):
+        started = time.perf_counter()
+        synthetic.seed_brokers(options["brokers"])
+        synthetic.seed_properties(options["brokers"], 0, options["properties"])
+        synthetic.seed_sessions(options["brokers"], options["sessions"])
+        synthetic.seed_media(options["media"])
+        synthetic.analyze()
+        self.stdout.write(
+            f"Seeded {options['properties']} properties across {options['brokers']} brokers "
+            f"in {time.perf_counter() - started:.1f}s\n"
+        )
+
+    def audit(self):
+        broker = Broker.objects.order_by("id").first()
+        prop = Property.objects.filter(broker=broker, status="active").order_by("created_at").first()
+        session = Session.objects.filter(broker=broker).first()
+        if not (broker and prop and session):
+            raise CommandError("No seeded data to audit; drop --keepdb or clear the test database.")
+
+        flagged = []
+        for name, qs in hot_queries(broker, prop, session):
+            plan = qs.explain(analyze=True)
+            scans = _SCAN.findall(plan)
+            runtime = re.search(r"Execution Time: ([\d.]+) ms", plan)
+            seq = [table for kind, _, table in scans if "Seq Scan" in kind]
+            summary = ", ".join(f"{kind}{f' ({index})' if index else ''} on {table}" for kind, index, table in scans)
+            line = f"  {name:34} {runtime.group(1) if runtime else '?':>9} ms  {summary}"
+            if seq:
+                flagged.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+        return flagged
@@ -0,0 +1,111 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services import registry
+from inventory.services.extract import _partial_parser
+from inventory.services.listing_rules import COVERAGE_FIELDS, MIN_COVERAGE, coverage, pre_extract
+from inventory.services.schema import PropertySchema
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "loadtest", "extraction_corpus.jsonl")
+
+_FURNISHING = {
+    "semi": "semi", "semi-furnished": "semi", "semi furnished": "semi",
+    "fully": "fully", "fully-furnished": "fully", "fully furnished": "fully", "furnished": "fully",
+    "unfurnished": "unfurnished",
+}
+
+
+def _normalize(field, value):
+    if value is None:
+        return None
+    if field == "furnishing":
+        return _FURNISHING.get(str(value).strip().lower(), str(value).strip().lower())
+    if field in ("sale_or_rent", "city"):
+        return str(value).strip().lower()
+    if isinstance(value, (int, float)):
+        return round(float(value), 2)
+    return value
+
+
+def _tokens(text):
+    # Rough 4-characters-per-token estimate, good enough to compare prompts.
+    return len(text) // 4
+
+
+class Command(BaseCommand):
+    help = (
+        "Score the listing rules against a labelled corpus (or the live LLM chain with "
+        "--live): per-field accuracy, how many listings take the partial path, and the "
+        "prompt/output tokens saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", default=CORPUS, help="JSONL with description and expected fields.")
+        parser.add_argument("--live", action="store_true",
+                            help="Use the full LLM chain's output as the reference instead of the labels.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["corpus"]) as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f"Corpus not found: {options['corpus']}")
+
+        full_instructions = registry.get("extract.format_instructions")
+        per_field = {}
+        partial = 0
+        tokens_full = tokens_used = 0
+        rules_ms = 0.0
+
+        for row in rows:
+            description = row["description"]
+            started = time.perf_counter()
+            rules = pre_extract(description)
+            rules_ms += (time.perf_counter() - started) * 1000
+
+            if options["live"]:
+                reference = registry.get("extract.chain").invoke({
+                    "description": description,
+                    "format_instructions": full_instructions,
+                }).model_dump()
+            else:
+                reference = row.get("expected", {})
+
+            for field, value in rules.items():
+                if field == "currency":
+                    continue
+                stats = per_field.setdefault(field, {"filled": 0, "correct": 0})
+                stats["filled"] += 1
+                if _normalize(field, value) == _normalize(field, reference.get(field)):
+                    stats["correct"] += 1
+
+            # Output size is estimated from a schema-shaped answer of this listing.
+            answer = {name: reference.get(name) for name in PropertySchema.model_fields}
+            prompt_tokens = _tokens(description)
+            tokens_full += prompt_tokens + _tokens(full_instructions) + _tokens(json.dumps(answer))
+            if rules and coverage(rules) >= MIN_COVERAGE:
+                partial += 1
+                missing = tuple(name for name in PropertySchema.model_fields if name not in rules)
+                _, instructions = _partial_parser(missing)
+                rest = {name: answer[name] for name in missing}
+                tokens_used += prompt_tokens + _tokens(instructions) + _tokens(json.dumps(rest))
+            else:
+                tokens_used += prompt_tokens + _tokens(full_instructions) + _tokens(json.dumps(answer))
+
+        n = len(rows)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{n} listings ({'live LLM' if options['live'] else 'labelled'} reference)"))
+        self.stdout.write(f"  partial path  {partial}/{n} at coverage >= {MIN_COVERAGE} of {', '.join(COVERAGE_FIELDS)}")
+        self.stdout.write(f"  rules time    {rules_ms / n:.3f} ms per listing")
+        self.stdout.write(
+            f"  tokens        {tokens_used} vs {tokens_full} full-schema "
+            f"({1 - tokens_used / tokens_full:.1%} saved, ~4 chars/token)"
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING("\nfield accuracy where the rules answered"))
+        for field, stats in sorted(per_field.items()):
+            self.stdout.write(
+                f"  {field:16} {stats['correct']}/{stats['filled']} "
+                f"({stats['correct'] / stats['filled']:.0%}), filled on {stats['filled'] / n:.0%} of listings"
+            )
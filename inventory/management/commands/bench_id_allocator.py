@@ -0,0 +1,151 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, connections, models
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.test.utils import setup_test_environment
+
+from inventory.models import Broker, IdCounter, Property
+from inventory.signals import (
+    bump_inventory_version, index_property_for_duplicates, remove_property_from_duplicates,
+)
+
+
+def _legacy_save(self, *args, **kwargs):
+    # Property.save before IdCounter: two COUNT(*) scans per insert.
+    if not self.property_id:
+        self.property_id = str(Property.objects.filter(broker=self.broker).count() + 1)
+    if not self.short_code:
+        self.short_code = self.build_short_code(Property.objects.count() + 1)
+    models.Model.save(self, *args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-test property id allocation with parallel inserts on a test database: "
+        "checks for duplicate property_id/short_code and compares insert throughput of "
+        "the IdCounter allocator with the legacy COUNT(*) approach."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--inserts", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--brokers", type=int, default=4)
+        parser.add_argument("--existing", type=int, default=0,
+                            help="Rows to preload first, to show how COUNT(*) cost grows with the table.")
+        parser.add_argument("--skip-legacy", action="store_true")
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        # Keep Redis out of the measurement.
+        post_save.disconnect(index_property_for_duplicates, sender=Property)
+        post_delete.disconnect(remove_property_from_duplicates, sender=Property)
+        post_save.disconnect(bump_inventory_version, sender=Property)
+        failed = None
+        try:
+            modes = [("allocator", None)]
+            if not options["skip_legacy"]:
+                modes.append(("legacy count()", _legacy_save))
+            for name, save in modes:
+                self.reset(options)
+                if save:
+                    with mock.patch.object(Property, "save", save):
+                        self.report(name, self.run(options))
+                else:
+                    result = self.run(options)
+                    self.report(name, result)
+                    if not self.ok(result):
+                        failed = result
+        finally:
+            post_save.connect(index_property_for_duplicates, sender=Property)
+            post_delete.connect(remove_property_from_duplicates, sender=Property)
+            post_save.connect(bump_inventory_version, sender=Property)
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+        # The legacy run is the baseline and is expected to conflict; the allocator must not.
+        if failed:
+            raise CommandError(
+                f"IdCounter allocation conflicted: {len(failed['errors'])} failed inserts, "
+                f"{failed['duplicate_property_ids']} duplicate (broker, property_id), "
+                f"{failed['duplicate_short_codes']} duplicate short_code"
+            )
+
+    def reset(self, options):
+        Property.objects.all().delete()
+        IdCounter.objects.all().delete()
+        Broker.objects.filter(phone_number__startswith="bench-").delete()
+        self.brokers = [
+            Broker.objects.create(phone_number=f"bench-{i}", name=f"Bench {i}") for i in range(options["brokers"])
+        ]
+        existing = options["existing"]
+        if not existing:
+            return
+        rows = []
+        for n in range(existing):
+            broker = self.brokers[n % len(self.brokers)]
+            prop = Property(broker=broker, description_raw="preloaded", property_id=str(n // len(self.brokers) + 1))
+            prop.short_code = prop.build_short_code(n + 1)
+            rows.append(prop)
+        Property.objects.bulk_create(rows, batch_size=5000)
+        for i, broker in enumerate(self.brokers):
+            IdCounter.objects.create(scope=f"property:{broker.id}", value=(existing - i - 1) // len(self.brokers) + 1)
+        IdCounter.objects.create(scope="short_code", value=existing)
+
+    def run(self, options):
+        errors = []
+        lock = threading.Lock()
+
+        def insert(i):
+            broker = self.brokers[i % len(self.brokers)]
+            try:
+                Property(broker=broker, description_raw=f"bench listing {i}", status="draft").save()
+            except IntegrityError as e:
+                with lock:
+                    errors.append(str(e))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            wait([pool.submit(insert, i) for i in range(options["inserts"])])
+            elapsed = time.perf_counter() - started
+            barrier = threading.Barrier(options["threads"])
+
+            def close_connections(_):
+                barrier.wait()
+                connections.close_all()
+
+            list(pool.map(close_connections, range(options["threads"])))
+
+        duplicate_ids = (
+            Property.objects.values("broker_id", "property_id").annotate(n=Count("id")).filter(n__gt=1).count()
+        )
+        duplicate_codes = Property.objects.values("short_code").annotate(n=Count("id")).filter(n__gt=1).count()
+        return {
+            "inserted": options["inserts"] - len(errors),
+            "elapsed": elapsed,
+            "errors": errors,
+            "duplicate_property_ids": duplicate_ids,
+            "duplicate_short_codes": duplicate_codes,
+        }
+
+    @staticmethod
+    def ok(result):
+        return not result["errors"] and not result["duplicate_property_ids"] and not result["duplicate_short_codes"]
+
+    def report(self, name, result):
+        style = self.style.SUCCESS if self.ok(result) else self.style.ERROR
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+        self.stdout.write(f"  inserted      {result['inserted']} in {result['elapsed']:.2f}s "
+                          f"({result['inserted'] / result['elapsed']:.0f}/s)")
+        self.stdout.write(style(
+            f"  conflicts     {len(result['errors'])} failed inserts, "
+            f"{result['duplicate_property_ids']} duplicate (broker, property_id), "
+            f"{result['duplicate_short_codes']} duplicate short_code"
+        ))
+        if result["errors"]:
+            self.stdout.write(f"  first error   {result['errors'][0][:120]}")
@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+
+from inventory.loadtest import synthetic
+from inventory.models import Property
+from inventory.services import search
+
+QUERIES = ["gym", "baner swimming pool", "2bhk semi furnished", "sea view bandra", "koramangla", "powai lift balcony"]
+
+
+def legacy(qs, text):
+    # PropertyViewSet.search before the search vector.
+    return qs.filter(Q(title__icontains=text) | Q(description_beautified__icontains=text) | Q(locality__icontains=text))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare PropertyViewSet.search text matching (icontains vs the ranked search vector) "
+        "at growing inventory sizes on a synthetic Postgres test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000")
+        parser.add_argument("--brokers", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--limit", type=int, default=20, help="Rows fetched per query, like one page of results.")
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The search vector needs Postgres (DATABASE_URL).")
+        sizes = sorted(int(s) for s in options["sizes"].split(","))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            synthetic.clear()
+            synthetic.seed_brokers(options["brokers"])
+            seeded = 0
+            for size in sizes:
+                started = time.perf_counter()
+                synthetic.seed_properties(options["brokers"], seeded, size)
+                search.update_vectors(Property.objects.filter(search_vector=None))
+                synthetic.analyze()
+                seeded = size
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"\n{size} properties (seeded in {time.perf_counter() - started:.1f}s)"
+                ))
+                for name, run in (("icontains", legacy), ("search vector", search.search)):
+                    self.report(name, run, options)
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def report(self, name, run, options):
+        timings, hits = [], 0
+        for text in QUERIES:
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                rows = list(run(Property.objects.all(), text)[:options["limit"]])
+                timings.append((time.perf_counter() - started) * 1000)
+            hits += bool(rows)
+        timings.sort()
+        self.stdout.write(
+            f"  {name:14} p50 {statistics.median(timings):8.1f} ms  "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:8.1f} ms  "
+            f"({hits}/{len(QUERIES)} queries found rows)"
+        )
@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from inventory.models import Broker, MediaAsset, Property
+from inventory.serializers import PROPERTY_LIST_FIELDS, PropertySerializer, property_rows
+from inventory.services import embeddings
+
+DESCRIPTION = (
+    "Spacious {bhk} BHK on the {floor}th floor with modular kitchen, two balconies, covered parking, "
+    "24x7 security, gym and swimming pool in the society. Close to the metro station and schools. "
+) * 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Serializer throughput (rows/sec, JSON bytes/row) of the property list endpoints: "
+        "PropertySerializer with every field and media vs the compact .values() rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            self.seed(options["rows"])
+            base = Property.objects.order_by("-created_at", "-id")
+            full = base.select_related("broker").prefetch_related("media")
+            sparse = ["id", "title", "city", "bhk", "price"]
+
+            runs = [
+                ("serializer, all fields", lambda n: PropertySerializer(full[:n], many=True).data),
+                ("serializer, ?fields=", lambda n: PropertySerializer(full[:n], many=True, fields=sparse).data),
+                ("values() rows", lambda n: property_rows(base.values(*PROPERTY_LIST_FIELDS)[:n], PROPERTY_LIST_FIELDS)),
+                ("values() rows, ?fields=", lambda n: property_rows(base.values(*sparse)[:n], sparse)),
+            ]
+            for limit, label in ((options["page_size"], "one page"), (options["rows"], "all rows")):
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label} ({limit} rows)"))
+                for name, run in runs:
+                    self.report(name, run, limit, options["repeat"])
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def seed(self, rows):
+        broker = Broker.objects.create(phone_number="+910000000000", name="Bench Broker")
+        embedding = embeddings.pack(embeddings.embed(DESCRIPTION))
+        props = [
+            Property(
+                broker=broker, property_id=str(n + 1), short_code=f"KD-PUN-2BHK-{n + 1:05d}",
+                title=f"{n % 4 + 1} BHK in Baner", description_raw=DESCRIPTION.format(bhk=n % 4 + 1, floor=n % 20),
+                description_beautified=DESCRIPTION.format(bhk=n % 4 + 1, floor=n % 20), city="Pune",
+                locality="Baner", bhk=n % 4 + 1, bathrooms=2, area_sqft=950, furnishing="semi",
+                amenities=["gym", "pool", "parking"], price=25000 + n, deposit=100000, maintenance=2500,
+                status="active", moderation_flags={"checked": True}, embedding=embedding,
+            )
+            for n in range(rows)
+        ]
+        Property.objects.bulk_create(props, batch_size=1000)
+        MediaAsset.objects.bulk_create([
+            MediaAsset(property=prop, media_type="image", storage_url=f"https://example.com/{prop.id}/{i}.jpg", order=i)
+            for prop in props for i in range(3)
+        ], batch_size=1000)
+
+    def report(self, name, run, limit, repeat):
+        renderer = JSONRenderer()
+        best, size = None, 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = run(limit)
+            body = renderer.render(data)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            size = len(body)
+        count = len(data)
+        self.stdout.write(
+            f"  {name:24} {count / best:10.0f} rows/s  {size / max(count, 1):7.0f} bytes/row  "
+            f"({best * 1000:.1f} ms)"
+        )
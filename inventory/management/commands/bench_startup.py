@@ -0,0 +1,104 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported or built.
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+response = Client().get("/api/whatsapp_webhook_meta", {"hub.mode": "subscribe", "hub.verify_token": "-", "hub.challenge": "1"})
+first_request = time.perf_counter()
+
+from inventory.services import registry
+for name in ("intent.user.chain", "intent.customer.chain", "extract.chain"):
+    registry.get(name)
+llm_ready = time.perf_counter()
+
+print(json.dumps({
+    "setup_ms": (setup_done - started) * 1000,
+    "first_request_ms": (first_request - started) * 1000,
+    "first_request_status": response.status_code,
+    "llm_chains_ms": (llm_ready - first_request) * 1000,
+    "registry_build_ms": registry.built(),
+}))
+"""
+
+_WATCHED = ("inventory", "langchain", "langchain_core", "langchain_groq", "langchain_openai",
+            "langchain_anthropic", "langchain_google_genai", "groq", "openai", "anthropic",
+            "twilio", "cloudinary", "rest_framework", "redis", "celery", "sklearn", "numpy", "httpx")
+
+
+def _parse_importtime(stderr):
+    """Cumulative import time in ms per module from `python -X importtime` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        if cumulative.isdigit():
+            times[module] = int(cumulative) / 1000
+    return times
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start in fresh interpreters: django.setup(), time to the "
+        "first webhook request, the cost of building the LLM chains on first use, and "
+        "import time per module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--top", type=int, default=20, help="Slowest modules to list.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"))
+        runs, imports = [], {}
+        for _ in range(options["runs"]):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _PROBE],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            for module, ms in _parse_importtime(proc.stderr).items():
+                imports.setdefault(module, []).append(ms)
+
+        watched = {
+            module: statistics.median(values)
+            for module, values in imports.items()
+            if module.split(".")[0] in _WATCHED
+        }
+        slowest = sorted(watched.items(), key=lambda item: -item[1])[:options["top"]]
+        report = {
+            "runs": options["runs"],
+            "setup_ms": round(statistics.median(r["setup_ms"] for r in runs), 1),
+            "first_request_ms": round(statistics.median(r["first_request_ms"] for r in runs), 1),
+            "llm_chains_ms": round(statistics.median(r["llm_chains_ms"] for r in runs), 1),
+            "registry_build_ms": runs[-1]["registry_build_ms"],
+            "imports_ms": {module: round(ms, 1) for module, ms in slowest},
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"django.setup()        {report['setup_ms']:.1f} ms")
+        self.stdout.write(f"first request         {report['first_request_ms']:.1f} ms after process start")
+        self.stdout.write(f"LLM chains on demand  {report['llm_chains_ms']:.1f} ms")
+        self.stdout.write(self.style.MIGRATE_HEADING("\ncumulative import time (median)"))
+        for module, ms in report["imports_ms"].items():
+            self.stdout.write(f"  {ms:8.1f} ms  {module}")
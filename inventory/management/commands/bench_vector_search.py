@@ -0,0 +1,54 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from inventory.services import embeddings
+from inventory.services.vector_index import BrokerIndex
+
+QUERIES = [
+    "quiet 2bhk near metro with gym",
+    "furnished studio for rent close to it park",
+    "3 bhk sea facing with parking and swimming pool",
+    "budget 1rk for bachelors near station",
+    "villa with garden and servant room",
+]
+
+
+class Command(BaseCommand):
+    help = "Time top-k similarity search on one broker's in-memory vector index of synthetic listings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000, help="Listings in the index.")
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("-k", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        index = BrokerIndex("bench")
+        started = time.perf_counter()
+        vectors = rng.standard_normal((options["size"], embeddings.DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for i, vec in enumerate(vectors):
+            index.upsert(str(i), vec)
+        self.stdout.write(f"Built an index of {len(index)} x {embeddings.DIM} in {time.perf_counter() - started:.1f}s "
+                          f"({index.matrix[:len(index)].nbytes / 1e6:.0f} MB)")
+
+        embed_ms, search_ms = [], []
+        for n in range(options["queries"]):
+            text = QUERIES[n % len(QUERIES)]
+            t0 = time.perf_counter()
+            vec = embeddings.embed(text)
+            t1 = time.perf_counter()
+            index.search(vec, options["k"])
+            t2 = time.perf_counter()
+            embed_ms.append((t1 - t0) * 1000)
+            search_ms.append((t2 - t1) * 1000)
+
+        for name, samples in (("embed query", embed_ms), ("top-k search", search_ms)):
+            samples.sort()
+            self.stdout.write(
+                f"  {name:13} p50 {statistics.median(samples):.2f} ms  "
+                f"p95 {samples[int(len(samples) * 0.95) - 1]:.2f} ms"
+            )
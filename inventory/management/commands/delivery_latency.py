@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.delivery_metrics import latency_report
+
+
+class Command(BaseCommand):
+    help = "Show queued->sent/delivered/read latency of outgoing WhatsApp messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+        parser.add_argument("--broker", help="Broker id to report on instead of all brokers.")
+
+    def handle(self, *args, **options):
+        report = latency_report(hours=options["hours"], broker_id=options["broker"])
+        self.stdout.write(json.dumps(report, indent=2))
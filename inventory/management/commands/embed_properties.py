@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.models import Property
+from inventory.services import embeddings, inventory_version
+
+
+class Command(BaseCommand):
+    help = "Compute Property.embedding for listings that have none (or all of them with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-embed every listing, e.g. after changing EMBEDDING_DIM.")
+        parser.add_argument("--batch", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        queryset = Property.objects.only("id", "broker_id", *embeddings.EMBEDDING_FIELDS)
+        if not options["all"]:
+            queryset = queryset.filter(embedding=None)
+
+        count = 0
+        brokers = set()
+        batch = []
+        for prop in queryset.iterator(chunk_size=options["batch"]):
+            prop.embedding = embeddings.embed_property(prop)
+            batch.append(prop)
+            brokers.add(prop.broker_id)
+            if len(batch) >= options["batch"]:
+                count += Property.objects.bulk_update(batch, ["embedding"])
+                batch = []
+                self.stdout.write(f"  {count} embedded")
+        if batch:
+            count += Property.objects.bulk_update(batch, ["embedding"])
+
+        # bulk_update skips the save signals, so invalidate the search indexes here.
+        for broker_id in brokers:
+            inventory_version.bump(broker_id)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Embedded {count} properties in {elapsed:.1f}s"))
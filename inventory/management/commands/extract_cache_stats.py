@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.services import extract_cache, registry
+from inventory.services.extract import extract_fields  # noqa: F401  registers the extract.* entries
+from inventory.services.redis_setup import redis_client
+
+
+class Command(BaseCommand):
+    help = "Show extraction cache hits/misses and size, and how often the listing rules avoided the full schema."
+
+    def handle(self, *args, **options):
+        report = {
+            "cache": extract_cache.stats(registry.get("extract.version")),
+            "rules": redis_client.hgetall("extract:rules:stats"),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.idempotency import idempotency_stats
+
+
+class Command(BaseCommand):
+    help = "Show webhook idempotency ledger hit/miss counters."
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(idempotency_stats(), indent=2))
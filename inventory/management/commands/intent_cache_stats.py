@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.ai_intent import customer_batcher, customer_intent_cache, intent_cache, user_batcher
+
+
+class Command(BaseCommand):
+    help = "Show intent classification cache hit/miss counters and LLM time saved."
+
+    def handle(self, *args, **options):
+        report = {
+            "user": intent_cache.snapshot(),
+            "customer": customer_intent_cache.snapshot(),
+            "batching": {"user": user_batcher.snapshot(), "customer": customer_batcher.snapshot()},
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,15 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.lanes import lane_stats
+
+
+class Command(BaseCommand):
+    help = "Show message lane queue depth and wait times (hot brokers/customers first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(lane_stats(top=options["top"]), indent=2))
@@ -0,0 +1,189 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import redis
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from inventory.loadtest import stubs
+from inventory.loadtest.scenarios import ENDPOINTS, SCENARIOS, load_recorded
+
+_counters = threading.local()
+
+
+def _count(name):
+    setattr(_counters, name, getattr(_counters, name, 0) + 1)
+
+
+def _install_redis_counter():
+    """Counts Redis round trips per thread (a pipeline counts once)."""
+    execute_command = redis.Redis.execute_command
+    pipeline_execute = redis.client.Pipeline.execute
+
+    def counted_execute_command(self, *args, **kwargs):
+        _count("redis")
+        return execute_command(self, *args, **kwargs)
+
+    def counted_pipeline_execute(self, *args, **kwargs):
+        _count("redis")
+        return pipeline_execute(self, *args, **kwargs)
+
+    redis.Redis.execute_command = counted_execute_command
+    redis.client.Pipeline.execute = counted_pipeline_execute
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay synthetic or recorded webhook payloads at a target rate and report "
+        "latency percentiles, throughput and DB/Redis calls per request. Groq, the "
+        "Graph API and Cloudinary are replaced by local stand-ins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                            help="Scenario to run (repeatable). Defaults to all.")
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="meta")
+        parser.add_argument("--replay", help="JSONL file recorded with WEBHOOK_RECORD_DIR.")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--rate", type=float, default=0, help="Target requests/sec (0 = as fast as possible).")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--llm-latency", type=float, default=0.4, help="Seconds per stubbed LLM call.")
+        parser.add_argument("--send-latency", type=float, default=0.15, help="Seconds per stubbed Graph API send.")
+        parser.add_argument("--upload-latency", type=float, default=0.5, help="Seconds per stubbed Cloudinary upload.")
+        parser.add_argument("--url", help="Send to a live server instead of the Django test client. "
+                                          "Start that server with LOADTEST_STUBS=1 to stub its dependencies.")
+        parser.add_argument("--async-workers", action="store_true",
+                            help="Queue to real Celery workers instead of running tasks inline.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            self.run_all(options)
+            return
+
+        from celery import current_app
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        current_app.conf.task_always_eager = not options["async_workers"]
+        patchers = stubs.patchers()
+        for patcher in patchers:
+            patcher.start()
+        stubs.LATENCY.update(
+            llm=options["llm_latency"], send=options["send_latency"], upload=options["upload_latency"],
+        )
+        try:
+            self.run_all(options)
+        finally:
+            for patcher in patchers:
+                patcher.stop()
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def run_all(self, options):
+        self.live = bool(options["url"])
+        _install_redis_counter()
+        if options["replay"]:
+            runs = [("replay", load_recorded(options["replay"]))]
+        else:
+            names = options["scenario"] or list(SCENARIOS)
+            runs = [(name, SCENARIOS[name](options["requests"], endpoint=options["endpoint"])) for name in names]
+
+        for name, batch in runs:
+            if not batch:
+                raise CommandError(f"No requests for {name}")
+            self.report(name, self.run_batch(batch, options))
+
+    def run_batch(self, batch, options):
+        url = options["url"]
+        interval = 1 / options["rate"] if options["rate"] else 0
+        stubs.reset_calls()
+        results = []
+        results_lock = threading.Lock()
+        local = threading.local()
+
+        def send(item):
+            endpoint, content_type, body = item
+            _counters.redis = 0
+            queries = [0]
+
+            def count_query(execute, sql, params, many, context):
+                queries[0] += 1
+                return execute(sql, params, many, context)
+
+            started = time.perf_counter()
+            try:
+                if url:
+                    session = getattr(local, "session", None) or requests.Session()
+                    local.session = session
+                    r = session.post(url.rstrip("/") + ENDPOINTS[endpoint], data=body.encode("utf-8"),
+                                     headers={"Content-Type": content_type}, timeout=60)
+                    ok = r.status_code < 400
+                else:
+                    client = getattr(local, "client", None) or Client()
+                    local.client = client
+                    with connection.execute_wrapper(count_query):
+                        r = client.post(ENDPOINTS[endpoint], data=body, content_type=content_type)
+                    ok = r.status_code < 400
+            except Exception as e:
+                self.stderr.write(f"[ERROR] {endpoint}: {e}")
+                ok = False
+            elapsed = time.perf_counter() - started
+            with results_lock:
+                results.append((elapsed, ok, queries[0], getattr(_counters, "redis", 0)))
+
+        started = time.perf_counter()
+        futures = []
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for i, item in enumerate(batch):
+                if interval:
+                    delay = started + i * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append(pool.submit(send, item))
+            wait(futures)
+            wall = time.perf_counter() - started
+            if not url:
+                # Close each worker thread's DB connection so the test DB can be dropped.
+                barrier = threading.Barrier(options["concurrency"])
+
+                def close_connections(_):
+                    barrier.wait()
+                    connections.close_all()
+
+                list(pool.map(close_connections, range(options["concurrency"])))
+        return results, wall, dict(stubs.CALLS)
+
+    def report(self, name, run):
+        results, wall, calls = run
+        latencies = [r[0] * 1000 for r in results]
+        n = len(results)
+        errors = sum(1 for r in results if not r[1])
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+        self.stdout.write(f"  requests      {n} ({errors} errors) in {wall:.2f}s")
+        self.stdout.write(f"  throughput    {n / wall:.1f} req/s")
+        self.stdout.write(
+            f"  latency ms    p50 {_percentile(latencies, 50):.1f}  p95 {_percentile(latencies, 95):.1f}  "
+            f"p99 {_percentile(latencies, 99):.1f}  mean {statistics.fmean(latencies):.1f}"
+        )
+        if self.live:
+            self.stdout.write("  per request   DB/Redis calls and stub calls are only counted in-process")
+            return
+        self.stdout.write(
+            f"  per request   {statistics.fmean(r[2] for r in results):.1f} DB queries, "
+            f"{statistics.fmean(r[3] for r in results):.1f} Redis calls"
+        )
+        self.stdout.write(f"  stub calls    llm {calls['llm']}  send {calls['send']}  upload {calls['upload']}")
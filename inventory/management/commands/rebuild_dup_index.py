@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.models import Property
+from inventory.services import dup_index
+from inventory.services.redis_setup import redis_client
+
+
+class Command(BaseCommand):
+    help = "Rebuild the near-duplicate listing index from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Delete all dup:* keys first.")
+        parser.add_argument("--batch", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted = 0
+            batch = []
+            for key in redis_client.scan_iter(match="dup:*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += redis_client.delete(*batch)
+            self.stdout.write(f"Deleted {deleted} keys")
+
+        started = time.perf_counter()
+        count = 0
+        queryset = Property.objects.only(
+            "id", "broker_id", "description_raw", "description_beautified", "city", "bhk", "price", "area_sqft",
+        )
+        for prop in queryset.iterator(chunk_size=options["batch"]):
+            dup_index.index_property(prop)
+            count += 1
+            if count % 10000 == 0:
+                self.stdout.write(f"  {count} indexed")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} properties in {elapsed:.1f}s"))
@@ -0,0 +1,102 @@
+import json
+import os
+import pickle
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services import intent_model
+from inventory.services.redis_setup import redis_client
+
+
+def _build_pipeline():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import FeatureUnion, Pipeline
+
+    return Pipeline([
+        ("features", FeatureUnion([
+            ("words", TfidfVectorizer(lowercase=True, ngram_range=(1, 2), min_df=1, sublinear_tf=True)),
+            ("chars", TfidfVectorizer(lowercase=True, analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True)),
+        ])),
+        ("clf", LogisticRegression(max_iter=2000, C=5.0, class_weight="balanced")),
+    ])
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the local intent classifiers from messages labelled by the LLM "
+        "(Redis intent_log:* lists and optional JSONL files) and report how much "
+        "LLM traffic they would absorb at the confidence threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jsonl", action="append", default=[],
+                            help='Extra corpus file with {"kind", "text", "action"} per line (repeatable).')
+        parser.add_argument("--output", default=intent_model.MODEL_PATH)
+        parser.add_argument("--threshold", type=float, default=intent_model.THRESHOLD)
+        parser.add_argument("--holdout", type=float, default=0.2)
+        parser.add_argument("--min-examples", type=int, default=5,
+                            help="Drop labels with fewer examples than this.")
+        parser.add_argument("--report", action="store_true", help="Only print live absorbed/deferred counters.")
+
+    def load_corpus(self, options):
+        corpus = {"user": {}, "customer": {}}
+        for kind in corpus:
+            for raw in redis_client.lrange(f"intent_log:{kind}", 0, -1):
+                row = json.loads(raw)
+                if row.get("action"):
+                    corpus[kind][intent_model.mask(row["text"]).strip().lower()] = row["action"]
+        for path in options["jsonl"]:
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    if row.get("kind") in corpus and row.get("action"):
+                        corpus[row["kind"]][intent_model.mask(row["text"]).strip().lower()] = row["action"]
+        return corpus
+
+    def handle(self, *args, **options):
+        if options["report"]:
+            self.stdout.write(json.dumps(intent_model.model_stats(), indent=2))
+            return
+
+        from sklearn.model_selection import train_test_split
+
+        models = {}
+        for kind, labelled in self.load_corpus(options).items():
+            counts = Counter(labelled.values())
+            rows = [(t, a) for t, a in labelled.items() if counts[a] >= options["min_examples"]]
+            labels = {a for _, a in rows}
+            if len(labels) < 2:
+                self.stdout.write(self.style.WARNING(f"{kind}: not enough labelled messages ({len(rows)})"))
+                continue
+
+            texts, actions = [t for t, _ in rows], [a for _, a in rows]
+            train_x, test_x, train_y, test_y = train_test_split(
+                texts, actions, test_size=options["holdout"], stratify=actions, random_state=0,
+            )
+            model = _build_pipeline().fit(train_x, train_y)
+            probabilities = model.predict_proba(test_x)
+            predicted = model.classes_[probabilities.argmax(axis=1)]
+            confident = probabilities.max(axis=1) >= options["threshold"]
+            correct = predicted == test_y
+
+            answered = int(confident.sum())
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{kind}"))
+            self.stdout.write(f"  corpus        {len(rows)} messages, {len(labels)} actions")
+            self.stdout.write(f"  accuracy      {correct.mean():.3f} on {len(test_y)} held out")
+            self.stdout.write(
+                f"  confident     {answered / len(test_y):.1%} of held out at >= {options['threshold']} "
+                f"({correct[confident].mean() if answered else 0:.3f} accurate)"
+            )
+
+            models[kind] = _build_pipeline().fit(texts, actions)
+
+        if not models:
+            raise CommandError("No model trained")
+        os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+        with open(options["output"], "wb") as f:
+            pickle.dump(models, f)
+        self.stdout.write(self.style.SUCCESS(f"\nSaved {', '.join(models)} to {options['output']}"))
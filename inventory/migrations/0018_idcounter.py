@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    IdCounter = apps.get_model("inventory", "IdCounter")
+    Property = apps.get_model("inventory", "Property")
+
+    last_by_broker = {}
+    last_short_code = 0
+    for broker_id, property_id, short_code in Property.objects.values_list("broker_id", "property_id", "short_code").iterator():
+        if property_id and property_id.isdigit():
+            last_by_broker[broker_id] = max(last_by_broker.get(broker_id, 0), int(property_id))
+        number = (short_code or "").rsplit("-", 1)[-1]
+        if number.isdigit():
+            last_short_code = max(last_short_code, int(number))
+
+    IdCounter.objects.bulk_create(
+        [IdCounter(scope=f"property:{broker_id}", value=value) for broker_id, value in last_by_broker.items()]
+        + [IdCounter(scope="short_code", value=last_short_code)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_broker_groups_broker_is_active_broker_is_staff_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdCounter',
+            fields=[
+                ('scope', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+import logging
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def renumber_duplicate_property_ids(apps, schema_editor):
+    # Concurrent inserts under the old COUNT(*) allocation could share a
+    # property_id. The oldest keeps it; the rest move to the broker's next id.
+    # Brokers may already have shared the old ids over WhatsApp, so every move
+    # is logged and kept on the property as moderation_flags["renumbered_from"].
+    IdCounter = apps.get_model("inventory", "IdCounter")
+    Property = apps.get_model("inventory", "Property")
+
+    duplicates = (
+        Property.objects.exclude(property_id=None)
+        .values("broker_id", "property_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        ids = Property.objects.filter(broker_id=row["broker_id"]).values_list("property_id", flat=True)
+        counter, _ = IdCounter.objects.get_or_create(
+            scope=f"property:{row['broker_id']}",
+            defaults={"value": max((int(i) for i in ids if i and i.isdigit()), default=0)},
+        )
+        clashing = Property.objects.filter(broker_id=row["broker_id"], property_id=row["property_id"]).order_by("created_at")
+        for prop in clashing[1:]:
+            counter.value += 1
+            old_id, prop.property_id = prop.property_id, str(counter.value)
+            prop.moderation_flags = {**(prop.moderation_flags or {}), "renumbered_from": old_id}
+            prop.save(update_fields=["property_id", "moderation_flags"])
+            logging.warning(
+                f"Broker {row['broker_id']}: property {prop.pk} renumbered from [{old_id}] to [{prop.property_id}]"
+            )
+        counter.save(update_fields=["value"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_idcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_property_ids, migrations.RunPython.noop),
+    ]
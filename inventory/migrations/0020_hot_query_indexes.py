@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('inventory', '0019_renumber_duplicate_property_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='broker',
+            index=models.Index(django.db.models.functions.text.Upper('broker_code'), name='broker_code_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['broker', 'status', '-created_at'], name='property_broker_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['broker', '-created_at'], name='property_broker_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(models.F('broker'), django.db.models.functions.text.Upper('city'), name='property_broker_city_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='property',
+            constraint=models.UniqueConstraint(fields=('broker', 'property_id'), name='property_broker_property_id_uniq'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Property = apps.get_model("inventory", "Property")
+    Property.objects.update(search_vector=(
+        SearchVector("title", weight="A", config="english")
+        + SearchVector("locality", "city", weight="B", config="english")
+        + SearchVector("description_beautified", weight="C", config="english")
+        + SearchVector("description_raw", weight="D", config="english")
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0020_hot_query_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='property_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('title', name='gin_trgm_ops'), name='property_title_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('locality', name='gin_trgm_ops'), name='property_locality_trgm_idx'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models.functions import Lower, Trim
+
+# Spellings written before Property.save stored choice keys, as the list
+# commands used to match them. Frozen here; services/filters.py may grow.
+FURNISHING = {
+    "fully": ["fully furnished", "fully-furnished", "furnished", "full", "ff"],
+    "semi": ["semi furnished", "semi-furnished", "semifurnished"],
+    "unfurnished": ["not furnished", "not-furnished", "un furnished", "non furnished", "bare shell"],
+}
+SALE_OR_RENT = {
+    "sale": ["for sale", "buy", "resale", "sell"],
+    "rent": ["for rent", "rental", "lease"],
+}
+
+
+def normalize(apps, schema_editor):
+    Property = apps.get_model("inventory", "Property")
+    for field, aliases in (("furnishing", FURNISHING), ("sale_or_rent", SALE_OR_RENT)):
+        rows = Property.objects.annotate(key=Lower(Trim(field)))
+        for choice, spellings in aliases.items():
+            rows.filter(key__in=[choice, *spellings]).exclude(**{field: choice}).update(**{field: choice})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_property_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Upper
+from .services import embeddings, filters
 from django.contrib.auth.hashers import make_password, check_password
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
@@ -37,6 +41,12 @@ class Broker(AbstractBaseUser, PermissionsMixin):
     updated_at = models.DateTimeField(auto_now=True)
     broker_code = models.CharField(max_length=50, blank=True, unique=True)
     objects = BrokerManager()
+
+    class Meta:
+        indexes = [
+            # broker_code__iexact compiles to UPPER(broker_code) on Postgres.
+            models.Index(Upper("broker_code"), name="broker_code_upper_idx"),
+        ]
     
     def save(self, *args, **kwargs):
         # Ensure id exists
@@ -55,6 +65,32 @@ class Broker(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.name or self.phone_number}"
 
+class IdCounter(models.Model):
+    """
+    Sequence rows for human-facing ids: "short_code" for the global short
+    code number and "property:<broker_id>" for each broker's property ids.
+    next() increments under a row lock, so parallel inserts never share a
+    number and no insert has to count the properties table.
+    """
+    scope = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def next(cls, scope, seed=None):
+        # seed() gives the starting value for a scope that has no row yet.
+        with transaction.atomic():
+            counter = cls.objects.select_for_update().filter(scope=scope).first()
+            if counter is None:
+                cls.objects.get_or_create(scope=scope, defaults={"value": seed() if seed else 0})
+                counter = cls.objects.select_for_update().get(scope=scope)
+            counter.value += 1
+            counter.save(update_fields=["value"])
+            return counter.value
+
+    def __str__(self):
+        return f"{self.scope}={self.value}"
+
+
 class Property(models.Model):
     STATUS_CHOICES = [
         ("draft", "Draft"),
@@ -113,21 +149,64 @@ class Property(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
     moderation_flags = models.JSONField(blank=True, null=True)
-    embedding = models.BinaryField(blank=True, null=True)  # pgvector later
+    embedding = models.BinaryField(blank=True, null=True)  # packed float32, see services/embeddings.py
     property_id = models.CharField(max_length=10, null=True, editable=False, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)  # see services/search.py
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["broker", "property_id"], name="property_broker_property_id_uniq"),
+        ]
+        indexes = [
+            # Listings: filter(broker=..., status=...).order_by("-created_at").
+            models.Index(fields=["broker", "status", "-created_at"], name="property_broker_status_idx"),
+            # Listings without a status filter.
+            models.Index(fields=["broker", "-created_at"], name="property_broker_created_idx"),
+            # city__iexact compiles to UPPER(city) on Postgres.
+            models.Index(models.F("broker"), Upper("city"), name="property_broker_city_idx"),
+            GinIndex(fields=["search_vector"], name="property_search_idx"),
+            # Typo fallback of the text search.
+            GinIndex(OpClass("title", name="gin_trgm_ops"), name="property_title_trgm_idx"),
+            GinIndex(OpClass("locality", name="gin_trgm_ops"), name="property_locality_trgm_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.property_id:
-            count = Property.objects.filter(broker= self.broker).count() + 1
-            self.property_id = f"{count}"
+            self.property_id = str(IdCounter.next(f"property:{self.broker_id}", seed=self._last_property_id))
 
         if not self.short_code:
-            city_code = (self.city[:3] if self.city else "XXX").upper()
-            bhk_code = f"{self.bhk}BHK" if self.bhk else "NA"
-            count = Property.objects.count() + 1
-            self.short_code = f"KD-{city_code}-{bhk_code}-{count:05d}"
+            self.short_code = self.build_short_code(IdCounter.next("short_code", seed=Property._last_short_code))
+
+        # Store choice keys so list filters can match exactly ("Semi-Furnished" -> "semi").
+        self.furnishing = filters.furnishing_choice(self.furnishing) or self.furnishing
+        self.sale_or_rent = filters.sale_or_rent_choice(self.sale_or_rent) or self.sale_or_rent
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or set(update_fields) & set(embeddings.EMBEDDING_FIELDS):
+            self.embedding = embeddings.embed_property(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = [*update_fields, "embedding"]
         super().save(*args, **kwargs)
 
+    def _last_property_id(self):
+        ids = Property.objects.filter(broker_id=self.broker_id).values_list("property_id", flat=True)
+        return max((int(i) for i in ids if i and i.isdigit()), default=0)
+
+    @staticmethod
+    def _last_short_code():
+        codes = Property.objects.exclude(short_code=None).values_list("short_code", flat=True)
+        return max((int(c.rsplit("-", 1)[-1]) for c in codes if c.rsplit("-", 1)[-1].isdigit()), default=0)
+
+    def build_short_code(self, number):
+        city_code = (self.city[:3] if self.city else "XXX").upper()
+        bhk_code = f"{self.bhk}BHK" if self.bhk else "NA"
+        return f"KD-{city_code}-{bhk_code}-{number:05d}"
+
+    def refresh_short_code(self):
+        """Re-derives the city/BHK part once they are known, keeping the number."""
+        if self.short_code:
+            self.short_code = self.build_short_code(int(self.short_code.rsplit("-", 1)[-1]))
+
     def __str__(self):
         return f"{self.title or 'Property'} - {self.city or ''}"
 
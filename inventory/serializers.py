@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from rest_framework import serializers
 from .models import Broker, Property, MediaAsset, ClientRequest
 
@@ -42,7 +44,31 @@ class MediaAssetSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer limited to the fields named by a `fields` argument or, on
+    GET, the request's ?fields=title,city,price.
+    """
+
+    def __init__(self, *args, **kwargs):
+        wanted = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if wanted is None and request is not None and request.method == "GET":
+            wanted = request.query_params.get("fields")
+        if wanted:
+            wanted = split_fields(wanted)
+            for name in [name for name in self.fields if name not in wanted]:
+                self.fields.pop(name)
+
+
+def split_fields(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    return [name.strip() for name in value if name.strip()]
+
+
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     media = MediaAssetSerializer(many=True, read_only=True)
 
     class Meta:
@@ -51,6 +77,7 @@ class PropertySerializer(serializers.ModelSerializer):
             "id",
             "broker",
             "short_code",
+            "property_id",
             "title",
             "description_raw",
             "description_beautified",
@@ -74,7 +101,6 @@ class PropertySerializer(serializers.ModelSerializer):
             "source_broker_phone",
             "status",
             "moderation_flags",
-            "embedding",
             "created_at",
             "updated_at",
             "media",
@@ -82,6 +108,55 @@ class PropertySerializer(serializers.ModelSerializer):
         read_only_fields = ["short_code", "created_at", "updated_at"]
 
 
+# Property list endpoints render .values() rows instead of model instances:
+# no model construction, no media prefetch, and only the columns asked for.
+# Values go through the PropertySerializer fields' to_representation, so a
+# row looks the same as the serializer's output for those fields.
+PROPERTY_LIST_FIELDS = [
+    "id", "broker", "short_code", "property_id", "title", "city", "locality", "bhk", "furnishing",
+    "sale_or_rent", "price", "currency", "deposit", "status", "created_at", "updated_at",
+]
+
+
+def property_list_fields(value=None):
+    """The ?fields= selection for a property list, or the compact default. Unknown names are a 400."""
+    if not value:
+        return PROPERTY_LIST_FIELDS
+    fields = split_fields(value)
+    known = set(PropertySerializer.Meta.fields)
+    unknown = [name for name in fields if name not in known]
+    if unknown:
+        raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+    return fields
+
+
+@lru_cache(maxsize=64)
+def _row_converters(fields):
+    declared = PropertySerializer().fields
+    converters = []
+    for name in fields:
+        field = declared.get(name)
+        # Related fields take the pk as it comes; the renderer formats it.
+        if field is None or isinstance(field, serializers.RelatedField):
+            converters.append((name, None))
+        else:
+            converters.append((name, field.to_representation))
+    return converters
+
+
+def property_rows(rows, fields):
+    """Serialize Property .values() rows (dicts) to the given fields."""
+    converters = _row_converters(tuple(fields))
+    data = []
+    for row in rows:
+        item = {}
+        for name, convert in converters:
+            value = row[name]
+            item[name] = value if convert is None or value is None else convert(value)
+        data.append(item)
+    return data
+
+
 class ClientRequestSerializer(serializers.ModelSerializer):
     broker = BrokerSerializer(read_only=True)
 
@@ -1,9 +1,17 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from typing import Optional, Dict, List
+from .command_parser import parse_user_command, parse_customer_command
+from .intent_cache import IntentCache, prompt_version
+from .intent_model import local_intent, log_llm_label
+from .llm_router import get_router, routed_model
+from . import intent_batcher, registry
+from .intent_batcher import IntentBatcher, numbered
 import os
+import time
+
+# Prompts, parsers and chains are registry entries built on first use, so
+# importing this module stays cheap. Tests and the load harness swap the
+# chains by patching registry.instances().
 
 class UserIntent(BaseModel):
     action: str = Field(
@@ -23,16 +31,7 @@ class UserIntent(BaseModel):
         description="The target customer phone number when broker shares multiple properties."
     )
 
-model = ChatGroq(
-    model = "llama-3.3-70b-versatile",
-    temperature = 0
-)
-
-parser = PydanticOutputParser(pydantic_object=UserIntent)
-
-prompt = PromptTemplate(
-    template=(
-        """
+USER_TEMPLATE = """
         You are an intent classifier for a real estate WhatsApp bot.
         User message: {user_msg}\n\n
         Decide what the user wants.
@@ -59,37 +58,96 @@ prompt = PromptTemplate(
         If the broker message includes 'to +91...' treat it as share_all_to_client and extract client_number.
         Output in JSON following this schema:\n{format_instructions}
         """
-    ),
-    input_variables=["user_msg"],
-    partial_variables={"format_instructions": parser.get_format_instructions()},
+
+BATCH_INSTRUCTIONS = (
+    "User messages, one per numbered line:\n{user_msgs}\n"
+    "Classify each message on its own and return one result per message, in order."
 )
 
 
-chain = prompt | model | parser
+class UserIntentBatch(BaseModel):
+    results: List[UserIntent] = Field(..., description="One intent per numbered message, in the same order.")
+
+
+def _register_chain(name, template, schema, variable):
+    def build_parser():
+        from langchain.output_parsers import PydanticOutputParser
+        return PydanticOutputParser(pydantic_object=schema)
+
+    def build_prompt():
+        from langchain.prompts import PromptTemplate
+        return PromptTemplate(
+            template=template,
+            input_variables=[variable],
+            partial_variables={"format_instructions": registry.get(f"{name}.parser").get_format_instructions()},
+        )
+
+    registry.register(f"{name}.parser", build_parser)
+    registry.register(f"{name}.prompt", build_prompt)
+    registry.register(
+        f"{name}.chain",
+        lambda: registry.get(f"{name}.prompt") | registry.get("intent.llm") | registry.get(f"{name}.parser"),
+    )
+
+
+def _version(name, template):
+    return lambda: prompt_version(
+        template, registry.get(f"{name}.parser").get_format_instructions(), get_router().signature()
+    )
+
+
+registry.register("intent.llm", lambda: routed_model(temperature=0))
+_register_chain("intent.user", USER_TEMPLATE, UserIntent, "user_msg")
+_register_chain(
+    "intent.user_batch",
+    USER_TEMPLATE.replace("User message: {user_msg}", BATCH_INSTRUCTIONS),
+    UserIntentBatch,
+    "user_msgs",
+)
+
+user_batcher = IntentBatcher(
+    "user",
+    single=lambda text: registry.get("intent.user.chain").invoke({"user_msg": text}),
+    batch=lambda texts: registry.get("intent.user_batch.chain").invoke({"user_msgs": numbered(texts)}).results,
+)
+
+intent_cache = IntentCache("user", _version("intent.user", USER_TEMPLATE))
 
 def classify_intent(user_msg : str) -> UserIntent:
-    result = chain.invoke({"user_msg": user_msg})
+    command = parse_user_command(user_msg)
+    if command:
+        return UserIntent(**command)
+    cached = intent_cache.get(user_msg)
+    if cached is not None:
+        return UserIntent(**cached)
+    local = local_intent("user", user_msg)
+    if local:
+        return UserIntent(**local)
+    started = time.perf_counter()
+    if intent_batcher.ENABLED:
+        result = user_batcher.submit(user_msg)
+    else:
+        result = registry.get("intent.user.chain").invoke({"user_msg": user_msg})
+    intent_cache.put(user_msg, result.model_dump(), (time.perf_counter() - started) * 1000)
+    log_llm_label("user", user_msg, result.model_dump())
     return result
 
 
 ##for customer
 
 class CustomerIntent(BaseModel):
-    action: str = Field(..., description="The action the customer wants to perform. Possible values: list_properties, view_property, contact_broker, help.")
+    action: str = Field(..., description="The action the customer wants to perform. Possible values: list_properties, search_properties, view_property, contact_broker, help.")
     property_id: Optional[str] = Field(None, description="The unique ID of the property if the customer explicitly refers to one. Required for view_property and contact_broker.")
-    filters: Optional[dict] = Field(default_factory=dict, description="Search filters when listing properties, such as {'city': 'Mumbai'}.")
-
+    filters: Optional[dict] = Field(default_factory=dict, description="Search filters when listing properties, such as {'city': 'Mumbai'}, or {'query': ...} for search_properties.")
 
-customer_parser = PydanticOutputParser(pydantic_object=CustomerIntent)
 
-customer_prompt = PromptTemplate(
-    template=(
-        """
+CUSTOMER_TEMPLATE = """
         You are an intent classifier for a customer-facing real estate WhatsApp bot.
         User message: {user_msg}\n\n
         Decide what the user wants.
         Possible actions:\n
         - list_properties (with optional filters like city, price, bhk)\n
+        - search_properties (free-text description of what they want, in filters["query"])\n
         - view_property (requires property_id)\n
         - help\n\n
 
@@ -97,18 +155,52 @@ customer_prompt = PromptTemplate(
         but didn't use keywords 'view' or 'list', classify as 'list_properties'
         and extract filters such as city, price, bhk from the text.
 
+        If they describe the home in their own words beyond city, price and bhk
+        (e.g. 'quiet 2bhk near metro with gym'), classify as 'search_properties'
+        and put their description in filters["query"].
+
         If the user explicitly gives a property ID like 'view 123',
         classify as 'view_property' and set property_id.
 
         Output in JSON following this schema:\n{format_instructions}
         """
-    ),
-    input_variables=["user_msg"],
-    partial_variables={"format_instructions": customer_parser.get_format_instructions()},
+
+
+class CustomerIntentBatch(BaseModel):
+    results: List[CustomerIntent] = Field(..., description="One intent per numbered message, in the same order.")
+
+
+_register_chain("intent.customer", CUSTOMER_TEMPLATE, CustomerIntent, "user_msg")
+_register_chain(
+    "intent.customer_batch",
+    CUSTOMER_TEMPLATE.replace("User message: {user_msg}", BATCH_INSTRUCTIONS),
+    CustomerIntentBatch,
+    "user_msgs",
+)
+
+customer_batcher = IntentBatcher(
+    "customer",
+    single=lambda text: registry.get("intent.customer.chain").invoke({"user_msg": text}),
+    batch=lambda texts: registry.get("intent.customer_batch.chain").invoke({"user_msgs": numbered(texts)}).results,
 )
 
-customer_chain = customer_prompt | model | customer_parser
+customer_intent_cache = IntentCache("customer", _version("intent.customer", CUSTOMER_TEMPLATE))
 
 def classify_customer_intent(user_msg: str)-> CustomerIntent:
-    result = customer_chain.invoke({"user_msg": user_msg})
+    command = parse_customer_command(user_msg)
+    if command:
+        return CustomerIntent(**command)
+    cached = customer_intent_cache.get(user_msg)
+    if cached is not None:
+        return CustomerIntent(**cached)
+    local = local_intent("customer", user_msg)
+    if local:
+        return CustomerIntent(**local)
+    started = time.perf_counter()
+    if intent_batcher.ENABLED:
+        result = customer_batcher.submit(user_msg)
+    else:
+        result = registry.get("intent.customer.chain").invoke({"user_msg": user_msg})
+    customer_intent_cache.put(user_msg, result.model_dump(), (time.perf_counter() - started) * 1000)
+    log_llm_label("customer", user_msg, result.model_dump())
     return result
\ No newline at end of file
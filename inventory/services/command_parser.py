@@ -0,0 +1,101 @@
+import re
+
+# Exact-command grammar checked before the LLM intent classifier. Anything
+# that is not an unambiguous command returns None and goes to the model.
+# Results are plain dicts of UserIntent/CustomerIntent fields.
+
+_TRAILING = r"[\s.!]*$"
+
+_NO_ARG_COMMANDS = [
+    (re.compile(r"^help" + _TRAILING, re.I), "help"),
+    (re.compile(r"^(?:my\s+)?profile" + _TRAILING, re.I), "profile"),
+    (re.compile(r"^edit\s*profile" + _TRAILING, re.I), "editprofile"),
+    (re.compile(r"^bot\s*(?:url|link)" + _TRAILING, re.I), "boturl"),
+]
+
+_LIST = re.compile(r"^list(?:\s+(?:page\s+)?(\d{1,4}))?" + _TRAILING, re.I)
+# Continues the sender's last listing (see services/pagination.py).
+_NEXT = re.compile(r"^(?:next|more)(?:\s+page)?" + _TRAILING, re.I)
+
+_ID_COMMAND = re.compile(
+    r"^(view|show|share|edit|delete|remove|activate|enable|disable)\s+(?:property\s+)?#?\[?(\d{1,9})\]?" + _TRAILING,
+    re.I,
+)
+
+_ID_ACTIONS = {
+    "view": "view_property",
+    "show": "view_property",
+    "share": "share_property",
+    "edit": "edit_property",
+    "delete": "delete_property",
+    "remove": "delete_property",
+    "activate": "activate_property",
+    "enable": "activate_property",
+    "disable": "disable_property",
+}
+
+_CUSTOMER_HELP = re.compile(r"^help" + _TRAILING, re.I)
+_CUSTOMER_VIEW = re.compile(r"^(?:view|show)\s+(?:property\s+)?#?\[?(\d{1,9})\]?" + _TRAILING, re.I)
+_CUSTOMER_SEARCH = re.compile(r"^(?:search|find)\s+(?:for\s+)?(.{3,})$", re.I)
+_CUSTOMER_LIST_CITY = re.compile(r"^list\s+(?:in\s+)?([a-z]+(?:\s[a-z]+)?)" + _TRAILING, re.I)
+
+# "list <city>" only when the word(s) cannot be anything but a place.
+_NOT_A_CITY = {
+    "all", "any", "my", "the", "flat", "flats", "home", "homes", "house", "houses",
+    "property", "properties", "apartment", "apartments", "villa", "villas", "plot", "plots",
+    "rent", "rental", "sale", "buy", "cheap", "more", "next", "available", "active",
+    "furnished", "unfurnished", "semi", "studio", "office", "shop", "shops", "in", "near",
+}
+
+
+def parse_user_command(msg):
+    text = (msg or "").strip()
+    if not text or len(text) > 60:
+        return None
+
+    for pattern, action in _NO_ARG_COMMANDS:
+        if pattern.match(text):
+            return {"action": action}
+
+    match = _LIST.match(text)
+    if match:
+        return {"action": "list_properties", "filters": {"page": int(match.group(1) or 1)}}
+
+    if _NEXT.match(text):
+        return {"action": "list_properties", "filters": {"next": True}}
+
+    match = _ID_COMMAND.match(text)
+    if match:
+        return {"action": _ID_ACTIONS[match.group(1).lower()], "property_id": match.group(2)}
+
+    return None
+
+
+def parse_customer_command(msg):
+    text = (msg or "").strip()
+    if not text or len(text) > 60:
+        return None
+
+    if _CUSTOMER_HELP.match(text):
+        return {"action": "help"}
+
+    match = _LIST.match(text)
+    if match:
+        return {"action": "list_properties", "filters": {"page": int(match.group(1) or 1)}}
+
+    if _NEXT.match(text):
+        return {"action": "list_properties", "filters": {"next": True}}
+
+    match = _CUSTOMER_SEARCH.match(text)
+    if match:
+        return {"action": "search_properties", "filters": {"query": match.group(1).strip()}}
+
+    match = _CUSTOMER_LIST_CITY.match(text)
+    if match and not _NOT_A_CITY.intersection(match.group(1).lower().split()):
+        return {"action": "list_properties", "filters": {"city": match.group(1).strip().title()}}
+
+    match = _CUSTOMER_VIEW.match(text)
+    if match:
+        return {"action": "view_property", "property_id": match.group(1)}
+
+    return None
@@ -0,0 +1,175 @@
+import contextvars
+import logging
+import time
+from datetime import datetime, timezone
+
+from inventory.services.redis_setup import redis_client
+
+# Correlates Meta status callbacks (sent/delivered/read/failed) with the
+# message ids returned when we send, and keeps hourly latency histograms:
+#   dlat:<YYYYMMDDHH>            field "<stage>:<type>:<tag>:<bucket>"
+#   dlat:b:<broker>:<YYYYMMDDHH> field "<stage>:<type>:<bucket>"
+# stage is the time from queueing the send to that status, type is
+# text/image/video and tag is the command that caused the send.
+
+OUTBOUND_TTL = 3 * 86400
+SERIES_TTL = 14 * 86400
+BUCKETS_MS = [250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 300000]
+STAGES = {"sent": "s", "delivered": "d", "read": "r"}
+
+_context = contextvars.ContextVar("delivery_context", default={})
+
+
+def set_delivery_context(broker_id=None, tag=None):
+    """Attributes the sends that follow to a broker and command."""
+    _context.set({"broker": str(broker_id) if broker_id else "", "tag": tag or ""})
+
+
+def update_delivery_context(**kwargs):
+    ctx = dict(_context.get())
+    for key, value in kwargs.items():
+        ctx[key] = str(value) if value else ""
+    _context.set(ctx)
+
+
+def _bucket(ms):
+    for bound in BUCKETS_MS:
+        if ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+def _hour(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d%H")
+
+
+def record_outbound(response_json, msg_type, queued_at):
+    try:
+        wamid = response_json["messages"][0]["id"]
+    except (KeyError, IndexError, TypeError):
+        return
+    ctx = _context.get()
+    key = f"out:{wamid}"
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hset(key, mapping={
+            "q": round(queued_at, 3),
+            "t": msg_type,
+            "b": ctx.get("broker", ""),
+            "g": ctx.get("tag", ""),
+        })
+        pipe.expire(key, OUTBOUND_TTL)
+        pipe.execute()
+    except Exception:
+        logging.exception("Failed to record outbound message")
+
+
+def ingest_statuses(statuses):
+    """
+    Bulk-ingests Meta status callbacks: one round trip to look up the sends,
+    one to write stage timestamps and histogram counts.
+    """
+    statuses = [s for s in statuses if s.get("id") and s.get("status")]
+    if not statuses:
+        return 0
+
+    read_pipe = redis_client.pipeline()
+    for status in statuses:
+        read_pipe.hgetall(f"out:{status['id']}")
+    sends = read_pipe.execute()
+
+    write_pipe = redis_client.pipeline()
+    ingested = 0
+    for status, sent in zip(statuses, sends):
+        if not sent:
+            continue
+        state = status["status"]
+        ts = float(status.get("timestamp") or time.time())
+        hour = _hour(float(sent["q"]))
+        series = f"dlat:{hour}"
+        broker_series = f"dlat:b:{sent['b']}:{hour}" if sent.get("b") else None
+        msg_type = sent.get("t", "text")
+        tag = sent.get("g") or "-"
+
+        if state == "failed":
+            write_pipe.hincrby(series, f"failed:{msg_type}:{tag}:n", 1)
+            write_pipe.expire(series, SERIES_TTL)
+            ingested += 1
+            continue
+
+        stage_field = STAGES.get(state)
+        # Meta can repeat a status; only the first one counts.
+        if not stage_field or stage_field in sent:
+            continue
+        write_pipe.hset(f"out:{status['id']}", stage_field, ts)
+        sent[stage_field] = ts
+
+        latency_ms = max(ts - float(sent["q"]), 0) * 1000
+        bucket = _bucket(latency_ms)
+        write_pipe.hincrby(series, f"{state}:{msg_type}:{tag}:{bucket}", 1)
+        write_pipe.hincrbyfloat(series, f"{state}:{msg_type}:{tag}:sum", latency_ms)
+        write_pipe.expire(series, SERIES_TTL)
+        if broker_series:
+            write_pipe.hincrby(broker_series, f"{state}:{msg_type}:{bucket}", 1)
+            write_pipe.hincrbyfloat(broker_series, f"{state}:{msg_type}:sum", latency_ms)
+            write_pipe.expire(broker_series, SERIES_TTL)
+        ingested += 1
+    write_pipe.execute()
+    return ingested
+
+
+def _percentile(histogram, total, pct):
+    target = total * pct / 100
+    seen = 0
+    for bound in [str(b) for b in BUCKETS_MS] + ["inf"]:
+        seen += histogram.get(bound, 0)
+        if seen >= target:
+            return bound
+    return "inf"
+
+
+def latency_report(hours=24, broker_id=None, now=None):
+    """
+    Summarizes queued->sent/delivered/read latency over the last hours.
+    Percentiles are histogram bucket upper bounds in ms.
+    """
+    now = now or time.time()
+    keys = [
+        f"dlat:b:{broker_id}:{_hour(now - h * 3600)}" if broker_id else f"dlat:{_hour(now - h * 3600)}"
+        for h in range(hours)
+    ]
+    pipe = redis_client.pipeline()
+    for key in keys:
+        pipe.hgetall(key)
+
+    groups = {}
+    failed = {}
+    for series in pipe.execute():
+        for field, value in series.items():
+            parts = field.split(":")
+            stage, msg_type, last = parts[0], parts[1], parts[-1]
+            tag = parts[2] if len(parts) == 4 else None
+            if stage == "failed":
+                failed[msg_type] = failed.get(msg_type, 0) + int(value)
+                continue
+            group = groups.setdefault((stage, msg_type, tag), {"hist": {}, "sum": 0.0})
+            if last == "sum":
+                group["sum"] += float(value)
+            else:
+                group["hist"][last] = group["hist"].get(last, 0) + int(value)
+
+    rows = []
+    for (stage, msg_type, tag), group in sorted(groups.items(), key=lambda g: (g[0][0], g[0][1], g[0][2] or "")):
+        total = sum(group["hist"].values())
+        if not total:
+            continue
+        rows.append({
+            "stage": f"queued->{stage}",
+            "type": msg_type,
+            "command": tag,
+            "count": total,
+            "mean_ms": round(group["sum"] / total, 1),
+            "p50_ms": _percentile(group["hist"], total, 50),
+            "p95_ms": _percentile(group["hist"], total, 95),
+        })
+    return {"hours": hours, "broker": broker_id, "latency": rows, "failed": failed}
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import math
+import re
+import zlib
+
+import numpy as np
+
+from inventory.services.listing_rules import pre_extract
+from inventory.services.redis_setup import redis_client
+
+# Near-duplicate listing index: MinHash signatures of a listing's word
+# shingles plus its key fields (city, bhk, price and area buckets), bucketed
+# with LSH so a lookup reads a fixed number of Redis sets instead of
+# comparing against every listing.
+#   dup:{scope}:{band}:{hash}  set of property pks sharing that band
+#   dup:meta:{pk}              signature, broker and band hashes (for removal)
+# scope is "b:<broker_id>" for a broker's own inventory and "all" for the
+# cross-broker index. Listings with (almost) no text would be signed by their
+# key fields alone and pile up in the same "all" bands, so they are only
+# indexed per broker, and a lookup reads at most MAX_BAND_CANDIDATES per band.
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7
+SHINGLE = 3
+MIN_WORDS = 5
+MAX_BAND_CANDIDATES = 50
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _field_tokens(fields):
+    tokens = []
+    if fields.get("city"):
+        tokens.append(f"city:{str(fields['city']).lower()}")
+    if fields.get("bhk"):
+        tokens.append(f"bhk:{fields['bhk']}")
+    # Log-scale buckets so 25000 and 26000 land together, 25000 and 50000 do not.
+    if fields.get("price"):
+        tokens.append(f"price:{round(math.log(float(fields['price']), 1.1))}")
+    if fields.get("area_sqft"):
+        tokens.append(f"area:{round(math.log(float(fields['area_sqft']), 1.1))}")
+    return tokens
+
+
+def shingles(text, fields=None):
+    words = _WORD.findall((text or "").lower())
+    grams = {" ".join(words[i:i + SHINGLE]) for i in range(max(len(words) - SHINGLE + 1, 1))} if words else set()
+    # Key fields are repeated so they weigh about as much as the free text.
+    return list(grams) + [f"{t}#{copy}" for t in _field_tokens(fields or {}) for copy in range(3)]
+
+
+def signature(tokens):
+    if not tokens:
+        return None
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) & 0x7FFFFFFF for t in tokens), dtype=np.uint64, count=len(tokens))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _bands(sig):
+    return [
+        hashlib.blake2b(sig[i * ROWS:(i + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def _has_text(text):
+    return len(_WORD.findall((text or "").lower())) >= MIN_WORDS
+
+
+def _property_text(prop):
+    return prop.description_raw or prop.description_beautified or ""
+
+
+def _property_signature(prop):
+    fields = {"city": prop.city, "bhk": prop.bhk, "price": prop.price, "area_sqft": prop.area_sqft}
+    return signature(shingles(_property_text(prop), fields))
+
+
+def index_property(prop):
+    """Adds or refreshes a property in its broker's and the global index."""
+    sig = _property_signature(prop)
+    pk = str(prop.pk)
+    old = redis_client.hgetall(f"dup:meta:{pk}")
+    pipe = redis_client.pipeline()
+    if old:
+        _remove_bands(pipe, pk, old)
+    if sig is None:
+        pipe.delete(f"dup:meta:{pk}")
+        pipe.execute()
+        return
+    bands = _bands(sig)
+    scopes = (f"b:{prop.broker_id}", "all") if _has_text(_property_text(prop)) else (f"b:{prop.broker_id}",)
+    for i, band in enumerate(bands):
+        for scope in scopes:
+            pipe.sadd(f"dup:{scope}:{i}:{band}", pk)
+    pipe.hset(f"dup:meta:{pk}", mapping={"sig": sig.tobytes().hex(), "broker": str(prop.broker_id), "bands": ",".join(bands)})
+    pipe.execute()
+
+
+def _remove_bands(pipe, pk, meta):
+    for i, band in enumerate((meta.get("bands") or "").split(",")):
+        if band:
+            pipe.srem(f"dup:b:{meta.get('broker')}:{i}:{band}", pk)
+            pipe.srem(f"dup:all:{i}:{band}", pk)
+
+
+def remove_property(pk):
+    pk = str(pk)
+    meta = redis_client.hgetall(f"dup:meta:{pk}")
+    if not meta:
+        return
+    pipe = redis_client.pipeline()
+    _remove_bands(pipe, pk, meta)
+    pipe.delete(f"dup:meta:{pk}")
+    pipe.execute()
+
+
+def find_similar(description, broker_id=None, fields=None, exclude=None, threshold=THRESHOLD, limit=3):
+    """
+    [(pk, estimated_similarity)] of indexed listings that look like this
+    description, best first. Searches one broker's listings when broker_id
+    is given, otherwise the whole inventory. Key fields are read from the
+    text with the listing rules unless passed in.
+    """
+    if fields is None:
+        fields = pre_extract(description)
+    sig = signature(shingles(description, fields))
+    if sig is None:
+        return []
+    if not broker_id and not _has_text(description):
+        return []
+    scope = f"b:{broker_id}" if broker_id else "all"
+    try:
+        pipe = redis_client.pipeline()
+        for i, band in enumerate(_bands(sig)):
+            pipe.srandmember(f"dup:{scope}:{i}:{band}", MAX_BAND_CANDIDATES)
+        candidates = set().union(*pipe.execute())
+        candidates.discard(str(exclude) if exclude else None)
+        if not candidates:
+            return []
+        candidates = list(candidates)
+        pipe = redis_client.pipeline()
+        for pk in candidates:
+            pipe.hget(f"dup:meta:{pk}", "sig")
+        stored = pipe.execute()
+    except Exception:
+        logging.exception("Duplicate lookup failed")
+        return []
+
+    matches = []
+    for pk, hex_sig in zip(candidates, stored):
+        if not hex_sig:
+            continue
+        other = np.frombuffer(bytes.fromhex(hex_sig), dtype=np.uint32)
+        score = float((other == sig).mean())
+        if score >= threshold:
+            matches.append((pk, round(score, 2)))
+    matches.sort(key=lambda m: -m[1])
+    return matches[:limit]
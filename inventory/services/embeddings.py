@@ -0,0 +1,82 @@
+import json
+import os
+import re
+
+import numpy as np
+
+from inventory.services import registry
+
+# Listing embeddings from hashed word and character n-grams: no model file,
+# no external service, the same vector for the same text in every process.
+# Stored in Property.embedding as DIM little-endian float32 values,
+# L2-normalized so a dot product is the cosine similarity.
+
+DIM = int(os.getenv("EMBEDDING_DIM", 192))
+
+# Fields that make up the embedded text; saving any of them re-embeds.
+EMBEDDING_FIELDS = (
+    "title", "description_raw", "description_beautified", "city", "locality",
+    "bhk", "furnishing", "amenities", "sale_or_rent",
+)
+
+_BHK = re.compile(r"\b(\d)\s*(bhk|rk)\b", re.I)
+_CHAR_WEIGHT = 0.5
+
+
+def _vectorizers():
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    words = HashingVectorizer(n_features=DIM, ngram_range=(1, 2), stop_words="english", norm="l2")
+    # Character n-grams absorb spelling variants ("gymnasium", "semi-furnishd").
+    chars = HashingVectorizer(n_features=DIM, analyzer="char_wb", ngram_range=(3, 4), norm="l2")
+    return words, chars
+
+
+registry.register("embeddings.vectorizers", _vectorizers)
+
+
+def _normalize(text):
+    return _BHK.sub(lambda m: f"{m.group(1)}{m.group(2).lower()}", (text or "").lower())
+
+
+def embed(text):
+    """Unit-length float32 vector of DIM values (all zeros for empty text)."""
+    words, chars = registry.get("embeddings.vectorizers")
+    text = _normalize(text)
+    vec = (words.transform([text]) + _CHAR_WEIGHT * chars.transform([text])).toarray()[0].astype(np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def property_text(prop):
+    amenities = prop.amenities
+    if isinstance(amenities, (list, tuple)):
+        amenities = " ".join(str(a) for a in amenities)
+    elif isinstance(amenities, dict):
+        amenities = json.dumps(amenities)
+    parts = [
+        prop.title,
+        f"{prop.bhk}bhk" if prop.bhk else None,
+        prop.furnishing and f"{prop.furnishing} furnished",
+        prop.sale_or_rent and f"for {prop.sale_or_rent}",
+        prop.locality,
+        prop.city,
+        amenities,
+        prop.description_beautified or prop.description_raw,
+    ]
+    return " ".join(str(p) for p in parts if p)
+
+
+def pack(vec):
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+def unpack(data):
+    """The stored vector, or None if missing or from a different DIM."""
+    if not data or len(data) != DIM * 4:
+        return None
+    return np.frombuffer(bytes(data), dtype="<f4")
+
+
+def embed_property(prop):
+    return pack(embed(property_text(prop)))
@@ -1,37 +1,126 @@
+import json
+import logging
 import os
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain_core.prompts.chat import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from decimal import Decimal
+from functools import lru_cache
 from .schema import PropertySchema
+from .llm_router import routed_model
+from .listing_rules import MIN_COVERAGE, RULES_VERSION, coverage, pre_extract
+from .intent_cache import prompt_version
+from . import extract_cache
+from .filters import furnishing_choice, sale_or_rent_choice
+from .redis_setup import redis_client
+from . import registry
 from inventory.models import Property, MediaAsset
 from dotenv import load_dotenv
 
 load_dotenv()
 
-model = ChatGroq(
-    model = "llama-3.3-70b-versatile",
-    temperature = 0
-)
 
-parser = PydanticOutputParser(pydantic_object=PropertySchema)
+def _parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=PropertySchema)
 
-prompt = ChatPromptTemplate([
-    ("system", "You are a real estate data normalizer. Extract structured details from broker property descriptions."),
-    ("human", "Description: {description} {format_instructions}\n\nReturn JSON in the format required by PropertySchema.")
-])
 
-chain = prompt | model | parser
+SYSTEM_PROMPT = "You are a real estate data normalizer. Extract structured details from broker property descriptions."
+HUMAN_PROMPT = "Description: {description} {format_instructions}\n\nReturn JSON in the format required by PropertySchema."
 
 
-def extract(broker, description: str, media_urls = None):
-    result = chain.invoke({
+def _prompt():
+    from langchain_core.prompts.chat import ChatPromptTemplate
+    return ChatPromptTemplate([
+        ("system", SYSTEM_PROMPT),
+        ("human", HUMAN_PROMPT)
+    ])
+
+
+registry.register("extract.parser", _parser)
+registry.register("extract.format_instructions", lambda: registry.get("extract.parser").get_format_instructions())
+registry.register("extract.prompt", _prompt)
+registry.register("extract.llm", lambda: registry.get("extract.prompt") | routed_model(temperature=0))
+registry.register("extract.chain", lambda: registry.get("extract.llm") | registry.get("extract.parser"))
+registry.register("extract.version", lambda: prompt_version(
+    SYSTEM_PROMPT, HUMAN_PROMPT, json.dumps(PropertySchema.model_json_schema(), sort_keys=True), RULES_VERSION,
+))
+
+
+@lru_cache(maxsize=256)
+def _partial_parser(missing):
+    """Parser and format instructions for the PropertySchema fields the rules left open."""
+    from pydantic import create_model
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    schema = create_model(
+        "PropertySchemaRest",
+        **{name: (PropertySchema.model_fields[name].annotation, PropertySchema.model_fields[name]) for name in missing},
+    )
+    parser = PydanticOutputParser(pydantic_object=schema)
+    return parser, parser.get_format_instructions()
+
+
+def _count(field):
+    try:
+        redis_client.hincrby("extract:rules:stats", field, 1)
+    except Exception:
+        pass
+
+
+def extract_fields(description: str) -> PropertySchema:
+    """
+    Reuses the result for a listing seen before, otherwise extracts it and
+    caches the result by the listing's normalized text.
+    """
+    version = registry.get("extract.version")
+    cached = extract_cache.get(version, description)
+    if cached is not None:
+        return PropertySchema(**cached)
+    result = _extract_fields(description)
+    extract_cache.put(version, description, result.model_dump())
+    return result
+
+
+def _extract_fields(description: str) -> PropertySchema:
+    """
+    Fills what the listing rules are sure of and asks the LLM only for the
+    rest. Listings the rules cannot cover well go to the LLM in full.
+    """
+    rules = pre_extract(description)
+    if rules and coverage(rules) >= MIN_COVERAGE:
+        missing = tuple(name for name in PropertySchema.model_fields if name not in rules)
+        parser, instructions = _partial_parser(missing)
+        try:
+            message = registry.get("extract.llm").invoke({
+                "description": description,
+                "format_instructions": instructions,
+            })
+            rest = parser.invoke(message)
+            _count("partial")
+            return PropertySchema(**{**rest.model_dump(), **rules})
+        except Exception:
+            logging.exception("Partial extraction failed, retrying with the full schema")
+            _count("partial_failed")
+
+    _count("full")
+    return registry.get("extract.chain").invoke({
         "description": description,
-        "format_instructions": parser.get_format_instructions()
+        "format_instructions": registry.get("extract.format_instructions")
     })
 
-    property_obj = Property.objects.create(
-        broker=broker,
+
+def extract(broker, description: str, media_urls = None):
+    return create_from_schema(broker, extract_fields(description), media_urls, description_raw=description)
+
+
+EXTRACTED_FIELDS = (
+    "title", "description_beautified", "city", "locality", "bhk", "bathrooms", "area_sqft", "floor",
+    "total_floors", "furnishing", "age_of_property", "sale_or_rent", "price", "currency", "maintenance",
+    "deposit", "amenities", "source", "source_broker_name", "source_broker_phone",
+)
+
+
+def schema_fields(result: PropertySchema):
+    """Property field values for an extraction result."""
+    return dict(
         title=result.title or f"{result.bhk}BHK in {result.city or 'Unknown'}",
         description_beautified=result.description_beautified,
         city=result.city,
@@ -41,9 +130,9 @@ def extract(broker, description: str, media_urls = None):
         area_sqft=result.area_sqft,
         floor=result.floor,
         total_floors=result.total_floors,
-        furnishing=result.furnishing,
+        furnishing=furnishing_choice(result.furnishing) or result.furnishing,
         age_of_property=result.age_of_property,
-        sale_or_rent=result.sale_or_rent or "rent",
+        sale_or_rent=sale_or_rent_choice(result.sale_or_rent) or result.sale_or_rent or "rent",
         price=result.price,
         currency=result.currency,
         maintenance=result.maintenance,
@@ -52,7 +141,45 @@ def extract(broker, description: str, media_urls = None):
         source=result.source,
         source_broker_name=result.source_broker_name,
         source_broker_phone=result.source_broker_phone,
+    )
+
 
+def _comparable(value):
+    if value in (None, "", []):
+        return None
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return str(float(value))
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def field_snapshot(property_obj):
+    """The extractable fields as they are now, to tell later which ones the broker changed."""
+    return {name: _comparable(getattr(property_obj, name)) for name in EXTRACTED_FIELDS}
+
+
+def apply_schema(property_obj, result: PropertySchema, snapshot):
+    """
+    Sets the property's fields from an extraction result, except fields that
+    changed since `snapshot` was taken (the broker edited the draft).
+    Returns the names of the fields changed.
+    """
+    changed = []
+    for name, value in schema_fields(result).items():
+        current = _comparable(getattr(property_obj, name))
+        if value in (None, "", []) or current != snapshot.get(name) or current == _comparable(value):
+            continue
+        setattr(property_obj, name, value)
+        changed.append(name)
+    return changed
+
+
+def create_from_schema(broker, result: PropertySchema, media_urls = None, description_raw = ""):
+    property_obj = Property.objects.create(
+        broker=broker,
+        description_raw=description_raw,
+        **schema_fields(result),
     )
 
     if media_urls:
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+
+from inventory.services.redis_setup import redis_client
+
+# Extraction results keyed by a fingerprint of the normalized listing text,
+# so a listing forwarded across broker groups is only sent to the LLM once.
+#   xcache:<version>:<fingerprint>  PropertySchema JSON
+#   xcache:lru:<version>            zset of fingerprints by last use
+# The version hashes the prompt, schema and rules, so changing any of them
+# starts a fresh cache. Past MAX_ENTRIES the least recently used go.
+
+MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_SIZE", 20000))
+TTL = int(os.getenv("EXTRACT_CACHE_TTL", 30 * 86400))
+MIN_LENGTH = 20
+
+_NOT_WORD = re.compile(r"[^\w₹.]+")
+_SPACES = re.compile(r"\s+")
+# WhatsApp adds these when a message is forwarded or quoted.
+_FORWARD_MARKERS = re.compile(r"^(?:forwarded(?: many times)?|fwd:?)\s*", re.I)
+
+
+def fingerprint(description):
+    text = unicodedata.normalize("NFKC", description or "").lower()
+    text = _FORWARD_MARKERS.sub("", text.strip())
+    text = _SPACES.sub(" ", _NOT_WORD.sub(" ", text)).strip()
+    if len(text) < MIN_LENGTH:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _count(field):
+    try:
+        redis_client.hincrby("xcache:stats", field, 1)
+    except Exception:
+        pass
+
+
+def get(version, description):
+    """Cached PropertySchema fields for this listing text, or None."""
+    fp = fingerprint(description)
+    if not fp:
+        return None
+    try:
+        pipe = redis_client.pipeline()
+        pipe.get(f"xcache:{version}:{fp}")
+        pipe.zadd(f"xcache:lru:{version}", {fp: time.time()}, xx=True)
+        value, _ = pipe.execute()
+    except Exception:
+        logging.exception("Extraction cache lookup failed")
+        return None
+    _count("hit" if value else "miss")
+    return json.loads(value) if value else None
+
+
+def put(version, description, fields):
+    fp = fingerprint(description)
+    if not fp:
+        return
+    lru = f"xcache:lru:{version}"
+    try:
+        pipe = redis_client.pipeline()
+        pipe.set(f"xcache:{version}:{fp}", json.dumps(fields), ex=TTL)
+        pipe.zadd(lru, {fp: time.time()})
+        pipe.zcard(lru)
+        size = pipe.execute()[-1]
+        if size > MAX_ENTRIES:
+            evicted = redis_client.zpopmin(lru, size - MAX_ENTRIES)
+            if evicted:
+                redis_client.delete(*[f"xcache:{version}:{member}" for member, _ in evicted])
+    except Exception:
+        logging.exception("Extraction cache store failed")
+
+
+def stats(version):
+    counts = {k: int(v) for k, v in redis_client.hgetall("xcache:stats").items()}
+    counts["entries"] = redis_client.zcard(f"xcache:lru:{version}")
+    counts["version"] = version
+    return counts
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, Value, When
+from django.db.models.functions import Upper
+
+from inventory.services import inventory_version
+
+# Facet counts (city, bhk, furnishing, sale_or_rent, price bucket) for a
+# filtered set of listings, from one GROUP BY over all five columns whose
+# rows are then summed per facet. The number of groups is bounded by the
+# distinct combinations, not by the number of listings.
+
+FACETS = ("city", "bhk", "furnishing", "sale_or_rent", "price")
+
+# Upper edges; one scale covers monthly rents and sale prices.
+PRICE_BUCKETS = [
+    (10_000, "<10k"),
+    (20_000, "10k-20k"),
+    (30_000, "20k-30k"),
+    (50_000, "30k-50k"),
+    (100_000, "50k-1L"),
+    (5_000_000, "1L-50L"),
+    (10_000_000, "50L-1Cr"),
+    (20_000_000, "1Cr-2Cr"),
+    (50_000_000, "2Cr-5Cr"),
+]
+TOP_BUCKET = "5Cr+"
+
+
+def _price_bucket():
+    return Case(
+        *[When(price__lt=Decimal(edge), then=Value(label)) for edge, label in PRICE_BUCKETS],
+        When(price__isnull=False, then=Value(TOP_BUCKET)),
+        default=Value(None),
+        output_field=CharField(),
+    )
+
+
+def _bucket_order(label):
+    labels = [label for _, label in PRICE_BUCKETS] + [TOP_BUCKET]
+    return labels.index(label) if label in labels else len(labels)
+
+
+def facet_counts(qs):
+    """{"city": [{"value": "Pune", "count": 12}, ...], "bhk": [...], ..., "total": n}"""
+    rows = (
+        qs.order_by().select_related(None).prefetch_related(None)
+        .annotate(city_key=Upper("city"), price_bucket=_price_bucket())
+        .values("city_key", "bhk", "furnishing", "sale_or_rent", "price_bucket")
+        .annotate(n=Count("id"))
+    )
+    counts = {facet: {} for facet in FACETS}
+    total = 0
+    for row in rows:
+        total += row["n"]
+        for facet, value in (
+            ("city", row["city_key"].title() if row["city_key"] else None),
+            ("bhk", row["bhk"]),
+            ("furnishing", row["furnishing"]),
+            ("sale_or_rent", row["sale_or_rent"]),
+            ("price", row["price_bucket"]),
+        ):
+            if value is not None:
+                counts[facet][value] = counts[facet].get(value, 0) + row["n"]
+
+    result = {}
+    for facet, values in counts.items():
+        if facet == "price":
+            ordered = sorted(values.items(), key=lambda item: _bucket_order(item[0]))
+        elif facet == "bhk":
+            ordered = sorted(values.items())
+        else:
+            ordered = sorted(values.items(), key=lambda item: (-item[1], str(item[0])))
+        result[facet] = [{"value": value, "count": count} for value, count in ordered]
+    result["total"] = total
+    return result
+
+
+def cached_facet_counts(broker_id, qs, key=None):
+    """facet_counts(qs), recomputed only after the broker's inventory changes."""
+    return inventory_version.cached(broker_id, "facets", key or qs.query, lambda: facet_counts(qs))
@@ -0,0 +1,184 @@
+import re
+from dataclasses import asdict, dataclass, fields
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from inventory.services import search
+from inventory.services.listing_rules import parse_amount
+
+# One filter compiler for every listing path: the LLM's `filters` dict
+# (WhatsApp list/share, customer bot) and the API's query params both go
+# through compile_filters() into a FilterSpec with canonical values (model
+# choice keys, amounts in rupees), and apply() turns a spec into ORM filters
+# on indexed expressions (exact matches, UPPER(city)). A spec is immutable
+# and hashable, and cache_key() is stable, so it doubles as a cache key.
+
+FURNISHING_ALIASES = {
+    "fully": "fully", "full": "fully", "furnished": "fully", "fully furnished": "fully", "ff": "fully",
+    "semi": "semi", "semi furnished": "semi", "semifurnished": "semi",
+    "unfurnished": "unfurnished", "un furnished": "unfurnished", "not furnished": "unfurnished",
+    "non furnished": "unfurnished", "bare": "unfurnished", "bare shell": "unfurnished",
+}
+
+SALE_OR_RENT_ALIASES = {
+    "sale": "sale", "for sale": "sale", "buy": "sale", "resale": "sale", "sell": "sale",
+    "rent": "rent", "for rent": "rent", "rental": "rent", "lease": "rent",
+}
+
+STATUS_ALIASES = {
+    "active": "active", "enabled": "active", "draft": "draft", "archived": "archived",
+    "disabled": "disabled", "disable": "disabled", "inactive": "disabled",
+}
+
+_PRICE = re.compile(r"^\s*(<=|>=|<|>|=|under|below|upto|up to|above|over|max|min)?\s*(.+?)\s*$", re.I)
+_RANGE = re.compile(r"^\s*(.+?)\s*(?:-|to)\s*(.+?)\s*$", re.I)
+_BHK = re.compile(r"^\s*(\d{1,2})\s*(?:bhk|rk|bed(?:room)?s?)?\s*$", re.I)
+
+
+def _alias(aliases, value):
+    if value in (None, ""):
+        return None
+    key = re.sub(r"[\s_-]+", " ", str(value).strip().lower())
+    return aliases.get(key) or aliases.get(key.replace(" ", ""))
+
+
+def furnishing_choice(value):
+    """'Semi-Furnished' -> 'semi', 'not furnished' -> 'unfurnished'; None if unknown."""
+    return _alias(FURNISHING_ALIASES, value)
+
+
+def sale_or_rent_choice(value):
+    return _alias(SALE_OR_RENT_ALIASES, value)
+
+
+def _amount(value):
+    """'25k' / '1.5 Cr' / '45,000' / 25000 -> Decimal rupees, else None."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        amount = value
+    else:
+        amount = parse_amount(str(value))
+        if amount is None:
+            return None
+    try:
+        amount = Decimal(str(amount))
+    except InvalidOperation:
+        return None
+    # 25000.0 and 25000 must give the same spec.
+    return amount.to_integral_value() if amount == amount.to_integral_value() else amount
+
+
+def _bounds(value):
+    """(min, max) for '<=25k', '> 1 Cr', '20k-30k' or a bare amount, which is a budget (max)."""
+    if value in (None, ""):
+        return None, None
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return None, _amount(value)
+    text = str(value)
+    match = _RANGE.match(text)
+    if match and _amount(match.group(1)) is not None and _amount(match.group(2)) is not None:
+        return _amount(match.group(1)), _amount(match.group(2))
+    match = _PRICE.match(text)
+    if not match:
+        return None, None
+    op = (match.group(1) or "").lower()
+    amount = _amount(match.group(2))
+    if op in (">", ">=", "above", "over", "min"):
+        return amount, None
+    return None, amount
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    city: Optional[str] = None
+    locality: Optional[str] = None
+    status: Optional[str] = None
+    furnishing: Optional[str] = None
+    sale_or_rent: Optional[str] = None
+    bhk: Optional[int] = None
+    price_min: Optional[Decimal] = None
+    price_max: Optional[Decimal] = None
+    deposit_min: Optional[Decimal] = None
+    deposit_max: Optional[Decimal] = None
+    text: Optional[str] = None
+
+    def as_dict(self):
+        """The set filters as plain JSON values; compile_filters() reads it back unchanged."""
+        return {k: (str(v) if isinstance(v, Decimal) else v) for k, v in asdict(self).items() if v is not None}
+
+    def cache_key(self):
+        return "&".join(f"{k}={v}" for k, v in sorted(self.as_dict().items()))
+
+    def __bool__(self):
+        return any(getattr(self, f.name) is not None for f in fields(self))
+
+
+def compile_filters(raw):
+    """
+    FilterSpec from an LLM filters dict or request query params. Unknown keys
+    and values that cannot be understood are dropped, as the list commands
+    always did.
+    """
+    raw = raw or {}
+    get = raw.get
+
+    def first(*keys):
+        for key in keys:
+            value = get(key)
+            if value not in (None, ""):
+                return value
+        return None
+
+    city = first("city")
+    locality = first("locality", "location")
+    bhk = first("bhk")
+    bhk_match = _BHK.match(str(bhk)) if bhk is not None else None
+
+    text = first("query_text", "text")
+    price_min, price_max = _bounds(first("price", "budget"))
+    deposit_min, deposit_max = _bounds(first("deposit"))
+
+    return FilterSpec(
+        city=str(city).strip().title() if city else None,
+        locality=str(locality).strip().lower() if locality else None,
+        status=_alias(STATUS_ALIASES, first("status")),
+        furnishing=furnishing_choice(first("furnishing")),
+        sale_or_rent=sale_or_rent_choice(first("sale_or_rent", "type")),
+        bhk=int(bhk_match.group(1)) if bhk_match else None,
+        price_min=_amount(first("price_min")) or price_min,
+        price_max=_amount(first("price_max")) or price_max,
+        deposit_min=_amount(first("deposit_min")) or deposit_min,
+        deposit_max=_amount(first("deposit_max")) or deposit_max,
+        text=str(text).strip() if text else None,
+    )
+
+
+def apply(spec, qs, price_slack=1):
+    """
+    qs narrowed by spec. price_slack > 1 widens the upper price bound, for
+    customers whose budget is a rough figure.
+    """
+    if spec.city:
+        qs = qs.filter(city__iexact=spec.city)
+    if spec.locality:
+        qs = qs.filter(locality__icontains=spec.locality)
+    if spec.status:
+        qs = qs.filter(status=spec.status)
+    if spec.furnishing:
+        qs = qs.filter(furnishing=spec.furnishing)
+    if spec.sale_or_rent:
+        qs = qs.filter(sale_or_rent=spec.sale_or_rent)
+    if spec.bhk is not None:
+        qs = qs.filter(bhk=spec.bhk)
+    if spec.price_min is not None:
+        qs = qs.filter(price__gte=spec.price_min)
+    if spec.price_max is not None:
+        qs = qs.filter(price__lte=spec.price_max * Decimal(str(price_slack)))
+    if spec.deposit_min is not None:
+        qs = qs.filter(deposit__gte=spec.deposit_min)
+    if spec.deposit_max is not None:
+        qs = qs.filter(deposit__lte=spec.deposit_max)
+    if spec.text:
+        qs = search.search(qs, spec.text)
+    return qs
@@ -0,0 +1,146 @@
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from inventory.services.redis_setup import redis_client
+
+# Ledger of webhook message ids. A message is claimed once (in flight) when
+# the webhook accepts it and marked completed by the worker. Retries that
+# arrive while it is in flight or after it completed are absorbed. The worker
+# re-asserts the claim when the job starts, since a job can wait in its lane
+# longer than INFLIGHT_TTL; a copy queued after the claim lapsed is then
+# skipped once the first copy has completed.
+
+INFLIGHT = "1"
+COMPLETED = "2"
+
+INFLIGHT_TTL = int(os.getenv("IDEMPOTENCY_INFLIGHT_TTL", 900))
+COMPLETED_TTL = int(os.getenv("IDEMPOTENCY_COMPLETED_TTL", 86400))
+FRONT_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_FRONT_CACHE_SIZE", 10000))
+
+STATS_KEY = "idem:stats"
+
+# Claim and count in a single round trip.
+_CLAIM = redis_client.register_script(
+    """
+    local prev = redis.call('get', KEYS[1])
+    if prev then
+        if prev == ARGV[1] then
+            redis.call('hincrby', KEYS[2], 'hit_inflight', 1)
+        else
+            redis.call('hincrby', KEYS[2], 'hit_completed', 1)
+        end
+        return prev
+    end
+    redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    redis.call('hincrby', KEYS[2], 'miss', 1)
+    return false
+    """
+)
+
+# Refresh an in-flight claim unless the message already completed.
+_BEGIN = redis_client.register_script(
+    """
+    if redis.call('get', KEYS[1]) == ARGV[2] then
+        return ARGV[2]
+    end
+    redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return false
+    """
+)
+
+
+class _FrontCache:
+    """Bounded in-process LRU of completed ids, so hot retries skip Redis."""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+
+    def add(self, key, ttl):
+        if not self.size:
+            return
+        with self.lock:
+            self.items[key] = time.monotonic() + ttl
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        with self.lock:
+            expires = self.items.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self.items[key]
+                return False
+            self.hits += 1
+            return True
+
+    def discard(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+_front = _FrontCache(FRONT_CACHE_SIZE)
+
+
+def _key(msg_id, scope):
+    return f"idem:{scope}:{msg_id}"
+
+
+def claim(msg_id, scope="meta"):
+    """
+    Returns "claimed" if the caller should process the message, otherwise
+    "inflight" or "completed".
+    """
+    key = _key(msg_id, scope)
+    if key in _front:
+        return "completed"
+    prev = _CLAIM(keys=[key, STATS_KEY], args=[INFLIGHT, INFLIGHT_TTL])
+    if prev is None:
+        return "claimed"
+    if prev == COMPLETED:
+        _front.add(key, COMPLETED_TTL)
+        return "completed"
+    return "inflight"
+
+
+def begin(msg_id, scope="meta"):
+    """
+    Called by the worker as it starts a queued message. Returns False if the
+    message already completed, otherwise renews its in-flight claim.
+    """
+    key = _key(msg_id, scope)
+    if key in _front:
+        return False
+    if _BEGIN(keys=[key], args=[INFLIGHT, COMPLETED, INFLIGHT_TTL]) is None:
+        return True
+    _front.add(key, COMPLETED_TTL)
+    return False
+
+
+def complete(msg_id, scope="meta"):
+    key = _key(msg_id, scope)
+    redis_client.set(key, COMPLETED, ex=COMPLETED_TTL)
+    _front.add(key, COMPLETED_TTL)
+
+
+def release(msg_id, scope="meta"):
+    """Forget a claim so a redelivery of the message is processed again."""
+    key = _key(msg_id, scope)
+    redis_client.delete(key)
+    _front.discard(key)
+
+
+def idempotency_stats():
+    stats = {k: int(v) for k, v in redis_client.hgetall(STATS_KEY).items()}
+    stats.setdefault("miss", 0)
+    stats.setdefault("hit_inflight", 0)
+    stats.setdefault("hit_completed", 0)
+    stats["front_cache_hits"] = _front.hits
+    stats["front_cache_size"] = len(_front.items)
+    return stats
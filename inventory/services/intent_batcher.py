@@ -0,0 +1,125 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Collects intent classification requests that arrive within a short window
+# and sends them to the LLM as one structured request, so a burst of
+# messages costs one call and one copy of the format instructions instead
+# of one each. A batch of one, or a batch whose answer cannot be parsed or
+# lined up with its messages, falls back to the single-message chain.
+#
+# A message is sent at once when no LLM call is in flight; messages only
+# accumulate (for up to the window) while one is outstanding. Batches
+# therefore only form when one process classifies several messages
+# concurrently: run the worker with a threaded or gevent pool (e.g.
+# celery -P threads / -P gevent). Under prefork with a prefetch of 1 each
+# process handles one message at a time and batching does nothing.
+#
+#   INTENT_BATCHING         "True" to enable
+#   INTENT_BATCH_WINDOW_MS  how long to wait for more messages (default 100)
+#   INTENT_BATCH_MAX        largest batch sent at once (default 16)
+
+ENABLED = os.getenv("INTENT_BATCHING", "False") == "True"
+WINDOW = int(os.getenv("INTENT_BATCH_WINDOW_MS", 100)) / 1000
+MAX_BATCH = int(os.getenv("INTENT_BATCH_MAX", 16))
+
+
+class IntentBatcher:
+    def __init__(self, name, single, batch, window=WINDOW, max_batch=MAX_BATCH):
+        self.name = name
+        self.single = single
+        self.batch = batch
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"batch-{name}")
+        self.thread = None
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"messages": 0, "requests": 0, "batched": 0, "fallbacks": 0}
+
+    def _ensure_thread(self):
+        # Started on first use so forked worker processes each get their own.
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._collect, name=f"batcher-{self.name}", daemon=True)
+                    self.thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self._ensure_thread()
+        self.queue.put((text, future))
+        return future.result()
+
+    def _collect(self):
+        while True:
+            batch = [self.queue.get()]
+            with self.lock:
+                busy = self.in_flight > 0
+            ends_at = time.monotonic() + (self.window if busy else 0)
+            while len(batch) < self.max_batch:
+                remaining = ends_at - time.monotonic()
+                try:
+                    # Idle: take only what is already queued.
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self.lock:
+                self.in_flight += 1
+            self.pool.submit(self._dispatch, batch)
+
+    def _count(self, **counts):
+        with self.lock:
+            for field, n in counts.items():
+                self.stats[field] += n
+
+    def _resolve_single(self, text, future):
+        try:
+            future.set_result(self.single(text))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _dispatch(self, batch):
+        try:
+            self._send(batch)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _send(self, batch):
+        texts = [text for text, _ in batch]
+        if len(batch) == 1:
+            self._count(messages=1, requests=1)
+            self._resolve_single(*batch[0])
+            return
+
+        try:
+            results = self.batch(texts)
+            if len(results) != len(texts):
+                raise ValueError(f"expected {len(texts)} intents, got {len(results)}")
+        except Exception as e:
+            logging.warning(f"Batched {self.name} intent request failed, falling back: {e}")
+            self._count(messages=len(batch), requests=1 + len(batch), fallbacks=1)
+            for text, future in batch:
+                self.pool.submit(self._resolve_single, text, future)
+            return
+
+        self._count(messages=len(batch), requests=1, batched=len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["enabled"] = ENABLED
+        stats["messages_per_request"] = round(stats["messages"] / stats["requests"], 2) if stats["requests"] else 0.0
+        return stats
+
+
+def numbered(texts):
+    """One message per line, so multi-line messages cannot shift the numbering."""
+    return "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, 1))
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from inventory.services.redis_setup import redis_client
+
+# Two-tier cache of intent classification results keyed by normalized
+# message text: a per-process LRU in front of a shared Redis tier. Keys
+# include a hash of the prompt, so editing a prompt starts a fresh cache.
+#
+# Numbers are templated out of the key ("view 12" -> "view <n0>") only when
+# every number in the result is copied verbatim from the message, so the
+# cached result can be re-filled with the new message's numbers. Otherwise
+# ("under 25k" -> "<=25000") the literal text is the key.
+
+LOCAL_SIZE = int(os.getenv("INTENT_CACHE_LOCAL_SIZE", 5000))
+LOCAL_TTL = int(os.getenv("INTENT_CACHE_LOCAL_TTL", 3600))
+REDIS_TTL = int(os.getenv("INTENT_CACHE_REDIS_TTL", 7 * 86400))
+MAX_TEXT_LENGTH = 200
+STATS_FLUSH_EVERY = 50
+
+_NUMBER = re.compile(r"(?<![\d.])\d+(?:\.\d+)?(?![\d.])")
+_PLACEHOLDER = re.compile(r"<n(\d+)>")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").lower().strip()
+    text = text.rstrip(".!?")
+    return _SPACES.sub(" ", text)
+
+
+def prompt_version(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()[:10]
+
+
+def _template(text, result_json):
+    """Returns (templated_text, templated_result) or None when unsafe."""
+    numbers = _NUMBER.findall(text)
+    if not numbers or len(set(numbers)) != len(numbers):
+        return None
+    index = {n: i for i, n in enumerate(numbers)}
+    if any(n not in index for n in _NUMBER.findall(result_json)):
+        return None
+    templated_text = _NUMBER.sub(lambda m: f"<n{index[m.group(0)]}>", text)
+    templated_result = _NUMBER.sub(lambda m: f"<n{index[m.group(0)]}>", result_json)
+    return templated_text, templated_result
+
+
+class IntentCache:
+    def __init__(self, kind, version):
+        # version may be a callable, resolved on first use so building the
+        # prompt it hashes is deferred until a message needs the LLM path.
+        self.kind = kind
+        self._version = version
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hit_local": 0, "hit_redis": 0, "miss": 0, "saved_ms": 0.0}
+        self.pending = dict(self.stats)
+        self.llm_ms = 0.0
+
+    @property
+    def version(self):
+        if callable(self._version):
+            self._version = self._version()
+        return self._version
+
+    def _redis_key(self, key):
+        return f"icache:{self.kind}:{self.version}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def _local_get(self, key):
+        with self.lock:
+            item = self.local.get(key)
+            if not item:
+                return None
+            if item[0] < time.monotonic():
+                del self.local[key]
+                return None
+            self.local.move_to_end(key)
+            return item[1]
+
+    def _local_put(self, key, value):
+        with self.lock:
+            self.local[key] = (time.monotonic() + LOCAL_TTL, value)
+            self.local.move_to_end(key)
+            while len(self.local) > LOCAL_SIZE:
+                self.local.popitem(last=False)
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+            self.pending[name] += 1
+            if name != "miss":
+                self.stats["saved_ms"] += self.llm_ms
+                self.pending["saved_ms"] += self.llm_ms
+            if sum(self.pending[k] for k in ("hit_local", "hit_redis", "miss")) < STATS_FLUSH_EVERY:
+                return
+            pending, self.pending = self.pending, dict.fromkeys(self.pending, 0)
+        try:
+            pipe = redis_client.pipeline()
+            for field in ("hit_local", "hit_redis", "miss"):
+                pipe.hincrby(f"icache:stats:{self.kind}", field, pending[field])
+            pipe.hincrbyfloat(f"icache:stats:{self.kind}", "saved_ms", round(pending["saved_ms"], 1))
+            pipe.execute()
+        except Exception:
+            logging.exception("Failed to flush intent cache stats")
+
+    def get(self, text):
+        text = normalize(text)
+        if not text or len(text) > MAX_TEXT_LENGTH:
+            return None
+        numbers = _NUMBER.findall(text)
+        keys = [text]
+        templated = _NUMBER.sub(lambda m: f"<n{numbers.index(m.group(0))}>", text) if numbers else None
+        if templated and len(set(numbers)) == len(numbers):
+            keys.insert(0, templated)
+
+        for key in keys:
+            value = self._local_get(key)
+            tier = "hit_local"
+            if value is None:
+                try:
+                    value = redis_client.get(self._redis_key(key))
+                except Exception:
+                    logging.exception("Intent cache lookup failed")
+                    value = None
+                if value is not None:
+                    self._local_put(key, value)
+                tier = "hit_redis"
+            if value is not None:
+                self._count(tier)
+                if key != text:
+                    value = _PLACEHOLDER.sub(lambda m: numbers[int(m.group(1))], value)
+                return json.loads(value)
+
+        self._count("miss")
+        return None
+
+    def put(self, text, result, llm_ms=None):
+        text = normalize(text)
+        if not text or len(text) > MAX_TEXT_LENGTH:
+            return
+        if llm_ms is not None:
+            # Moving average of the LLM latency each hit avoids.
+            self.llm_ms = llm_ms if not self.llm_ms else 0.8 * self.llm_ms + 0.2 * llm_ms
+        value = json.dumps(result, sort_keys=True)
+        key = text
+        templated = _template(text, value)
+        if templated:
+            key, value = templated
+        self._local_put(key, value)
+        try:
+            redis_client.set(self._redis_key(key), value, ex=REDIS_TTL)
+        except Exception:
+            logging.exception("Intent cache store failed")
+
+    def snapshot(self):
+        try:
+            shared = redis_client.hgetall(f"icache:stats:{self.kind}")
+        except Exception:
+            shared = {}
+        with self.lock:
+            process = dict(self.stats, local_entries=len(self.local), llm_ms_avg=round(self.llm_ms, 1))
+        return {"version": self.version, "process": process, "shared": shared}
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+
+from inventory.services.redis_setup import redis_client
+
+# First-tier intent classifier: a small TF-IDF + logistic regression model
+# trained on messages the LLM already labelled (see train_intent_model).
+# It only answers when it is confident and the intent's arguments can be
+# filled without the LLM; everything else defers to the Groq chain.
+
+MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "ml", "intent_models.pkl"),
+)
+THRESHOLD = float(os.getenv("INTENT_MODEL_THRESHOLD", 0.9))
+# Collecting LLM labels as training data is opt-in: the messages are
+# customers' and brokers' own words. Numbers (phones, prices, ids) are
+# masked before storing and the log expires.
+LABEL_LOG = os.getenv("INTENT_LABEL_LOG", "False") == "True"
+LOG_SIZE = 50000
+LOG_TTL = int(os.getenv("INTENT_LABEL_LOG_TTL_DAYS", 30)) * 86400
+
+# Actions whose handlers need nothing but the raw message.
+_NO_ARGS = {"help", "profile", "editprofile", "boturl", "new_property"}
+_ID_ACTIONS = {
+    "view_property", "share_property", "edit_property",
+    "delete_property", "activate_property", "disable_property",
+}
+# A list request is only taken without the LLM when it carries no filters.
+_PLAIN_LIST_WORDS = {
+    "show", "list", "my", "all", "the", "me", "see", "view", "properties", "property",
+    "flats", "listings", "inventory", "available", "please", "pls",
+}
+_NUMBER = re.compile(r"\d+")
+
+_models = None
+_lock = threading.Lock()
+
+
+def _load():
+    global _models
+    if _models is None:
+        with _lock:
+            if _models is None:
+                try:
+                    with open(MODEL_PATH, "rb") as f:
+                        _models = pickle.load(f)
+                except FileNotFoundError:
+                    _models = {}
+                except Exception:
+                    logging.exception(f"Failed to load intent model from {MODEL_PATH}")
+                    _models = {}
+    return _models
+
+
+def _fill(action, text):
+    if action in _NO_ARGS:
+        return {"action": action}
+    if action in _ID_ACTIONS:
+        numbers = _NUMBER.findall(text)
+        if len(numbers) == 1:
+            return {"action": action, "property_id": numbers[0]}
+        return None
+    if action == "list_properties":
+        words = set(re.findall(r"[a-z]+", text.lower()))
+        if not _NUMBER.search(text) and words <= _PLAIN_LIST_WORDS:
+            return {"action": action, "filters": {}}
+    return None
+
+
+def mask(text):
+    """'call 9876543210 for 2bhk' -> 'call 0 for 0bhk'; the model never needs the digits."""
+    return _NUMBER.sub("0", text or "")
+
+
+def _count(kind, field):
+    try:
+        redis_client.hincrby(f"intent_model:stats:{kind}", field, 1)
+    except Exception:
+        pass
+
+
+def predict(kind, text):
+    """Returns (action, confidence) from the local model, or None if there is no model."""
+    model = _load().get(kind)
+    if model is None or not text:
+        return None
+    probabilities = model.predict_proba([mask(text)])[0]
+    best = probabilities.argmax()
+    return model.classes_[best], float(probabilities[best])
+
+
+def local_intent(kind, text):
+    """Intent fields for confident predictions, or None to defer to the LLM."""
+    prediction = predict(kind, text)
+    if prediction is None:
+        return None
+    action, confidence = prediction
+    fields = _fill(action, text) if confidence >= THRESHOLD else None
+    _count(kind, "absorbed" if fields else "deferred")
+    return fields
+
+
+def log_llm_label(kind, text, result):
+    """Keeps the LLM's label for a message as training data for the local model (INTENT_LABEL_LOG)."""
+    if not LABEL_LOG:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        pipe.lpush(f"intent_log:{kind}", json.dumps({"text": mask(text), "action": result.get("action")}))
+        pipe.ltrim(f"intent_log:{kind}", 0, LOG_SIZE - 1)
+        pipe.expire(f"intent_log:{kind}", LOG_TTL)
+        pipe.execute()
+    except Exception:
+        logging.exception("Failed to log intent label")
+
+
+def model_stats():
+    stats = {}
+    for kind in ("user", "customer"):
+        counts = {k: int(v) for k, v in redis_client.hgetall(f"intent_model:stats:{kind}").items()}
+        absorbed, deferred = counts.get("absorbed", 0), counts.get("deferred", 0)
+        counts["absorbed_share"] = round(absorbed / (absorbed + deferred), 3) if absorbed + deferred else 0.0
+        counts["loaded"] = kind in _load()
+        stats[kind] = counts
+    return stats
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from inventory.services.redis_setup import redis_client
+
+# A per-broker counter bumped (by signals) whenever one of the broker's
+# properties or their media is written. Anything derived from a broker's
+# inventory can be cached under the current version and is invalidated by
+# the next write without having to know which entries it affects.
+#   inv:ver:{broker_id}                       version
+#   inv:mod:{broker_id}                       unix time of the last bump
+#   inv:{namespace}:{broker_id}:{ver}:{hash}  a cached result, e.g. the
+#                                             count of a filtered queryset
+
+CACHE_TTL = int(os.getenv("INVENTORY_CACHE_TTL", 86400))
+
+
+def current(broker_id):
+    value = redis_client.get(f"inv:ver:{broker_id}")
+    return int(value) if value else 0
+
+
+def bump(broker_id):
+    try:
+        redis_client.incr(f"inv:ver:{broker_id}")
+        redis_client.set(f"inv:mod:{broker_id}", int(time.time()))
+    except Exception:
+        logging.exception(f"Failed to bump inventory version for broker {broker_id}")
+
+
+def last_modified(broker_id):
+    """Unix time of the broker's last inventory write, None if not known."""
+    value = redis_client.get(f"inv:mod:{broker_id}")
+    return int(value) if value else None
+
+
+def snapshot(broker_id):
+    """(current version, last modified) in one round trip."""
+    version, modified = redis_client.mget(f"inv:ver:{broker_id}", f"inv:mod:{broker_id}")
+    return int(version) if version else 0, int(modified) if modified else None
+
+
+def cached(broker_id, namespace, key, compute, ttl=CACHE_TTL):
+    """
+    compute() cached as JSON under the broker's current inventory version,
+    so it is recomputed only after the broker's inventory changes.
+    """
+    digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:16]
+    try:
+        cache_key = f"inv:{namespace}:{broker_id}:{current(broker_id)}:{digest}"
+        value = redis_client.get(cache_key)
+        if value is not None:
+            return json.loads(value)
+    except Exception:
+        logging.exception(f"Inventory {namespace} cache lookup failed")
+        return compute()
+
+    value = compute()
+    try:
+        redis_client.set(cache_key, json.dumps(value, cls=DjangoJSONEncoder), ex=ttl)
+    except Exception:
+        pass
+    return value
+
+
+def cached_count(broker_id, qs, key=None):
+    """
+    qs.count(), recomputed only after the broker's inventory changes. key
+    identifies qs (e.g. a FilterSpec cache key); by default its SQL.
+    """
+    return cached(broker_id, "count", key or qs.query, qs.count)
@@ -0,0 +1,251 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from inventory.services.redis_setup import redis_client
+
+# A lane is an ordered Redis list of jobs for one key (a broker's or a
+# customer's phone). Only the worker holding the lane lock pops from it, so
+# jobs for one key run one at a time and in order, while different keys are
+# drained by whichever worker threads/processes are free. The lock is kept
+# alive by a heartbeat while its holder works, so a slow job keeps it and a
+# dead worker's lock lapses within LANE_LOCK_TTL_MS. A job that fails is
+# moved to lane:dead:{key} instead of being dropped.
+#
+# Handlers are not assumed idempotent: the Meta handler creates properties,
+# writes sessions and sends messages, and a retry would repeat whatever ran
+# before the failure. So a job gets one attempt by default and Meta's
+# redelivery is the retry; raise LANE_MAX_ATTEMPTS only for lanes whose
+# handler is safe to re-run.
+
+LANE_LOCK_TTL_MS = 30_000
+LANE_MAX_ATTEMPTS = 1
+LANE_DEAD_TTL = 7 * 86400
+LANE_STATS_TTL = 86400
+HOT_LANES_KEPT = 200
+
+_RELEASE_LOCK = redis_client.register_script(
+    """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+_REFRESH_LOCK = redis_client.register_script(
+    """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+)
+
+
+def _queue_key(key):
+    return f"lane:q:{key}"
+
+
+def _lock_key(key):
+    return f"lane:lock:{key}"
+
+
+def _dead_key(key):
+    return f"lane:dead:{key}"
+
+
+def push(key, payloads):
+    now = time.time()
+    items = [json.dumps({"payload": p, "ts": now}) for p in payloads]
+    if not items:
+        return 0
+    pipe = redis_client.pipeline()
+    pipe.rpush(_queue_key(key), *items)
+    pipe.zincrby("lane:depth", len(items), key)
+    return pipe.execute()[0]
+
+
+def _record_wait(key, wait_ms):
+    stats_key = f"lane:stats:{key}"
+    pipe = redis_client.pipeline()
+    pipe.hincrby(stats_key, "jobs", 1)
+    pipe.hincrbyfloat(stats_key, "wait_ms_total", wait_ms)
+    pipe.hset(stats_key, "wait_ms_last", round(wait_ms, 1))
+    pipe.expire(stats_key, LANE_STATS_TTL)
+    pipe.zincrby("lane:wait_ms", wait_ms, key)
+    pipe.zremrangebyrank("lane:wait_ms", 0, -(HOT_LANES_KEPT + 1))
+    pipe.zincrby("lane:depth", -1, key)
+    pipe.zremrangebyscore("lane:depth", "-inf", 0)
+    pipe.hincrby("lane:stats", "jobs", 1)
+    pipe.hincrbyfloat("lane:stats", "wait_ms_total", wait_ms)
+    pipe.execute()
+
+
+def acquire(key, ttl_ms=LANE_LOCK_TTL_MS):
+    token = uuid.uuid4().hex
+    if redis_client.set(_lock_key(key), token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+def release(key, token):
+    _RELEASE_LOCK(keys=[_lock_key(key)], args=[token])
+
+
+@contextmanager
+def _heartbeat(key, token, ttl_ms=LANE_LOCK_TTL_MS):
+    """Keeps the lane lock alive while the block runs, however long it takes."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(ttl_ms / 3000):
+            try:
+                _REFRESH_LOCK(keys=[_lock_key(key)], args=[token, ttl_ms])
+            except Exception:
+                logging.exception(f"Lane {key} lock refresh failed")
+
+    thread = threading.Thread(target=beat, name=f"lane-heartbeat-{key}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _bury(key, raw, error):
+    item = json.loads(raw)
+    item["error"] = error
+    pipe = redis_client.pipeline()
+    pipe.rpush(_dead_key(key), json.dumps(item))
+    pipe.expire(_dead_key(key), LANE_DEAD_TTL)
+    pipe.lpop(_queue_key(key))
+    pipe.hincrby("lane:stats", "dead", 1)
+    pipe.execute()
+    logging.error(f"Lane {key} job moved to {_dead_key(key)}: {error}")
+
+
+def drain(key, handler, on_dead=None):
+    """
+    Runs every queued job of a lane through handler, oldest first.
+    Returns the number of jobs handled, or None when another worker owns the
+    lane (that worker will pick up our jobs). A job is tried up to
+    LANE_MAX_ATTEMPTS times, then moved to the lane's dead-letter list and
+    passed to on_dead(payload).
+    """
+    qkey = _queue_key(key)
+    handled = 0
+    while True:
+        token = acquire(key)
+        if not token:
+            return handled or None
+        try:
+            with _heartbeat(key, token):
+                while True:
+                    raw = redis_client.lindex(qkey, 0)
+                    if raw is None:
+                        break
+                    item = json.loads(raw)
+                    wait_ms = (time.time() - item["ts"]) * 1000
+                    # Pop only after handling so a crashed worker leaves the job queued.
+                    if _run(key, handler, item["payload"]):
+                        redis_client.lpop(qkey)
+                    else:
+                        _bury(key, raw, f"failed {LANE_MAX_ATTEMPTS} time(s)")
+                        if on_dead:
+                            try:
+                                on_dead(item["payload"])
+                            except Exception:
+                                logging.exception(f"[ERROR] Lane {key} on_dead failed")
+                    # Counted once the job has left the queue, so a job that
+                    # outlives a crashed worker is not counted twice.
+                    _record_wait(key, wait_ms)
+                    handled += 1
+        finally:
+            release(key, token)
+        # A job pushed between our last read and the unlock would otherwise
+        # be stranded, since its own drain attempt saw the lane locked.
+        if not redis_client.llen(qkey):
+            return handled
+
+
+def _run(key, handler, payload):
+    """True once handler(payload) succeeds, False after LANE_MAX_ATTEMPTS failures."""
+    for attempt in range(1, LANE_MAX_ATTEMPTS + 1):
+        try:
+            handler(payload)
+            return True
+        except Exception:
+            logging.exception(f"[ERROR] Lane {key} job failed (attempt {attempt}/{LANE_MAX_ATTEMPTS})")
+            if attempt < LANE_MAX_ATTEMPTS:
+                time.sleep(0.5 * 2 ** (attempt - 1))
+    return False
+
+
+def lock_ttl_ms(key):
+    return redis_client.pttl(_lock_key(key))
+
+
+def pending(key):
+    return redis_client.llen(_queue_key(key))
+
+
+def dead_letters(key):
+    """Jobs of a lane that failed every attempt, oldest first, with their error."""
+    return [json.loads(raw) for raw in redis_client.lrange(_dead_key(key), 0, -1)]
+
+
+@contextmanager
+def lane_lock(key, timeout=10.0, poll=0.05):
+    """
+    Serializes synchronous work (e.g. a TwiML webhook) on a lane key. Yields
+    True once the lane is held, or False if it is still busy after timeout
+    seconds; the caller must then not do the work (reply "busy" instead),
+    so jobs of one lane never overlap.
+    """
+    started = time.time()
+    redis_client.zincrby("lane:depth", 1, key)
+    token = acquire(key)
+    while not token and time.time() - started < timeout:
+        time.sleep(poll)
+        token = acquire(key)
+    if not token:
+        logging.warning(f"Lane {key} still busy after {timeout}s")
+    _record_wait(key, (time.time() - started) * 1000)
+    if not token:
+        yield False
+        return
+    try:
+        with _heartbeat(key, token):
+            yield True
+    finally:
+        release(key, token)
+
+
+def lane_stats(top=10):
+    total = redis_client.hgetall("lane:stats")
+    jobs = int(total.get("jobs", 0))
+    depth = redis_client.zrevrange("lane:depth", 0, -1, withscores=True)
+    hot = []
+    for key, wait_total in redis_client.zrevrange("lane:wait_ms", 0, top - 1, withscores=True):
+        stats = redis_client.hgetall(f"lane:stats:{key}")
+        lane_jobs = int(stats.get("jobs", 0)) or 1
+        hot.append({
+            "lane": key,
+            "jobs": lane_jobs,
+            "avg_wait_ms": round(float(stats.get("wait_ms_total", wait_total)) / lane_jobs, 1),
+            "last_wait_ms": float(stats.get("wait_ms_last", 0)),
+        })
+    return {
+        "jobs": jobs,
+        "avg_wait_ms": round(float(total.get("wait_ms_total", 0)) / jobs, 1) if jobs else 0.0,
+        "dead_jobs": int(total.get("dead", 0)),
+        "queue_depth": int(sum(score for _, score in depth)),
+        "busiest_lanes": [{"lane": k, "depth": int(s)} for k, s in depth[:top]],
+        "slowest_lanes": hot,
+    }
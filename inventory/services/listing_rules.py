@@ -0,0 +1,212 @@
+import os
+import re
+
+# Deterministic extraction of the PropertySchema fields that brokers write in
+# predictable shorthand ("2bhk", "25k", "1.2 Cr", "dep 1L", "1100 sqft",
+# "semi furnished"). Each rule only fills a field when the text is
+# unambiguous; anything it is unsure about is left for the LLM.
+
+# Bump when a rule changes what it extracts, to invalidate cached extractions.
+RULES_VERSION = 2
+
+MIN_COVERAGE = float(os.getenv("EXTRACT_RULES_MIN_COVERAGE", 0.5))
+
+# Fields the coverage score is measured on. Below MIN_COVERAGE the listing
+# is too free-form to trust the rules and goes to the LLM in full.
+COVERAGE_FIELDS = ("bhk", "price", "sale_or_rent", "city", "furnishing", "area_sqft")
+
+# Written by the LLM however much the rules know.
+LLM_ONLY_FIELDS = ("title", "description_beautified", "amenities", "locality", "source",
+                   "source_broker_name", "source_broker_phone")
+
+CITIES = {
+    "mumbai": "Mumbai", "bombay": "Mumbai", "navi mumbai": "Navi Mumbai", "thane": "Thane",
+    "pune": "Pune", "bangalore": "Bangalore", "bengaluru": "Bengaluru", "delhi": "Delhi",
+    "new delhi": "New Delhi", "gurgaon": "Gurgaon", "gurugram": "Gurugram", "noida": "Noida",
+    "greater noida": "Greater Noida", "ghaziabad": "Ghaziabad", "faridabad": "Faridabad",
+    "hyderabad": "Hyderabad", "secunderabad": "Secunderabad", "chennai": "Chennai",
+    "kolkata": "Kolkata", "ahmedabad": "Ahmedabad", "surat": "Surat", "vadodara": "Vadodara",
+    "jaipur": "Jaipur", "lucknow": "Lucknow", "chandigarh": "Chandigarh", "mohali": "Mohali",
+    "indore": "Indore", "bhopal": "Bhopal", "nagpur": "Nagpur", "nashik": "Nashik",
+    "kochi": "Kochi", "coimbatore": "Coimbatore", "goa": "Goa", "dehradun": "Dehradun",
+}
+
+_UNITS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+
+_AMOUNT = re.compile(
+    r"(?:(?:₹|rs\.?|inr)\s*)?"
+    r"(?P<num>\d{1,3}(?:,\d{2,3})+|\d+(?:\.\d+)?)\s*"
+    r"(?P<unit>k|thousand|lakhs?|lacs?|l|crores?|cr)?\b"
+    r"(?P<suffix>\s*/-)?",
+    re.I,
+)
+_CURRENCY_PREFIX = re.compile(r"(?:₹|rs\.?|inr)\s*$", re.I)
+
+_LABELS = [
+    ("deposit", re.compile(r"\b(?:deposit|dep|security|advance)\b", re.I)),
+    ("maintenance", re.compile(r"\b(?:maintenance|maint|mnt|society charges?)\b", re.I)),
+    ("price", re.compile(r"\b(?:rent|rental|price|asking|expected|cost|budget|for|at|sale|quote)\b|@", re.I)),
+]
+
+_BHK = re.compile(r"\b(\d)\s*\.?\s*(?:bhk|bedroom|bed\s*room|br)s?\b", re.I)
+_RK = re.compile(r"\b(\d)\s*rk\b|\bstudio\b", re.I)
+_AREA = re.compile(
+    r"(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(?:sq\.?\s*ft\.?|sqft|sft|sq\.?\s*feet|square\s*feet|carpet|built\s*up)\b",
+    re.I,
+)
+_BATHS = re.compile(r"\b(\d)\s*(?:bath(?:room)?s?|washrooms?|toilets?)\b", re.I)
+_FLOOR_OF = re.compile(r"\b(\d{1,2})\s*(?:st|nd|rd|th)?\s*(?:floor\s*)?(?:/|of|out of)\s*(\d{1,2})\s*(?:floors?)?\b", re.I)
+_FLOOR = re.compile(r"\b(\d{1,2})\s*(?:st|nd|rd|th)?\s*floor\b|\bfloor\s*(?:no\.?\s*)?(\d{1,2})\b", re.I)
+_GROUND = re.compile(r"\bground\s*floor\b", re.I)
+_TOTAL_FLOORS = re.compile(r"\b(?:g\s*\+\s*(\d{1,2})|(\d{1,2})\s*(?:storey|story|floors?)\s*(?:building|tower|society))\b", re.I)
+_AGE = re.compile(r"\b(\d{1,2})\s*(?:yrs?|years?)\s*old\b", re.I)
+_NEW_BUILD = re.compile(r"\b(?:brand\s*new|new\s*construction|under\s*construction)\b", re.I)
+
+_FURNISHING = [
+    ("semi", re.compile(r"\bsemi[\s-]*(?:furnished|furnish|furn)\b|\bsemi\s*-?\s*f\b", re.I)),
+    ("unfurnished", re.compile(r"\b(?:un|non|not)[\s-]*(?:furnished|furnish)\b|\bbare\s*shell\b", re.I)),
+    ("fully", re.compile(r"\b(?:fully|full|fullt)[\s-]*(?:furnished|furnish)\b|\bff\b", re.I)),
+]
+_FURNISHED = re.compile(r"(?<!semi )(?<!semi-)(?<!un)\bfurnished\b", re.I)
+
+_SALE = re.compile(r"\b(?:for\s+sale|sale|resale|re-sale|selling|sell|outright|ownership)\b", re.I)
+_RENT = re.compile(r"\b(?:for\s+rent|rent|rental|lease|leave\s*(?:and|&)\s*licen[cs]e|per\s*month|p\.?m\.?|/\s*month)\b", re.I)
+
+_CITY = re.compile(r"\b(" + "|".join(sorted((re.escape(c) for c in CITIES), key=len, reverse=True)) + r")\b", re.I)
+
+
+def parse_amount(text):
+    """'25k' -> 25000.0, '1.2 Cr' -> 12000000.0, '₹45,000' -> 45000.0, else None."""
+    match = _AMOUNT.fullmatch((text or "").strip())
+    if not match:
+        return None
+    return _amount(match)
+
+
+def _amount(match):
+    value = float(match.group("num").replace(",", ""))
+    unit = (match.group("unit") or "").lower()
+    return value * _UNITS[unit] if unit else value
+
+
+def _money(text):
+    """[(field, value)] for every money-like amount, labelled by the words before it."""
+    found = []
+    previous_end = 0
+    for match in _AMOUNT.finditer(text):
+        # Only the words since the previous number can label this one.
+        prefix = text[previous_end:match.start()][-25:]
+        previous_end = match.end()
+        clause = re.split(r"[\n,;|]", prefix)[-1]
+        label = None
+        for field, pattern in _LABELS:
+            if pattern.search(clause):
+                label = field
+                break
+
+        value = _amount(match)
+        explicit = (
+            match.group("unit")
+            or match.group("suffix")
+            or _CURRENCY_PREFIX.search(prefix)
+            or match.group(0).lower().startswith(("₹", "rs", "inr"))
+        )
+        if not explicit:
+            # Bare numbers count only when labelled and plausibly money, not
+            # "2bhk", "3rd floor" or a phone number.
+            tail = text[match.end():match.end() + 8].lower()
+            if label is None or value < 1000 or value >= 1_000_000_000 or re.match(r"\s*(?:bhk|rk|sq|ft|floor|bath|yrs?|years)", tail):
+                continue
+        found.append((label, value))
+    return found
+
+
+def _single(values):
+    values = set(values)
+    return values.pop() if len(values) == 1 else None
+
+
+def pre_extract(description):
+    """Fields the rules are sure about, as a dict of PropertySchema field names."""
+    text = description or ""
+    fields = {}
+
+    bhk = _single(int(m.group(1)) for m in _BHK.finditer(text))
+    if bhk is None and _RK.search(text) and not _BHK.search(text):
+        bhk = 1
+    if bhk:
+        fields["bhk"] = bhk
+
+    money = _money(text)
+    for field in ("deposit", "maintenance"):
+        value = _single(v for label, v in money if label == field)
+        if value:
+            fields[field] = value
+    price = _single(v for label, v in money if label == "price")
+    if price is None:
+        price = _single(v for label, v in money if label is None)
+    if price:
+        fields["price"] = price
+
+    area = _single(float(m.group(1).replace(",", "")) for m in _AREA.finditer(text))
+    if area:
+        fields["area_sqft"] = area
+
+    baths = _single(int(m.group(1)) for m in _BATHS.finditer(text))
+    if baths:
+        fields["bathrooms"] = baths
+
+    floor_of = _FLOOR_OF.search(text)
+    if floor_of and "floor" in text[floor_of.start():floor_of.end() + 10].lower():
+        fields["floor"], fields["total_floors"] = int(floor_of.group(1)), int(floor_of.group(2))
+    else:
+        if _GROUND.search(text):
+            fields["floor"] = 0
+        else:
+            floor = _single(int(m.group(1) or m.group(2)) for m in _FLOOR.finditer(text))
+            if floor is not None:
+                fields["floor"] = floor
+        total = _single(int(m.group(1) or m.group(2)) for m in _TOTAL_FLOORS.finditer(text))
+        if total:
+            fields["total_floors"] = total
+
+    age = _single(int(m.group(1)) for m in _AGE.finditer(text))
+    if age is not None:
+        fields["age_of_property"] = age
+    elif _NEW_BUILD.search(text):
+        fields["age_of_property"] = 0
+
+    # A bare "furnished" means fully; next to a contradicting phrase
+    # ("Furnished flat ... not furnished") the LLM decides.
+    matches = [(choice, m.span()) for choice, pattern in _FURNISHING for m in pattern.finditer(text)]
+    furnishing = {choice for choice, _ in matches}
+    if any(not any(start <= m.start() < end for _, (start, end) in matches) for m in _FURNISHED.finditer(text)):
+        furnishing.add("fully")
+    if len(furnishing) == 1:
+        fields["furnishing"] = furnishing.pop()
+
+    sale, rent = bool(_SALE.search(text)), bool(_RENT.search(text))
+    if sale != rent:
+        fields["sale_or_rent"] = "sale" if sale else "rent"
+    elif not sale and fields.get("price"):
+        # Crore-range asks are sales; monthly-range asks with a deposit are rentals.
+        if fields["price"] >= 10_000_000:
+            fields["sale_or_rent"] = "sale"
+        elif fields["price"] <= 500_000 and fields.get("deposit"):
+            fields["sale_or_rent"] = "rent"
+
+    city = _single(CITIES[m.group(1).lower()] for m in _CITY.finditer(text))
+    if city:
+        fields["city"] = city
+
+    if "price" in fields or "deposit" in fields or "maintenance" in fields:
+        fields["currency"] = "INR"
+    return fields
+
+
+def coverage(fields):
+    return sum(1 for f in COVERAGE_FIELDS if fields.get(f) is not None) / len(COVERAGE_FIELDS)
@@ -0,0 +1,219 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from inventory.services import registry
+
+# Routes chat model calls across the providers that have API keys set.
+# Every call has a deadline. If the first provider has not answered by its
+# rolling p95 latency, the same request is hedged to the next provider and
+# whichever answers first wins. Providers that keep failing are skipped
+# (circuit breaker) until a cool-down passes, then retried with one call.
+#
+#   LLM_PROVIDERS       order of preference, e.g. "groq,openai,anthropic,google"
+#   LLM_DEADLINE        seconds before a call gives up (default 20)
+#   LLM_HEDGE_MIN       never hedge earlier than this many seconds (default 1.0)
+
+PROVIDERS = {
+    "groq": ("GROQ_API_KEY", "LLM_GROQ_MODEL", "llama-3.3-70b-versatile"),
+    "openai": ("OPENAI_API_KEY", "LLM_OPENAI_MODEL", "gpt-4o-mini"),
+    "anthropic": ("ANTHROPIC_API_KEY", "LLM_ANTHROPIC_MODEL", "claude-3-5-haiku-latest"),
+    "google": ("GOOGLE_API_KEY", "LLM_GOOGLE_MODEL", "gemini-1.5-flash"),
+}
+
+DEADLINE = float(os.getenv("LLM_DEADLINE", 20))
+HEDGE_MIN = float(os.getenv("LLM_HEDGE_MIN", 1.0))
+HEDGE_DEFAULT = float(os.getenv("LLM_HEDGE_DEFAULT", 3.0))
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+FAILURES_TO_OPEN = 5
+OPEN_SECONDS = 30
+
+
+class LLMTimeout(TimeoutError):
+    pass
+
+
+class LLMUnavailable(RuntimeError):
+    pass
+
+
+def _build_model(name, temperature, timeout):
+    common = {"model": model_name(name), "temperature": temperature, "timeout": timeout, "max_retries": 0}
+    if name == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(http_client=registry.get("http.llm"), **common)
+    if name == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(http_client=registry.get("http.llm"), **common)
+    if name == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(**common)
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(**common)
+
+
+def model_name(provider):
+    _, model_env, default_model = PROVIDERS[provider]
+    return os.getenv(model_env, default_model)
+
+
+class ProviderHealth:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+        self.counts = {"calls": 0, "errors": 0, "won": 0, "hedged": 0}
+        self.lock = threading.Lock()
+
+    def available(self):
+        with self.lock:
+            if self.failures < FAILURES_TO_OPEN:
+                return True
+            # Half-open: let a single trial call through after the cool-down.
+            if time.monotonic() >= self.open_until and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def p95(self):
+        with self.lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return HEDGE_DEFAULT
+            ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def success(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.failures = 0
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.counts["errors"] += 1
+            self.failures += 1
+            self.trial = False
+            if self.failures >= FAILURES_TO_OPEN:
+                self.open_until = time.monotonic() + OPEN_SECONDS
+
+    def count(self, field):
+        with self.lock:
+            self.counts[field] += 1
+
+
+class LLMRouter:
+    def __init__(self, providers=None):
+        order = providers or os.getenv("LLM_PROVIDERS", "groq,openai,anthropic,google")
+        names = [p.strip() for p in order.split(",") if p.strip() in PROVIDERS]
+        self.providers = [p for p in names if os.getenv(PROVIDERS[p][0])] or names[:1]
+        self.health = {p: ProviderHealth(p) for p in self.providers}
+        self.pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_POOL_SIZE", 32)),
+                                       thread_name_prefix="llm")
+
+    def signature(self):
+        return ",".join(f"{p}:{model_name(p)}" for p in self.providers)
+
+    def _model(self, provider, temperature):
+        return registry.get(
+            f"llm.{provider}.{temperature}",
+            lambda: _build_model(provider, temperature, DEADLINE),
+        )
+
+    def _call(self, provider, temperature, messages):
+        health = self.health[provider]
+        health.count("calls")
+        started = time.monotonic()
+        try:
+            result = self._model(provider, temperature).invoke(messages)
+        except Exception:
+            health.failure()
+            raise
+        health.success(time.monotonic() - started)
+        return result
+
+    def invoke(self, messages, temperature=0, deadline=None):
+        ends_at = time.monotonic() + (deadline or DEADLINE)
+        candidates = iter(self.providers)
+        running = {}
+        last_error = None
+
+        def start_next():
+            for provider in candidates:
+                if not self.health[provider].available():
+                    continue
+                running[self.pool.submit(self._call, provider, temperature, messages)] = provider
+                return provider
+            return None
+
+        primary = start_next()
+        if primary is None:
+            raise LLMUnavailable("All LLM providers are failing")
+        hedge_at = time.monotonic() + max(HEDGE_MIN, self.health[primary].p95())
+
+        while running:
+            now = time.monotonic()
+            if now >= ends_at:
+                break
+            timeout = min(ends_at, hedge_at) - now if hedge_at else ends_at - now
+            done, _ = wait(list(running), timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logging.warning(f"LLM provider {provider} failed: {e}")
+                    start_next()
+                    continue
+                self.health[provider].count("won")
+                return result
+            if not done and hedge_at and time.monotonic() >= hedge_at:
+                hedged = start_next()
+                if hedged:
+                    self.health[hedged].count("hedged")
+                hedge_at = None
+
+        if running:
+            raise LLMTimeout(f"No LLM answer within {deadline or DEADLINE}s")
+        raise LLMUnavailable(f"All LLM providers failed: {last_error}")
+
+    def snapshot(self):
+        report = {}
+        for provider, health in self.health.items():
+            with health.lock:
+                report[provider] = dict(
+                    health.counts,
+                    model=model_name(provider),
+                    open=health.failures >= FAILURES_TO_OPEN,
+                )
+            report[provider]["p95_s"] = round(health.p95(), 3)
+        return report
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter()
+    return _router
+
+
+def routed_model(temperature=0, deadline=None):
+    """A runnable that can stand in for a chat model in `prompt | model | parser` chains."""
+    from langchain_core.runnables import RunnableLambda
+
+    return RunnableLambda(
+        lambda messages: get_router().invoke(messages, temperature=temperature, deadline=deadline),
+        name="routed_llm",
+    )
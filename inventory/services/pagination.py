@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+from inventory.services.redis_setup import get_session, set_session
+
+# Keyset pagination for the WhatsApp list commands. Pages are ordered by
+# (created_at, id) descending and each page ends with a cursor, the key of
+# its last row, kept in the sender's session under "list:<scope>". The next
+# page is then a range read on the (broker, status, created_at) index
+# instead of an OFFSET that grows with the page number. A page without a
+# cursor (a jump straight to "list 7") falls back to OFFSET once and leaves
+# a cursor for the page after it.
+
+PAGE_SIZE = 10
+CURSOR_TTL = 1800
+MAX_CURSORS = 50
+
+ORDERING = ("-created_at", "-id")
+
+
+def _state(scope):
+    return get_session(f"list:{scope}") or {}
+
+
+def resume(scope, filters):
+    """
+    (filters, page) for a list request. "next" continues the sender's last
+    listing with its filters; otherwise the page asked for, default 1.
+    Compile the filters with services/filters.py before fetch().
+    """
+    filters = dict(filters or {})
+    if filters.pop("next", False):
+        state = _state(scope)
+        if state:
+            return state.get("filters", {}), state.get("page", 0) + 1
+        return filters, 1
+    try:
+        page = max(int(filters.get("page") or 1), 1)
+    except (TypeError, ValueError):
+        page = 1
+    return filters, page
+
+
+def _after(cursor):
+    created_at = datetime.fromisoformat(cursor["created_at"])
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor["id"])
+
+
+def fetch(qs, scope, spec, page, page_size=PAGE_SIZE):
+    """([rows of this page], has_next_page) for qs filtered by spec; remembers the next cursor."""
+    qs = qs.order_by(*ORDERING)
+    signature = spec.cache_key()
+    state = _state(scope)
+    cursors = state.get("cursors", {}) if state.get("signature") == signature else {}
+
+    cursor = cursors.get(str(page))
+    if page == 1:
+        rows = list(qs[:page_size + 1])
+    elif cursor:
+        rows = list(qs.filter(_after(cursor))[:page_size + 1])
+    else:
+        start = (page - 1) * page_size
+        rows = list(qs[start:start + page_size + 1])
+
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if has_next:
+        last = rows[-1]
+        cursors[str(page + 1)] = {"created_at": last.created_at.isoformat(), "id": str(last.id)}
+        if len(cursors) > MAX_CURSORS:
+            cursors.pop(min(cursors, key=int))
+
+    set_session(f"list:{scope}", {
+        "signature": signature,
+        "filters": spec.as_dict(),
+        "page": page,
+        "cursors": cursors,
+    }, ttl=CURSOR_TTL)
+    return rows, has_next
@@ -41,3 +41,13 @@ def pop_media_queue(broker_id):
         return []
     redis_client.delete(key)
     return json.loads(existing)
+
+def bump_media_upload_token(broker_id, ttl=60):
+    key = f"media_upload_token:{broker_id}"
+    token = redis_client.incr(key)
+    redis_client.expire(key, ttl)
+    return token
+
+def get_media_upload_token(broker_id):
+    val = redis_client.get(f"media_upload_token:{broker_id}")
+    return int(val) if val else None
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+
+# Process-wide registry of expensive objects (LLM clients, prompts, parsers,
+# chains, HTTP sessions). Each entry is registered as a factory at import
+# time, which is cheap, and built the first time it is asked for, once per
+# process. Heavy libraries are imported inside the factories, so importing
+# the views no longer pulls in langchain or renders format instructions.
+
+_factories = {}
+_instances = {}
+_build_ms = {}
+_lock = threading.RLock()
+
+
+def register(name, factory):
+    _factories[name] = factory
+
+
+def get(name, factory=None):
+    """Returns the entry, building it on first use (`factory` for unregistered names)."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            started = time.perf_counter()
+            _instances[name] = (factory or _factories[name])()
+            _build_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+        return _instances[name]
+
+
+def built():
+    """Build time in ms of every entry created so far in this process."""
+    with _lock:
+        return dict(_build_ms)
+
+
+def instances():
+    """The live instance dict; patch it with mock.patch.dict to swap an entry."""
+    return _instances
+
+
+def _http_client():
+    import httpx
+
+    return httpx.Client(
+        timeout=httpx.Timeout(float(os.getenv("LLM_DEADLINE", 20)), connect=5.0),
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+    )
+
+
+def _graph_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    return session
+
+
+def _twilio_client():
+    from twilio.rest import Client
+
+    return Client(os.getenv("TWILIO_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+
+
+register("http.llm", _http_client)
+register("http.graph", _graph_session)
+register("twilio.client", _twilio_client)
@@ -0,0 +1,83 @@
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+# Text search over listings. On Postgres, Property.search_vector holds a
+# weighted tsvector (title > locality/city > descriptions) kept current by a
+# post_save signal and served by a GIN index. Queries are prefix matches on
+# every word ("bane gym" finds "Baner ... gymnasium"), ranked by
+# ts_rank. When nothing matches, a pg_trgm word-similarity pass over title
+# and locality catches typos ("koregon" -> "Koregaon"); its cut-off is the
+# database's pg_trgm.word_similarity_threshold (0.6 unless tuned with ALTER
+# DATABASE ... SET). Other databases fall back to the old icontains filters.
+
+CONFIG = "english"
+
+# Saving any of these re-computes the vector.
+SEARCH_FIELDS = ("title", "locality", "city", "description_beautified", "description_raw")
+
+_WORD = re.compile(r"\w+", re.U)
+
+
+def is_supported():
+    return connection.vendor == "postgresql"
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("title", weight="A", config=CONFIG)
+        + SearchVector("locality", "city", weight="B", config=CONFIG)
+        + SearchVector("description_beautified", weight="C", config=CONFIG)
+        + SearchVector("description_raw", weight="D", config=CONFIG)
+    )
+
+
+def update_vectors(qs):
+    """Recomputes search_vector for every row of qs in one UPDATE."""
+    if is_supported():
+        return qs.update(search_vector=search_vector())
+    return 0
+
+
+def _prefix_query(text):
+    from django.contrib.postgres.search import SearchQuery
+
+    # Single letters ("gym's" -> "s") would prefix-match nearly everything.
+    words = [w for w in _WORD.findall(text.lower()) if len(w) > 1]
+    if not words:
+        return None
+    # Only \w characters reach the raw tsquery, so user input cannot inject operators.
+    return SearchQuery(" & ".join(f"{w}:*" for w in words), search_type="raw", config=CONFIG)
+
+
+def search(qs, text):
+    """qs narrowed to listings matching text, best match first."""
+    text = (text or "").strip()
+    if not text:
+        return qs
+    if not is_supported():
+        return qs.filter(
+            Q(title__icontains=text) | Q(description_beautified__icontains=text) | Q(locality__icontains=text)
+        ).order_by("-created_at", "-id")
+
+    from django.contrib.postgres.search import SearchRank, TrigramWordSimilarity
+
+    query = _prefix_query(text)
+    if query is not None:
+        ranked = (
+            qs.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-created_at", "-id")
+        )
+        if ranked.exists():
+            return ranked
+
+    return (
+        qs.filter(Q(title__trigram_word_similar=text) | Q(locality__trigram_word_similar=text))
+        .annotate(similarity=Greatest(TrigramWordSimilarity(text, "title"), TrigramWordSimilarity(text, "locality")))
+        .order_by("-similarity", "-created_at", "-id")
+    )
@@ -1,11 +1,15 @@
 # services/sender_meta.py
-import os, requests
+import os
 from dotenv import load_dotenv
 load_dotenv()
 
 META_TOKEN = os.getenv("META_TOKEN")  # from Facebook developer app
 PHONE_NUMBER_ID = os.getenv("META_PHONE_NUMBER_ID")  # your WABA ID
 import logging
+import time
+from .delivery_metrics import record_outbound
+from . import registry
+
 def send_whatsapp_text(to, text):
     url = f"https://graph.facebook.com/v22.0/{PHONE_NUMBER_ID}/messages"
     headers = {
@@ -20,11 +24,14 @@ def send_whatsapp_text(to, text):
         "type": "text",
         "text": {"body": text}
     }
+    queued_at = time.time()
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=10)
+        r = registry.get("http.graph").post(url, headers=headers, json=payload, timeout=10)
         logging.info(f"Meta send text -> {to} | status {r.status_code} | resp {r.text}")
         r.raise_for_status()
-        return r.json()
+        data = r.json()
+        record_outbound(data, "text", queued_at)
+        return data
     except Exception as e:
         logging.exception("Failed to send whatsapp text via Meta")
         return None
@@ -51,12 +58,15 @@ def send_whatsapp_media(to, media_url, media_type="image"):
         }
     }
 
+    queued_at = time.time()
     try:
         logging.info(f"📤 Sending media to {to}: {payload}")
-        r = requests.post(url, headers=headers, json=payload, timeout=10)
+        r = registry.get("http.graph").post(url, headers=headers, json=payload, timeout=10)
         logging.info(f"Meta media response ({r.status_code}): {r.text}")
         r.raise_for_status()
-        return r.json()
+        data = r.json()
+        record_outbound(data, media_type, queued_at)
+        return data
     except Exception as e:
         logging.exception("❌ Failed to send whatsapp media via Meta")
         return None
@@ -1,20 +1,12 @@
 import os
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain_core.prompts.chat import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from .schema import PropertySchema
+from .llm_router import get_router
 from inventory.models import Property, MediaAsset
 from dotenv import load_dotenv
 
 load_dotenv()
 
 def generate_property_message(prop, broker):
-    model = ChatGroq(
-        model = "llama-3.3-70b-versatile",
-        temperature = 0.7
-    )
-
     bhk_display = f"{prop.bhk} BHK" if prop.bhk else ""
     if prop.bhk == 1 and (
         "studio" in (prop.title or "").lower() 
@@ -62,7 +54,7 @@ def generate_property_message(prop, broker):
     Contact Broker:
     {broker.name} ({broker.phone_number})"""
 
-    response = model.invoke(prompt)
+    response = get_router().invoke(prompt, temperature=0.7)
     return response.content
 
 
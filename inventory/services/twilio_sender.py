@@ -1,17 +1,10 @@
-from twilio.rest import Client
 import os
+from . import registry
 
-_twilio_client =  None
 
 def get_client():
-    global _twilio_client
+    return registry.get("twilio.client")
 
-    if _twilio_client is None:
-        sid = os.getenv("TWILIO_SID")
-        token = os.getenv("TWILIO_AUTH_TOKEN")
-        
-        _twilio_client = Client(sid, token)
-    return _twilio_client
 
 def send_whatsapp(to_number: str, body :str, from_number:str | None = None):
     client = get_client()
@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from inventory.services import embeddings, inventory_version
+
+# In-process similarity index over each broker's active listings: one
+# float32 matrix of unit vectors per broker, searched with a single
+# matrix-vector product. An index is loaded on first search and kept in
+# step with the broker's inventory version: after a write only the rows
+# updated since the last sync are re-read, and a full reload happens only
+# when the row count no longer matches (deletes, bulk updates).
+
+MAX_BROKERS = int(os.getenv("VECTOR_INDEX_BROKERS", 64))
+MIN_SCORE = float(os.getenv("VECTOR_SEARCH_MIN_SCORE", 0.1))
+# Re-read this far back so writes that committed after a sync but were
+# timestamped before it are not missed.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BrokerIndex:
+    def __init__(self, broker_id):
+        self.broker_id = broker_id
+        self.lock = threading.Lock()
+        self.version = None
+        self.synced_at = None
+        self._reset()
+
+    def _reset(self, capacity=64):
+        self.matrix = np.zeros((capacity, embeddings.DIM), dtype=np.float32)
+        self.pks = []
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.pks)
+
+    def upsert(self, pk, vec):
+        row = self.rows.get(pk)
+        if row is None:
+            row = len(self.pks)
+            if row == len(self.matrix):
+                grown = np.zeros((len(self.matrix) * 2, embeddings.DIM), dtype=np.float32)
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.pks.append(pk)
+            self.rows[pk] = row
+        self.matrix[row] = vec
+
+    def remove(self, pk):
+        row = self.rows.pop(pk, None)
+        if row is None:
+            return
+        last = len(self.pks) - 1
+        if row != last:
+            # Move the last row into the hole to keep the matrix dense.
+            moved = self.pks[last]
+            self.matrix[row] = self.matrix[last]
+            self.pks[row] = moved
+            self.rows[moved] = row
+        self.pks.pop()
+
+    def _active(self):
+        from inventory.models import Property
+
+        return Property.objects.filter(broker_id=self.broker_id, status="active").exclude(embedding=None)
+
+    def load(self):
+        rows = list(self._active().values_list("pk", "embedding"))
+        self._reset(capacity=max(64, len(rows)))
+        for pk, data in rows:
+            vec = embeddings.unpack(data)
+            if vec is not None:
+                self.upsert(str(pk), vec)
+
+    def sync(self, since):
+        from inventory.models import Property
+
+        changed = (
+            Property.objects.filter(broker_id=self.broker_id, updated_at__gte=since - SYNC_OVERLAP)
+            .values_list("pk", "status", "embedding")
+        )
+        for pk, status, data in changed:
+            vec = embeddings.unpack(data) if status == "active" else None
+            if vec is None:
+                self.remove(str(pk))
+            else:
+                self.upsert(str(pk), vec)
+        if len(self) != self._active().count():
+            self.load()
+
+    def refresh(self):
+        try:
+            version = inventory_version.current(self.broker_id)
+        except Exception:
+            logging.exception("Inventory version lookup failed")
+            version = None
+        if self.synced_at is not None and version is not None and version == self.version:
+            return
+        started = timezone.now()
+        if self.synced_at is None or version is None:
+            self.load()
+        else:
+            self.sync(self.synced_at)
+        self.version, self.synced_at = version, started
+
+    def search(self, vec, k):
+        scores = self.matrix[:len(self)] @ vec
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.pks[i], float(scores[i])) for i in top]
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def _index(broker_id):
+    key = str(broker_id)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = BrokerIndex(key)
+            if len(_indexes) > MAX_BROKERS:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+        return index
+
+
+def search(broker_id, text, k=5, min_score=MIN_SCORE):
+    """[(property pk, similarity)] of the broker's active listings closest to text."""
+    vec = embeddings.embed(text)
+    if not vec.any():
+        return []
+    index = _index(broker_id)
+    with index.lock:
+        index.refresh()
+        matches = index.search(vec, k)
+    return [(pk, round(score, 3)) for pk, score in matches if score >= min_score]
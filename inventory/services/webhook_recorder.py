@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlencode
+
+from django.conf import settings
+
+from inventory.services.intent_model import mask
+
+# Set WEBHOOK_RECORD_DIR to capture incoming webhook payloads as JSONL, one
+# file per endpoint, for replay with `manage.py loadtest_webhooks --replay`.
+# Payloads are customers' and brokers' own data, so they are masked before
+# they reach the disk: message text the same way as the intent label log
+# (intent_model.mask), names dropped, and phone numbers replaced by stable
+# pseudonyms of the same length, so a replay still has one lane per sender.
+RECORD_DIR = os.getenv("WEBHOOK_RECORD_DIR")
+
+# Meta JSON keys and Twilio form fields, by how they are masked.
+_PHONE_KEYS = {"from", "wa_id", "recipient_id", "to", "From", "To", "WaId"}
+_NAME_KEYS = {"name", "ProfileName"}
+_TEXT_KEYS = {"body", "caption", "Body"}
+
+_DIGITS = re.compile(r"\d+")
+
+_lock = threading.Lock()
+
+
+def _pseudonym(value):
+    def replace(match):
+        digits = match.group(0)
+        digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), digits.encode("utf-8"), hashlib.sha256).hexdigest()
+        return str(int(digest, 16))[-len(digits):]
+
+    return _DIGITS.sub(replace, value)
+
+
+def _mask_value(key, value):
+    if isinstance(value, dict):
+        return {k: _mask_value(k, v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_mask_value(key, v) for v in value]
+    if not isinstance(value, str):
+        return value
+    if key in _PHONE_KEYS:
+        return _pseudonym(value)
+    if key in _NAME_KEYS:
+        return ""
+    if key in _TEXT_KEYS:
+        return mask(value)
+    return value
+
+
+def mask_body(body, content_type):
+    """The recorded form of a webhook body (JSON or form-encoded)."""
+    if content_type == "application/json":
+        try:
+            return json.dumps(_mask_value(None, json.loads(body)))
+        except ValueError:
+            return mask(body)
+    fields = parse_qs(body, keep_blank_values=True)
+    return urlencode({k: _mask_value(k, v) for k, v in fields.items()}, doseq=True)
+
+
+def record_webhook(request, endpoint):
+    if not RECORD_DIR or request.method != "POST":
+        return
+    line = json.dumps({
+        "endpoint": endpoint,
+        "content_type": request.content_type,
+        "body": mask_body(request.body.decode("utf-8", "replace"), request.content_type),
+        "ts": time.time(),
+    })
+    try:
+        with _lock, open(os.path.join(RECORD_DIR, f"{endpoint}.jsonl"), "a") as f:
+            f.write(line + "\n")
+    except OSError:
+        pass
@@ -0,0 +1,63 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Broker, MediaAsset, Property
+from .services import dup_index, inventory_version, search
+
+_DUP_FIELDS = {"description_raw", "description_beautified", "city", "bhk", "price", "area_sqft"}
+
+
+@receiver(post_save, sender=Property)
+def index_property_for_duplicates(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not _DUP_FIELDS.intersection(update_fields):
+        return
+    try:
+        dup_index.index_property(instance)
+    except Exception:
+        logging.exception(f"Failed to index property {instance.pk} for duplicates")
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_from_duplicates(sender, instance, **kwargs):
+    try:
+        dup_index.remove_property(instance.pk)
+    except Exception:
+        logging.exception(f"Failed to remove property {instance.pk} from the duplicate index")
+
+
+@receiver(post_save, sender=Property)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    # A tsvector is computed by the database, so it takes an UPDATE after the save.
+    if update_fields and not set(search.SEARCH_FIELDS).intersection(update_fields):
+        return
+    try:
+        search.update_vectors(Property.objects.filter(pk=instance.pk))
+    except Exception:
+        logging.exception(f"Failed to update the search vector of property {instance.pk}")
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def bump_inventory_version(sender, instance, **kwargs):
+    # After commit, so nothing is cached under the new version from a
+    # snapshot that does not include this write yet.
+    broker_id = instance.broker_id
+    transaction.on_commit(lambda: inventory_version.bump(broker_id))
+
+
+@receiver(post_save, sender=MediaAsset)
+@receiver(post_delete, sender=MediaAsset)
+def bump_inventory_version_for_media(sender, instance, **kwargs):
+    broker_id = Property.objects.filter(pk=instance.property_id).values_list("broker_id", flat=True).first()
+    if broker_id:
+        transaction.on_commit(lambda: inventory_version.bump(broker_id))
+
+
+@receiver(post_save, sender=Broker)
+def bump_inventory_version_for_broker(sender, instance, **kwargs):
+    # /brokers/me/ is served under the same version.
+    broker_id = instance.pk
+    transaction.on_commit(lambda: inventory_version.bump(broker_id))
@@ -0,0 +1,134 @@
+import logging
+
+from celery import shared_task
+
+from .models import Broker, Property
+from .services import idempotency, lanes
+from .services.redis_setup import redis_client, get_media_upload_token
+
+
+def _lane_handler(key):
+    kind = key.split(":", 1)[0]
+    if kind == "meta":
+        from .views_ai import handle_meta_message
+        return handle_meta_message
+    raise ValueError(f"No handler for lane {key}")
+
+
+def submit_to_lane(key, payloads):
+    """
+    Queues payloads on a lane (e.g. "meta:<phone>") and schedules a drain.
+    Jobs of one lane run in order; different lanes run in parallel.
+    Raises only if the payloads could not be queued. Once they are on the
+    lane a failed schedule is just logged: the jobs run with the lane's
+    next drain, so the caller must not treat them as lost.
+    """
+    lanes.push(key, payloads)
+    try:
+        drain_lane.delay(key)
+    except Exception:
+        logging.exception(f"[ERROR] Queued {len(payloads)} job(s) on lane {key} but could not schedule a drain")
+
+
+@shared_task
+def drain_lane(key):
+    handler = _lane_handler(key)
+
+    def run(payload):
+        msg_id = payload.get("id")
+        if msg_id and not idempotency.begin(msg_id):
+            logging.info(f"Lane {key} job {msg_id} already processed, skipping.")
+            return
+        result = handler(payload)
+        if msg_id:
+            idempotency.complete(msg_id)
+        logging.info(f"Lane {key} job {msg_id} processed: {result}")
+
+    def dead(payload):
+        # The claim is held until the lane gives up on the job, so a
+        # redelivery that arrives meanwhile is absorbed, not queued twice.
+        if payload.get("id"):
+            idempotency.release(payload["id"])
+
+    handled = lanes.drain(key, run, on_dead=dead)
+    if handled is None and lanes.pending(key):
+        # Another worker owns the lane. If it dies mid-job its lock lapses,
+        # so look again once the lock would have expired.
+        countdown = max(lanes.lock_ttl_ms(key), 1000) / 1000
+        if redis_client.set(f"lane:recheck:{key}", 1, nx=True, ex=int(countdown) + 1):
+            drain_lane.apply_async(args=(key,), countdown=countdown)
+    return handled
+
+
+@shared_task
+def flush_media_uploads(broker_id, property_pk, phone, token):
+    """
+    Uploads the media queued for a broker once no new media arrived for a
+    few seconds. Older scheduled flushes see a newer token and step aside.
+    """
+    from .views_ai import schedule_media_upload
+
+    if get_media_upload_token(broker_id) != token:
+        return "Superseded"
+
+    try:
+        broker = Broker.objects.get(id=broker_id)
+        property_obj = Property.objects.get(pk=property_pk)
+    except (Broker.DoesNotExist, Property.DoesNotExist):
+        return "Property not found"
+
+    schedule_media_upload(broker, property_obj, phone)
+    return "Media uploaded"
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3)
+def enrich_property(self, property_pk):
+    """
+    Second phase of adding a property: runs extraction on the draft's
+    description, fills in the fields the broker has not edited meanwhile,
+    activates it and sends the broker a summary.
+    """
+    from .services.delivery_metrics import set_delivery_context
+    from .services.extract import apply_schema, extract_fields
+    from .services.sender_meta import send_whatsapp_text
+    from .views_twilio import enrichment_summary
+
+    try:
+        prop = Property.objects.select_related("broker").get(pk=property_pk)
+    except Property.DoesNotExist:
+        return "Property not found"
+    flags = prop.moderation_flags or {}
+    if flags.get("enrichment") != "pending":
+        return "Already enriched"
+    set_delivery_context(broker_id=prop.broker_id, tag="enrich_property")
+
+    try:
+        result = extract_fields(prop.description_raw)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=5 * 2 ** self.request.retries)
+        logging.exception(f"Enrichment failed for property {property_pk}")
+        flags["enrichment"] = "failed"
+        # save(), not update(): moderation_flags is in the API responses, so the inventory version must move.
+        prop.moderation_flags = flags
+        prop.save(update_fields=["moderation_flags", "updated_at"])
+        send_whatsapp_text(
+            prop.broker.phone_number,
+            f"⚠️ Couldn't read all the details of [{prop.property_id}]. Reply 'edit {prop.property_id}' to fill them in.",
+        )
+        return "Enrichment failed"
+
+    # Re-read so edits made while the LLM was running are not overwritten.
+    prop.refresh_from_db()
+    flags = prop.moderation_flags or {}
+    changed = apply_schema(prop, result, flags.get("draft", {}))
+    flags["enrichment"] = "done"
+    flags.pop("draft", None)
+    prop.moderation_flags = flags
+    if prop.status == "draft":
+        prop.status = "active"
+    prop.refresh_short_code()
+    prop.save(update_fields=changed + ["moderation_flags", "status", "short_code", "updated_at"])
+
+    send_whatsapp_text(prop.broker.phone_number, enrichment_summary(prop))
+    return f"Enriched {len(changed)} fields"
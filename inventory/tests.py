@@ -1,3 +1,1062 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import parse_qs
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from redis import RedisError
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from inventory import tasks, views_ai, views_twilio
+from inventory.models import Broker, IdCounter, MediaAsset, Property
+from inventory.services import (
+    dup_index, facets, idempotency, inventory_version, lanes, llm_router, pagination, search, webhook_recorder,
+)
+from inventory.services.ai_intent import CustomerIntent
+from inventory.services.command_parser import parse_customer_command, parse_user_command
+from inventory.services.extract import field_snapshot
+from inventory.services.filters import FilterSpec, apply, compile_filters
+from inventory.services.intent_batcher import IntentBatcher
+from inventory.services.intent_cache import IntentCache, normalize
+from inventory.services.listing_rules import pre_extract
+from inventory.services.redis_setup import clear_session, get_session, redis_client
+from inventory.services.schema import PropertySchema
+from inventory.views import PropertyViewSet
+
+
+def redis_available():
+    try:
+        return redis_client.ping()
+    except RedisError:
+        return False
+
+
+needs_redis = skipUnless(redis_available(), "needs the Redis server at REDIS_URL")
+
+
+def delete_keys(pattern):
+    for key in redis_client.scan_iter(pattern):
+        redis_client.delete(key)
+
+
+class IdAllocationTests(TransactionTestCase):
+    """Parallel inserts must never share a property_id within a broker or a short_code."""
+
+    INSERTS = 200
+    THREADS = 8
+
+    def setUp(self):
+        self.brokers = [Broker.objects.create(phone_number=f"+9100000000{i}", name=f"Broker {i}") for i in range(3)]
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_parallel_inserts_get_unique_ids(self):
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def insert(worker):
+            start.wait()
+            try:
+                for n in range(worker, self.INSERTS, self.THREADS):
+                    broker = self.brokers[n % len(self.brokers)]
+                    Property(broker=broker, description_raw=f"listing {n}", status="draft").save()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            list(pool.map(insert, range(self.THREADS)))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Property.objects.count(), self.INSERTS)
+        self.assertFalse(
+            Property.objects.values("broker_id", "property_id").annotate(n=Count("id")).filter(n__gt=1).exists()
+        )
+        self.assertFalse(Property.objects.values("short_code").annotate(n=Count("id")).filter(n__gt=1).exists())
+        for broker in self.brokers:
+            ids = sorted(int(i) for i in broker.properties.values_list("property_id", flat=True))
+            self.assertEqual(ids, list(range(1, len(ids) + 1)))
+
+    def test_next_continues_from_seed(self):
+        self.assertEqual(IdCounter.next("property:seeded", seed=lambda: 41), 42)
+        self.assertEqual(IdCounter.next("property:seeded", seed=lambda: 0), 43)
+
+
+class CompileFiltersTests(SimpleTestCase):
+    def test_price_operators(self):
+        self.assertEqual(compile_filters({"price": "<=25k"}), FilterSpec(price_max=Decimal(25000)))
+        self.assertEqual(compile_filters({"price": "< 25000"}), FilterSpec(price_max=Decimal(25000)))
+        self.assertEqual(compile_filters({"price": ">= 1.5 Cr"}), FilterSpec(price_min=Decimal(15000000)))
+        self.assertEqual(compile_filters({"price": "=45,000"}), FilterSpec(price_max=Decimal(45000)))
+        self.assertEqual(compile_filters({"budget": 30000}), FilterSpec(price_max=Decimal(30000)))
+        self.assertEqual(
+            compile_filters({"price": "20k-30k"}), FilterSpec(price_min=Decimal(20000), price_max=Decimal(30000))
+        )
+        self.assertEqual(compile_filters({"price": "cheap"}), FilterSpec())
+
+    def test_furnishing_and_sale_or_rent_aliases(self):
+        for value, expected in [
+            ("Semi-Furnished", "semi"), ("semi furnished", "semi"), ("Fully Furnished", "fully"),
+            ("furnished", "fully"), ("not furnished", "unfurnished"), ("Unfurnished", "unfurnished"), ("posh", None),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(compile_filters({"furnishing": value}).furnishing, expected)
+        self.assertEqual(compile_filters({"type": "For Sale"}).sale_or_rent, "sale")
+        self.assertEqual(compile_filters({"sale_or_rent": "lease"}).sale_or_rent, "rent")
+
+    def test_values_are_canonical(self):
+        spec = compile_filters({"city": " pune ", "bhk": "2 BHK", "location": "Baner", "status": "inactive"})
+        self.assertEqual(spec, FilterSpec(city="Pune", locality="baner", status="disabled", bhk=2))
+        self.assertFalse(compile_filters({"page": 2, "next": True, "unknown": "x"}))
+
+    def test_cache_key_is_stable(self):
+        a = compile_filters({"city": "pune", "bhk": 2, "price": "<=25000"})
+        b = compile_filters({"price_max": "25000.0", "bhk": "2", "city": "PUNE"})
+        self.assertEqual(a.cache_key(), b.cache_key())
+        self.assertEqual(a.cache_key(), "bhk=2&city=Pune&price_max=25000")
+        self.assertNotEqual(a.cache_key(), compile_filters({"city": "pune"}).cache_key())
+        self.assertEqual(compile_filters(a.as_dict()), a)
+
+
+class ApplyFiltersTests(TestCase):
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="+919000000001", name="Broker")
+        Property.objects.bulk_create([
+            Property(broker=self.broker, description_raw="a", title="a", city="Pune", bhk=2, price=20000, furnishing="semi"),
+            Property(broker=self.broker, description_raw="b", title="b", city="Pune", bhk=2, price=25000, furnishing="fully"),
+            Property(broker=self.broker, description_raw="c", title="c", city="Pune City", bhk=2, price=18000),
+            Property(broker=self.broker, description_raw="d", title="d", city="pune", bhk=3, price=40000, sale_or_rent="sale"),
+        ])
+        self.qs = Property.objects.filter(broker=self.broker)
+
+    def titles(self, raw, **kwargs):
+        return sorted(apply(compile_filters(raw), self.qs, **kwargs).values_list("title", flat=True))
+
+    def test_city_is_an_exact_case_insensitive_match(self):
+        self.assertEqual(self.titles({"city": "PUNE"}), ["a", "b", "d"])
+
+    def test_price_bounds(self):
+        self.assertEqual(self.titles({"city": "pune", "price": "<=22000"}), ["a"])
+        self.assertEqual(self.titles({"price": ">25000"}), ["b", "d"])
+        self.assertEqual(self.titles({"price": "=25000"}), ["a", "b", "c"])
+
+    def test_customer_price_slack_widens_only_the_upper_bound(self):
+        self.assertEqual(self.titles({"city": "pune", "price": "22000"}, price_slack=1.15), ["a", "b"])
+        self.assertEqual(self.titles({"price": ">=25000"}, price_slack=1.15), ["b", "d"])
+
+    def test_choice_filters(self):
+        self.assertEqual(self.titles({"furnishing": "Semi-Furnished"}), ["a"])
+        self.assertEqual(self.titles({"furnishing": "fully furnished", "bhk": "2"}), ["b"])
+        self.assertEqual(self.titles({"type": "for sale"}), ["d"])
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.sessions = {}
+        for name in ("get_session", "set_session"):
+            patcher = mock.patch.object(pagination, name, getattr(self, f"_{name}"))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.broker = Broker.objects.create(phone_number="+919000000002", name="Broker")
+        Property.objects.bulk_create([
+            Property(broker=self.broker, description_raw=str(n), title=f"T{n}", city="Pune" if n % 5 else "Mumbai")
+            for n in range(30)
+        ])
+        self.qs = Property.objects.filter(broker=self.broker)
+
+    def _get_session(self, key):
+        return self.sessions.get(key)
+
+    def _set_session(self, key, data, ttl=600):
+        self.sessions[key] = data
+
+    def page(self, filters, scope="s"):
+        filters, page = pagination.resume(scope, filters)
+        spec = compile_filters(filters)
+        rows, has_next = pagination.fetch(apply(spec, self.qs), scope, spec, page)
+        return [p.title for p in rows], page, has_next
+
+    def test_next_walks_the_pages_by_cursor(self):
+        expected = list(self.qs.order_by(*pagination.ORDERING).filter(city="Pune").values_list("title", flat=True))
+        first, page, has_next = self.page({"city": "pune"})
+        self.assertEqual((first, page, has_next), (expected[:10], 1, True))
+
+        with self.assertNumQueries(1):
+            second, page, has_next = self.page({"next": True})
+        self.assertEqual((second, page, has_next), (expected[10:20], 2, True))
+        self.assertEqual(self.sessions["list:s"]["filters"], {"city": "Pune"})
+
+        third, page, has_next = self.page({"next": True})
+        self.assertEqual((third, page, has_next), (expected[20:], 3, False))
+
+    def test_page_jump_falls_back_to_offset(self):
+        expected = list(self.qs.order_by(*pagination.ORDERING).values_list("title", flat=True))
+        rows, page, has_next = self.page({"page": "3"})
+        self.assertEqual((rows, page, has_next), (expected[20:30], 3, False))
+
+    def test_next_without_a_listing_starts_at_page_one(self):
+        self.assertEqual(pagination.resume("fresh", {"next": True}), ({}, 1))
+
+    def test_new_filters_drop_the_old_cursors(self):
+        self.page({"city": "pune"})
+        self.page({"next": True})
+        rows, page, _ = self.page({"city": "mumbai", "page": 2})
+        self.assertEqual((rows, page), ([], 2))
+        self.assertEqual(set(self.sessions["list:s"]["cursors"]), set())
+
+
+class ListingRulesTests(SimpleTestCase):
+    def test_contradictory_furnishing_is_left_to_the_llm(self):
+        self.assertNotIn("furnishing", pre_extract("Furnished flat in Baner, 2bhk, not furnished kitchen"))
+        self.assertEqual(pre_extract("furnished 1bhk")["furnishing"], "fully")
+        self.assertEqual(pre_extract("Fully furnished flat, furnished with AC")["furnishing"], "fully")
+        self.assertEqual(pre_extract("2bhk not furnished")["furnishing"], "unfurnished")
+
+    def test_floor_of_total(self):
+        fields = pre_extract("2nd floor of 7, 2bhk")
+        self.assertEqual((fields["floor"], fields["total_floors"]), (2, 7))
+
+
+@needs_redis
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        self.scope = f"test-{uuid.uuid4().hex}"
+        self.addCleanup(delete_keys, f"idem:{self.scope}:*")
+        patcher = mock.patch.object(idempotency, "_front", idempotency._FrontCache(100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claim(self, msg_id):
+        return idempotency.claim(msg_id, scope=self.scope)
+
+    def test_only_one_concurrent_claim_wins(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            states = list(pool.map(lambda _: self.claim("m1"), range(8)))
+        self.assertEqual(sorted(states), ["claimed"] + ["inflight"] * 7)
+
+    def test_inflight_then_completed(self):
+        self.assertEqual(self.claim("m1"), "claimed")
+        self.assertEqual(self.claim("m1"), "inflight")
+        idempotency.complete("m1", scope=self.scope)
+        self.assertEqual(self.claim("m1"), "completed")
+
+    def test_release_allows_a_new_claim(self):
+        self.claim("m1")
+        idempotency.release("m1", scope=self.scope)
+        self.assertEqual(self.claim("m1"), "claimed")
+        idempotency.complete("m1", scope=self.scope)
+        idempotency.release("m1", scope=self.scope)
+        self.assertEqual(self.claim("m1"), "claimed")
+
+    def test_begin_renews_the_claim_unless_completed(self):
+        self.assertTrue(idempotency.begin("m1", scope=self.scope))
+        self.assertEqual(redis_client.get(f"idem:{self.scope}:m1"), idempotency.INFLIGHT)
+        self.assertGreater(redis_client.ttl(f"idem:{self.scope}:m1"), 0)
+        idempotency.complete("m1", scope=self.scope)
+        idempotency._front.discard(f"idem:{self.scope}:m1")
+        self.assertFalse(idempotency.begin("m1", scope=self.scope))
+
+    def test_stats_count_hits_and_misses(self):
+        before = idempotency.idempotency_stats()
+        self.claim("m1")
+        self.claim("m1")
+        idempotency.complete("m1", scope=self.scope)
+        idempotency._front.discard(f"idem:{self.scope}:m1")
+        self.claim("m1")
+        self.claim("m1")
+        after = idempotency.idempotency_stats()
+        delta = {k: after[k] - before[k] for k in ("miss", "hit_inflight", "hit_completed", "front_cache_hits")}
+        self.assertEqual(delta, {"miss": 1, "hit_inflight": 1, "hit_completed": 1, "front_cache_hits": 1})
+
+
+class FrontCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(idempotency.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_expire_by_ttl(self):
+        cache = idempotency._FrontCache(10)
+        cache.add("a", ttl=5)
+        self.assertIn("a", cache)
+        self.now += 6
+        self.assertNotIn("a", cache)
+        self.assertEqual(len(cache.items), 0)
+
+    def test_oldest_entry_is_evicted_at_capacity(self):
+        cache = idempotency._FrontCache(2)
+        for key in ("a", "b", "c"):
+            cache.add(key, ttl=60)
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.hits, 2)
+
+    def test_size_zero_disables_the_cache(self):
+        cache = idempotency._FrontCache(0)
+        cache.add("a", ttl=60)
+        self.assertNotIn("a", cache)
+
+
+@needs_redis
+class LaneTests(SimpleTestCase):
+    def setUp(self):
+        self.key = f"test:{uuid.uuid4().hex}"
+        self.addCleanup(delete_keys, f"lane:*{self.key}")
+        self.addCleanup(redis_client.zrem, "lane:depth", self.key)
+        self.addCleanup(redis_client.zrem, "lane:wait_ms", self.key)
+        self.seen = []
+
+    def handler(self, payload):
+        self.seen.append(payload["n"])
+        if payload.get("fail"):
+            raise ValueError("boom")
+
+    def test_jobs_run_in_order_and_are_counted_once(self):
+        lanes.push(self.key, [{"n": 1}, {"n": 2}])
+        lanes.push(self.key, [{"n": 3}])
+        self.assertEqual(lanes.drain(self.key, self.handler), 3)
+        self.assertEqual(self.seen, [1, 2, 3])
+        self.assertEqual(lanes.pending(self.key), 0)
+        self.assertEqual(redis_client.hget(f"lane:stats:{self.key}", "jobs"), "3")
+        self.assertIsNone(redis_client.zscore("lane:depth", self.key))
+
+    def test_job_left_by_a_dead_worker_is_counted_once(self):
+        lanes.push(self.key, [{"n": 1}])
+        with mock.patch.object(self, "handler", side_effect=SystemExit), self.assertRaises(SystemExit):
+            lanes.drain(self.key, self.handler)
+        self.assertEqual(lanes.pending(self.key), 1)
+        lanes.drain(self.key, self.handler)
+        self.assertEqual(self.seen, [1])
+        self.assertEqual(redis_client.hget(f"lane:stats:{self.key}", "jobs"), "1")
+        self.assertIsNone(redis_client.zscore("lane:depth", self.key))
+
+    def test_failing_job_is_dead_lettered_after_max_attempts(self):
+        dead = []
+        lanes.push(self.key, [{"n": 1, "fail": True}, {"n": 2}])
+        with mock.patch.object(lanes, "LANE_MAX_ATTEMPTS", 3), mock.patch.object(lanes.time, "sleep"), \
+                self.assertLogs(level="ERROR"):
+            self.assertEqual(lanes.drain(self.key, self.handler, on_dead=dead.append), 2)
+        self.assertEqual(self.seen, [1, 1, 1, 2])
+        self.assertEqual(dead, [{"n": 1, "fail": True}])
+        [letter] = lanes.dead_letters(self.key)
+        self.assertEqual((letter["payload"], letter["error"]), ({"n": 1, "fail": True}, "failed 3 time(s)"))
+        self.assertEqual(lanes.pending(self.key), 0)
+
+    def test_a_job_gets_one_attempt_by_default(self):
+        lanes.push(self.key, [{"n": 1, "fail": True}])
+        with self.assertLogs(level="ERROR"):
+            lanes.drain(self.key, self.handler)
+        self.assertEqual(self.seen, [1])
+        self.assertEqual(len(lanes.dead_letters(self.key)), 1)
+
+    def test_lane_held_by_another_worker(self):
+        token = lanes.acquire(self.key)
+        lanes.push(self.key, [{"n": 1}])
+        self.assertIsNone(lanes.drain(self.key, self.handler))
+        self.assertEqual((self.seen, lanes.pending(self.key)), ([], 1))
+        lanes.release(self.key, token)
+        self.assertEqual(lanes.drain(self.key, self.handler), 1)
+
+    def test_lane_lock_gives_up_after_timeout(self):
+        with lanes.lane_lock(self.key) as held:
+            self.assertTrue(held)
+            with self.assertLogs(level="WARNING"), lanes.lane_lock(self.key, timeout=0.1, poll=0.01) as busy:
+                self.assertFalse(busy)
+        self.assertIsNone(redis_client.get(f"lane:lock:{self.key}"))
+
+
+@needs_redis
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="+919000000003", name="Broker")
+        self.addCleanup(delete_keys, f"inv:*{self.broker.id}*")
+        self.client = APIClient()
+        self.client.force_authenticate(self.broker)
+        self.url = f"/api/properties/?broker={self.broker.id}"
+
+    def add_property(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Property.objects.create(broker=self.broker, description_raw="2bhk in Baner", **fields)
+
+    def test_unchanged_inventory_is_a_304_without_queries(self):
+        self.add_property(title="A")
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.add_property(title="B")
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+        self.assertEqual(len(changed.json()["results"]), 2)
+
+    def test_versions_are_read_once_per_request(self):
+        with mock.patch.object(inventory_version.redis_client, "mget", wraps=redis_client.mget) as mget:
+            self.client.get(self.url)
+        self.assertEqual(mget.call_count, 1)
+
+    def test_property_and_media_saves_bump_the_version(self):
+        version = inventory_version.current(self.broker.id)
+        prop = self.add_property(title="A")
+        self.assertEqual(inventory_version.current(self.broker.id), version + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            MediaAsset.objects.create(property=prop, media_type="image", storage_url="https://example.com/a.jpg")
+        self.assertEqual(inventory_version.current(self.broker.id), version + 2)
+        self.assertIsNotNone(inventory_version.last_modified(self.broker.id))
+
+    def test_error_responses_carry_no_validators(self):
+        with mock.patch.object(PropertyViewSet, "page_response", return_value=Response(status=503)):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+
+@needs_redis
+class MetaWebhookBatchTests(SimpleTestCase):
+    def setUp(self):
+        self.ids = {}
+        self.queued = []
+        patcher = mock.patch.object(views_ai, "submit_to_lane", side_effect=self.submit)
+        self.submit_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def msg(self, name, sender):
+        msg_id = self.ids.setdefault(name, f"wamid.{uuid.uuid4().hex}")
+        self.addCleanup(idempotency.release, msg_id)
+        return {"id": msg_id, "from": f"91{sender}", "type": "text", "text": {"body": name}}
+
+    def submit(self, key, msg_objs):
+        self.queued.append((key, [m["text"]["body"] for m in msg_objs]))
+
+    def post(self, *entries):
+        body = {"entry": [{"changes": [{"value": {"messages": messages}} for messages in entry]} for entry in entries]}
+        return self.client.post("/api/whatsapp_webhook_meta", json.dumps(body), content_type="application/json")
+
+    def test_every_message_is_queued_per_sender_in_order(self):
+        response = self.post(
+            [[self.msg("a1", "9000000001"), self.msg("b1", "9000000002")], [self.msg("a2", "9000000001")]],
+            [[self.msg("b2", "9000000002"), self.msg("a3", "9000000001")]],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.queued, [("meta:9000000001", ["a1", "a2", "a3"]), ("meta:9000000002", ["b1", "b2"])])
+
+    def test_duplicates_inside_a_batch_are_dropped(self):
+        a1 = self.msg("a1", "9000000001")
+        self.post([[a1, self.msg("a2", "9000000001")], [a1]])
+        self.assertEqual(self.queued, [("meta:9000000001", ["a1", "a2"])])
+        self.queued.clear()
+        self.assertEqual(self.post([[a1]]).content, b"Duplicate message")
+        self.assertEqual(self.queued, [])
+
+    def test_queue_failure_releases_only_the_unqueued_messages(self):
+        self.submit_mock.side_effect = [None, ConnectionError("redis down")]
+        with self.assertLogs(level="ERROR"):
+            response = self.post(
+                [[self.msg("a1", "9000000001"), self.msg("b1", "9000000002"), self.msg("c1", "9000000003")]]
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.submit_mock.call_count, 2)
+        self.assertEqual(idempotency.claim(self.ids["a1"]), "inflight")
+        self.assertEqual(idempotency.claim(self.ids["b1"]), "claimed")
+        self.assertEqual(idempotency.claim(self.ids["c1"]), "claimed")
+
+
+@needs_redis
+class SubmitToLaneTests(SimpleTestCase):
+    def setUp(self):
+        self.key = f"test:{uuid.uuid4().hex}"
+        self.addCleanup(delete_keys, f"lane:*{self.key}")
+        self.addCleanup(redis_client.zrem, "lane:depth", self.key)
+
+    def test_jobs_stay_queued_when_the_drain_cannot_be_scheduled(self):
+        with mock.patch.object(tasks.drain_lane, "delay", side_effect=ConnectionError("broker down")), \
+                self.assertLogs(level="ERROR"):
+            tasks.submit_to_lane(self.key, [{"id": "m1"}, {"id": "m2"}])
+        self.assertEqual(lanes.pending(self.key), 2)
+
+    def test_push_failure_is_raised(self):
+        with mock.patch.object(tasks.lanes, "push", side_effect=ConnectionError("redis down")), \
+                mock.patch.object(tasks.drain_lane, "delay") as delay, self.assertRaises(ConnectionError):
+            tasks.submit_to_lane(self.key, [{"id": "m1"}])
+        delay.assert_not_called()
+
+
+@needs_redis
+class EnrichmentTests(TestCase):
+    DESCRIPTION = "2bhk semi furnished flat in Baner, rent 25000"
+
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="9000000004", name="Broker")
+        self.addCleanup(clear_session, self.broker.id)
+        self.addCleanup(delete_keys, f"inv:*{self.broker.id}*")
+        patcher = mock.patch.object(views_twilio.enrich_property, "delay")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("inventory.services.sender_meta.send_whatsapp_text")
+        self.sent = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_draft(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = views_twilio.handle_new_property(self.broker, msg=self.DESCRIPTION)
+        self.assertIn("Property saved", resp["texts"][0])
+        return Property.objects.get(broker=self.broker)
+
+    def enrich(self, prop, result=None, error=None):
+        fields = dict.fromkeys(PropertySchema.model_fields)
+        fields.update(result or {})
+        with mock.patch("inventory.services.extract.extract_fields") as extract_fields:
+            extract_fields.return_value = PropertySchema(**fields)
+            extract_fields.side_effect = error
+            outcome = tasks.enrich_property.apply(args=(str(prop.pk),)).result
+        prop.refresh_from_db()
+        return outcome, extract_fields
+
+    def test_draft_is_saved_from_the_listing_rules(self):
+        prop = self.new_draft()
+        rules = pre_extract(self.DESCRIPTION)
+        self.assertEqual(prop.status, "draft")
+        self.assertEqual((prop.bhk, prop.furnishing, int(prop.price)), (rules["bhk"], "semi", 25000))
+        self.assertEqual(prop.moderation_flags["enrichment"], "pending")
+        self.assertEqual(prop.moderation_flags["draft"], field_snapshot(prop))
+        views_twilio.enrich_property.delay.assert_called_once_with(str(prop.pk))
+        self.assertEqual(get_session(self.broker.id)["property_id"], prop.property_id)
+
+    def test_enrichment_fills_only_fields_the_broker_left_alone(self):
+        prop = self.new_draft()
+        prop.price = 30000
+        prop.save()
+        outcome, _ = self.enrich(prop, {"title": "Sunny Nest", "city": "Pune", "bhk": 3, "price": 26000.0})
+        self.assertEqual(outcome, "Enriched 3 fields")
+        self.assertEqual((prop.title, prop.city, prop.bhk, int(prop.price)), ("Sunny Nest", "Pune", 3, 30000))
+        self.assertEqual(prop.moderation_flags, {"enrichment": "done"})
+        self.assertIn("-PUN-3BHK-", prop.short_code)
+        self.sent.assert_called_once()
+
+    def test_enrichment_activates_the_draft(self):
+        prop = self.new_draft()
+        self.enrich(prop, {"city": "Pune"})
+        self.assertEqual(prop.status, "active")
+
+    def test_enrichment_leaves_a_disabled_listing_disabled(self):
+        prop = self.new_draft()
+        prop.status = "disabled"
+        prop.save()
+        self.enrich(prop, {"city": "Pune"})
+        self.assertEqual(prop.status, "disabled")
+
+    def test_failure_after_retries_marks_enrichment_failed(self):
+        prop = self.new_draft()
+        with self.assertLogs(level="ERROR"):
+            outcome, extract_fields = self.enrich(prop, error=RuntimeError("LLM down"))
+        self.assertEqual(outcome, "Enrichment failed")
+        self.assertEqual(extract_fields.call_count, tasks.enrich_property.max_retries + 1)
+        self.assertEqual((prop.status, prop.moderation_flags["enrichment"]), ("draft", "failed"))
+        self.assertIn(f"edit {prop.property_id}", self.sent.call_args.args[1])
+
+    def test_failed_enqueue_marks_enrichment_failed(self):
+        views_twilio.enrich_property.delay.side_effect = ConnectionError("broker down")
+        with self.assertLogs(level="ERROR"):
+            prop = self.new_draft()
+        self.assertEqual(prop.moderation_flags["enrichment"], "failed")
+
+
+class WebhookRecorderTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        patcher = mock.patch.object(webhook_recorder, "RECORD_DIR", self.dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, endpoint, body, content_type):
+        webhook_recorder.record_webhook(RequestFactory().post("/", body, content_type=content_type), endpoint)
+        with open(os.path.join(self.dir.name, f"{endpoint}.jsonl")) as f:
+            return [json.loads(line) for line in f]
+
+    def test_meta_payload_is_masked(self):
+        value = {
+            "contacts": [{"profile": {"name": "Asha Rao"}, "wa_id": "919876543210"}],
+            "messages": [{"id": "wamid.1", "from": "919876543210", "text": {"body": "call 9123456789 for 2bhk"}}],
+        }
+        [row] = self.record("meta", json.dumps({"entry": [{"changes": [{"value": value}]}]}), "application/json")
+        recorded = json.loads(row["body"])["entry"][0]["changes"][0]["value"]
+        self.assertNotIn("Asha", row["body"])
+        self.assertNotIn("9876543210", row["body"])
+        self.assertNotIn("9123456789", row["body"])
+        self.assertEqual(recorded["messages"][0]["text"]["body"], "call 0 for 0bhk")
+        self.assertEqual(recorded["messages"][0]["id"], "wamid.1")
+        sender = recorded["messages"][0]["from"]
+        self.assertEqual((len(sender), sender), (12, recorded["contacts"][0]["wa_id"]))
+
+    def test_twilio_form_is_masked_with_stable_pseudonyms(self):
+        form = "From=whatsapp%3A%2B919876543210&ProfileName=Asha&Body=view+12"
+        self.record("twilio", form, "application/x-www-form-urlencoded")
+        rows = self.record("twilio", form, "application/x-www-form-urlencoded")
+        fields = [parse_qs(row["body"]) for row in rows]
+        self.assertEqual(fields[0], fields[1])
+        self.assertEqual(fields[0]["Body"], ["view 0"])
+        self.assertNotIn("Asha", rows[0]["body"])
+        self.assertTrue(fields[0]["From"][0].startswith("whatsapp:+"))
+        self.assertNotIn("9876543210", rows[0]["body"])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="9000000005", name="Broker")
+        self.listings = {
+            title: self.add(title=title, locality=locality, description_raw=description)
+            for title, locality, description in [
+                ("Baner gymnasium view", "Baner", "2bhk near the highway"),
+                ("Quiet flat", "Aundh", "close to Baner gymnasium"),
+                ("Garden home", "Koregaon Park", "3bhk with a lawn"),
+            ]
+        }
+        self.qs = Property.objects.filter(broker=self.broker)
+
+    def add(self, **fields):
+        prop = Property(broker=self.broker, city="Pune", **fields)
+        with mock.patch("inventory.signals.dup_index"):
+            prop.save()
+        return prop
+
+    def titles(self, text):
+        return list(search.search(self.qs, text).values_list("title", flat=True))
+
+    @skipUnless(connection.vendor == "postgresql", "needs Postgres full-text search and pg_trgm")
+    def test_prefix_match_ranks_title_hits_first(self):
+        self.assertEqual(self.titles("bane gym"), ["Baner gymnasium view", "Quiet flat"])
+
+    @skipUnless(connection.vendor == "postgresql", "needs Postgres full-text search and pg_trgm")
+    def test_typos_fall_back_to_trigram_similarity(self):
+        self.assertEqual(self.titles("koregon"), ["Garden home"])
+
+    @skipUnless(connection.vendor == "postgresql", "needs Postgres full-text search and pg_trgm")
+    def test_vector_follows_saves(self):
+        prop = self.listings["Quiet flat"]
+        prop.title = "Sunny terrace"
+        prop.save(update_fields=["title"])
+        self.assertIn("Sunny terrace", self.titles("terrace"))
+
+    @skipUnless(connection.vendor != "postgresql", "the icontains fallback is for other databases")
+    def test_other_databases_fall_back_to_icontains(self):
+        self.assertEqual(self.titles("baner"), ["Baner gymnasium view"])
+        self.assertEqual(self.titles("park"), ["Garden home"])
+
+    def test_a_failed_vector_update_does_not_fail_the_save(self):
+        with mock.patch.object(search, "update_vectors", side_effect=RuntimeError("db hiccup")), \
+                self.assertLogs(level="ERROR"):
+            prop = self.add(title="Still saved", description_raw="1bhk")
+        self.assertTrue(Property.objects.filter(pk=prop.pk).exists())
+
+
+@needs_redis
+class DupIndexTests(TestCase):
+    LISTING = (
+        "Spacious 2 BHK flat for rent in Baner near Balewadi High Street, semi furnished with modular kitchen, "
+        "two balconies, covered parking and 24x7 security. Rent 25000, deposit 1 lakh, family preferred."
+    )
+    FIELDS = {"city": "Pune", "bhk": 2, "price": 25000}
+
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="9000000006", name="Broker")
+        self.addCleanup(delete_keys, f"dup:b:{self.broker.id}:*")
+
+    def add(self, text):
+        prop = Property.objects.create(broker=self.broker, description_raw=text, **self.FIELDS)
+        self.addCleanup(dup_index.remove_property, prop.pk)
+        return prop
+
+    def similar(self, text, scoped=True, **kwargs):
+        broker_id = self.broker.id if scoped else None
+        return dup_index.find_similar(text, broker_id=broker_id, fields=self.FIELDS, **kwargs)
+
+    def test_a_lightly_edited_repost_is_found(self):
+        prop = self.add(self.LISTING)
+        repost = self.LISTING.replace("family preferred", "families preferred").replace("two balconies", "2 balconies")
+        for scoped in (True, False):
+            [(pk, score)] = self.similar(repost, scoped=scoped)
+            self.assertEqual(pk, str(prop.pk))
+            self.assertGreaterEqual(score, dup_index.THRESHOLD)
+        self.assertEqual(self.similar(self.LISTING, exclude=prop.pk), [])
+
+    def test_an_unrelated_listing_is_not_flagged(self):
+        self.add(self.LISTING)
+        other = (
+            "Independent 4 BHK bungalow for sale in Koregaon Park with a private garden, servant quarters, "
+            "solar heating and three covered parkings. Asking 4.5 Cr, clear title, ready to move."
+        )
+        self.assertEqual(self.similar(other), [])
+
+    def test_delete_removes_the_listing(self):
+        prop = self.add(self.LISTING)
+        pk = prop.pk
+        prop.delete()
+        self.assertEqual(self.similar(self.LISTING), [])
+        self.assertFalse(redis_client.exists(f"dup:meta:{pk}"))
+
+    def test_short_text_stays_out_of_the_global_index(self):
+        prop = self.add("2bhk baner")
+        self.assertEqual(self.similar("2bhk baner")[0][0], str(prop.pk))
+        self.assertEqual(self.similar("2bhk baner", scoped=False), [])
+
+    def test_band_reads_are_capped(self):
+        # One band, so every copy lands in the same set and the cap alone decides what is read.
+        with mock.patch.multiple(dup_index, BANDS=1, ROWS=dup_index.NUM_PERM, MAX_BAND_CANDIDATES=2):
+            for _ in range(5):
+                self.add(self.LISTING)
+            self.assertEqual(len(self.similar(self.LISTING, limit=10)), 2)
+
+
+class CommandParserTests(SimpleTestCase):
+    def check(self, parse, cases):
+        for msg, expected in cases:
+            with self.subTest(msg=msg):
+                self.assertEqual(parse(msg), expected)
+
+    def test_user_commands(self):
+        self.check(parse_user_command, [
+            ("help", {"action": "help"}),
+            ("Help!", {"action": "help"}),
+            ("profile", {"action": "profile"}),
+            ("my profile.", {"action": "profile"}),
+            ("edit profile", {"action": "editprofile"}),
+            ("editprofile", {"action": "editprofile"}),
+            ("bot url", {"action": "boturl"}),
+            ("botlink", {"action": "boturl"}),
+            ("list", {"action": "list_properties", "filters": {"page": 1}}),
+            ("List 3", {"action": "list_properties", "filters": {"page": 3}}),
+            ("list page 12", {"action": "list_properties", "filters": {"page": 12}}),
+            ("next", {"action": "list_properties", "filters": {"next": True}}),
+            ("more page", {"action": "list_properties", "filters": {"next": True}}),
+            ("view 12", {"action": "view_property", "property_id": "12"}),
+            ("show property #12", {"action": "view_property", "property_id": "12"}),
+            ("share [7]", {"action": "share_property", "property_id": "7"}),
+            ("edit 7", {"action": "edit_property", "property_id": "7"}),
+            ("delete 7", {"action": "delete_property", "property_id": "7"}),
+            ("remove 7", {"action": "delete_property", "property_id": "7"}),
+            ("activate 7", {"action": "activate_property", "property_id": "7"}),
+            ("enable 7", {"action": "activate_property", "property_id": "7"}),
+            ("Disable 7.", {"action": "disable_property", "property_id": "7"}),
+        ])
+
+    def test_user_messages_left_to_the_llm(self):
+        self.check(parse_user_command, [
+            ("", None),
+            (None, None),
+            ("help me add a flat", None),
+            ("list 2bhk in baner", None),
+            ("list flats in pune", None),
+            ("view 12 and 13", None),
+            ("share 7 with Ravi", None),
+            ("edit", None),
+            ("next " + "x" * 60, None),
+            ("2bhk semi furnished flat in Baner, rent 25000", None),
+        ])
+
+    def test_customer_commands(self):
+        self.check(parse_customer_command, [
+            ("help", {"action": "help"}),
+            ("list", {"action": "list_properties", "filters": {"page": 1}}),
+            ("list 2", {"action": "list_properties", "filters": {"page": 2}}),
+            ("more", {"action": "list_properties", "filters": {"next": True}}),
+            ("search for sea facing flat", {"action": "search_properties", "filters": {"query": "sea facing flat"}}),
+            ("find gym", {"action": "search_properties", "filters": {"query": "gym"}}),
+            ("list pune", {"action": "list_properties", "filters": {"city": "Pune"}}),
+            ("list in navi mumbai", {"action": "list_properties", "filters": {"city": "Navi Mumbai"}}),
+            ("view 10", {"action": "view_property", "property_id": "10"}),
+            ("show property [10]", {"action": "view_property", "property_id": "10"}),
+        ])
+
+    def test_customer_messages_left_to_the_llm(self):
+        self.check(parse_customer_command, [
+            ("", None),
+            ("list flats in pune", None),
+            ("list flats", None),
+            ("list cheap flats", None),
+            ("list furnished", None),
+            ("list near baner", None),
+            ("share 10", None),
+            ("find it", None),
+            ("search " + "sea facing flat with a big balcony and parking " * 2, None),
+            ("show me 2bhk flats under 30k in baner", None),
+        ])
+
+
+@needs_redis
+class IntentCacheTests(SimpleTestCase):
+    VIEW_12 = {"action": "view_property", "property_id": "12", "filters": None}
+
+    def setUp(self):
+        self.kind = f"test-{uuid.uuid4().hex}"
+        self.addCleanup(delete_keys, f"icache:*{self.kind}*")
+
+    def cache(self, version="v1"):
+        return IntentCache(self.kind, version)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  View   12!! "), "view 12")
+        self.assertEqual(normalize("ＶＩＥＷ　１２."), "view 12")
+        self.assertEqual(normalize(None), "")
+
+    def test_ids_are_refilled_from_the_new_message(self):
+        cache = self.cache()
+        cache.put("view 12", self.VIEW_12)
+        self.assertEqual(cache.get("View 12"), self.VIEW_12)
+        self.assertEqual(cache.get("view 99!"), {**self.VIEW_12, "property_id": "99"})
+        self.assertEqual(self.cache().get("view 7"), {**self.VIEW_12, "property_id": "7"})
+
+    def test_numbers_not_copied_from_the_message_keep_the_literal_key(self):
+        cache = self.cache()
+        listing = {"action": "list_properties", "filters": {"price": "<=25000"}}
+        cache.put("list under 25k", listing)
+        self.assertEqual(cache.get("list under 25k"), listing)
+        self.assertIsNone(cache.get("list under 30k"))
+
+    def test_repeated_numbers_are_not_templated(self):
+        cache = self.cache()
+        share = {"action": "share_property", "property_id": "5", "filters": {"page": 5}}
+        cache.put("share 5 page 5", share)
+        self.assertIsNone(cache.get("share 6 page 6"))
+        self.assertEqual(cache.get("share 5 page 5"), share)
+
+    def test_distinct_numbers_keep_their_positions(self):
+        cache = self.cache()
+        cache.put("share 12 to 3", {"action": "share_property", "property_id": "12", "filters": {"page": 3}})
+        self.assertEqual(
+            cache.get("share 40 to 8"), {"action": "share_property", "property_id": "40", "filters": {"page": 8}}
+        )
+
+    def test_a_new_prompt_version_misses(self):
+        self.cache("v1").put("view 12", self.VIEW_12)
+        self.assertIsNone(self.cache("v2").get("view 12"))
+        cache = self.cache(lambda: "v1")
+        self.assertEqual(cache.get("view 12"), self.VIEW_12)
+        self.assertEqual((cache.version, cache.stats["hit_redis"]), ("v1", 1))
+
+
+class FakeModel:
+    """A chat model that answers (or fails) after delay seconds, or as soon as the test ends."""
+
+    def __init__(self, answer=None, delay=0.0, error=None, released=None):
+        self.answer, self.delay, self.error, self.released = answer, delay, error, released
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        self.released.wait(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+class LLMRouterTests(SimpleTestCase):
+    def setUp(self):
+        keys = {"GROQ_API_KEY": "test", "OPENAI_API_KEY": "test"}
+        with mock.patch.dict("os.environ", keys):
+            self.router = llm_router.LLMRouter("groq,openai")
+        self.released = threading.Event()
+        self.addCleanup(self.router.pool.shutdown, wait=False)
+        self.addCleanup(self.released.set)
+        self.models = {}
+        patcher = mock.patch.object(self.router, "_model", lambda provider, temperature: self.models[provider])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(llm_router, "HEDGE_MIN", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def model(self, provider, **kwargs):
+        self.models[provider] = FakeModel(released=self.released, **kwargs)
+        return self.models[provider]
+
+    def warm_up(self, provider, seconds):
+        for _ in range(llm_router.MIN_SAMPLES):
+            self.router.health[provider].success(seconds)
+
+    def test_hedges_to_the_next_provider_after_p95(self):
+        self.warm_up("groq", 0.05)
+        self.model("groq", answer="slow", delay=5)
+        self.model("openai", answer="fast")
+        started = time.monotonic()
+        self.assertEqual(self.router.invoke(["hi"]), "fast")
+        self.assertLess(time.monotonic() - started, 1)
+        report = self.router.snapshot()
+        self.assertEqual((report["openai"]["hedged"], report["openai"]["won"], report["groq"]["won"]), (1, 1, 0))
+
+    def test_no_hedge_before_p95(self):
+        self.warm_up("groq", 1.0)
+        self.model("groq", answer="primary", delay=0.1)
+        hedge = self.model("openai", answer="hedge")
+        self.assertEqual(self.router.invoke(["hi"]), "primary")
+        self.assertEqual(hedge.calls, 0)
+
+    def test_first_answer_wins_after_a_hedge(self):
+        self.warm_up("groq", 0.05)
+        self.model("groq", answer="primary", delay=0.3)
+        self.model("openai", answer="hedge", delay=5)
+        self.assertEqual(self.router.invoke(["hi"]), "primary")
+        self.assertEqual(self.router.snapshot()["openai"]["hedged"], 1)
+
+    def test_failure_moves_on_to_the_next_provider(self):
+        self.model("groq", error=RuntimeError("rate limited"))
+        self.model("openai", answer="fallback")
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(self.router.invoke(["hi"]), "fallback")
+
+    def test_times_out_at_the_deadline(self):
+        self.warm_up("groq", 0.05)
+        self.model("groq", answer="late", delay=5)
+        self.model("openai", answer="late", delay=5)
+        started = time.monotonic()
+        with self.assertRaises(llm_router.LLMTimeout):
+            self.router.invoke(["hi"], deadline=0.2)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        groq = self.model("groq", error=RuntimeError("down"))
+        self.model("openai", answer="fallback")
+        with self.assertLogs(level="WARNING"):
+            for _ in range(llm_router.FAILURES_TO_OPEN):
+                self.assertEqual(self.router.invoke(["hi"]), "fallback")
+        self.assertTrue(self.router.snapshot()["groq"]["open"])
+        self.assertEqual(self.router.invoke(["hi"]), "fallback")
+        self.assertEqual(groq.calls, llm_router.FAILURES_TO_OPEN)
+
+    def test_half_open_circuit_lets_one_trial_call_through(self):
+        health = self.router.health["groq"]
+        for _ in range(llm_router.FAILURES_TO_OPEN):
+            health.failure()
+        self.assertFalse(health.available())
+        health.open_until = time.monotonic()
+        self.assertTrue(health.available())
+        self.assertFalse(health.available())
+        health.failure()
+        self.assertFalse(health.available())
+
+        health.open_until = time.monotonic()
+        self.model("groq", answer="recovered")
+        self.assertEqual(self.router.invoke(["hi"]), "recovered")
+        self.assertFalse(self.router.snapshot()["groq"]["open"])
+        self.assertTrue(health.available())
+
+    def test_all_providers_open_is_unavailable(self):
+        for health in self.router.health.values():
+            for _ in range(llm_router.FAILURES_TO_OPEN):
+                health.failure()
+        with self.assertRaises(llm_router.LLMUnavailable):
+            self.router.invoke(["hi"])
+
+
+class IntentBatcherTests(SimpleTestCase):
+    """Messages that queue up behind an in-flight call go out as one batch, and each caller gets its own intent."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.batches = []
+
+    def single(self, text):
+        if text == "first":
+            self.release.wait(5)
+        return CustomerIntent(action="view_property", property_id=text)
+
+    def batch(self, texts):
+        self.batches.append(list(texts))
+        return [CustomerIntent(action="view_property", property_id=text) for text in texts]
+
+    def make_batcher(self, batch=None):
+        batcher = IntentBatcher("test", single=self.single, batch=batch or self.batch, window=0.5)
+        self.addCleanup(batcher.pool.shutdown, wait=False)
+        return batcher
+
+    def classify_during_a_call(self, batcher, texts):
+        first = threading.Thread(target=batcher.submit, args=("first",))
+        first.start()
+        deadline = time.monotonic() + 5
+        while batcher.in_flight == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+            results = list(pool.map(batcher.submit, texts))
+        self.release.set()
+        first.join(5)
+        return results
+
+    def test_concurrent_messages_are_batched_and_routed_back(self):
+        batcher = self.make_batcher()
+        texts = [f"KD-{n}" for n in range(6)]
+        results = self.classify_during_a_call(batcher, texts)
+        self.assertEqual([result.property_id for result in results], texts)
+        self.assertEqual(len(self.batches), 1)
+        self.assertCountEqual(self.batches[0], texts)
+        stats = batcher.snapshot()
+        self.assertEqual((stats["messages"], stats["requests"], stats["batched"]), (7, 2, 6))
+
+    def test_a_mismatched_batch_falls_back_to_single_calls(self):
+        batcher = self.make_batcher(batch=lambda texts: self.batch(texts)[:-1])
+        texts = [f"KD-{n}" for n in range(4)]
+        with self.assertLogs(level="WARNING"):
+            results = self.classify_during_a_call(batcher, texts)
+        self.assertEqual([result.property_id for result in results], texts)
+        self.assertEqual(batcher.snapshot()["fallbacks"], 1)
+
+    def test_a_lone_message_uses_the_single_chain(self):
+        batcher = self.make_batcher()
+        self.assertEqual(batcher.submit("KD-1").property_id, "KD-1")
+        self.assertEqual(self.batches, [])
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        self.broker = Broker.objects.create(phone_number="9000000007", name="Broker")
+
+    def add(self, city, bhk=None, furnishing=None, sale_or_rent="rent", price=None):
+        Property.objects.create(
+            broker=self.broker, city=city, bhk=bhk, furnishing=furnishing, sale_or_rent=sale_or_rent,
+            price=None if price is None else Decimal(price),
+        )
+
+    def test_groups_are_summed_per_facet(self):
+        self.add("Pune", 2, "semi", price="5000")
+        self.add("pune", 2, "semi", price="9999.99")
+        self.add("Pune", 2, "semi", price="10000")
+        self.add("Mumbai", 3, "fully", "sale", price="49999999")
+        self.add("MUMBAI", 3, "fully", "sale", price="50000000")
+        self.add("Pune")
+
+        counts = facets.facet_counts(Property.objects.filter(broker=self.broker))
+
+        def pairs(facet):
+            return [(item["value"], item["count"]) for item in counts[facet]]
+
+        self.assertEqual(counts["total"], 6)
+        self.assertEqual(pairs("city"), [("Pune", 4), ("Mumbai", 2)])
+        self.assertEqual(pairs("bhk"), [(2, 3), (3, 2)])
+        self.assertEqual(pairs("furnishing"), [("semi", 3), ("fully", 2)])
+        self.assertEqual(pairs("sale_or_rent"), [("rent", 4), ("sale", 2)])
+        self.assertEqual(pairs("price"), [("<10k", 2), ("10k-20k", 1), ("2Cr-5Cr", 1), ("5Cr+", 1)])
+
+    def test_counts_follow_the_filtered_queryset(self):
+        self.add("Pune", 2, price="10000")
+        self.add("Mumbai", 3, price="20000")
+        counts = facets.facet_counts(Property.objects.filter(broker=self.broker, city__iexact="pune"))
+        self.assertEqual(counts["total"], 1)
+        self.assertEqual(counts["city"], [{"value": "Pune", "count": 1}])
+        self.assertEqual(counts["price"], [{"value": "10k-20k", "count": 1}])
@@ -5,9 +5,17 @@ from django.db.models import Q
 from rest_framework.decorators import action
 from .models import Broker, Property, MediaAsset, ClientRequest
 from .serializers import BrokerRegisterSerializer, BrokerSerializer, PropertySerializer, ClientRequestSerializer, MediaAssetSerializer
+from .serializers import PROPERTY_LIST_FIELDS, property_list_fields, property_rows
 from .models import Broker
 from rest_framework.generics import CreateAPIView
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
 from .services.extract import extract
+from .services import facets, filters, inventory_version
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+import hashlib, logging
+from functools import wraps
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -229,9 +237,75 @@ class BrokerRegisterView(CreateAPIView):
     queryset = Broker.objects.all()
     serializer_class = BrokerRegisterSerializer
 
-  
+
+# Part of every inventory ETag and shared response-cache key, so pages that
+# older code rendered are neither served nor revalidated after a deploy that
+# changes the output. The field lists are hashed in; bump RESPONSE_FORMAT for
+# any other change to what these endpoints return.
+RESPONSE_FORMAT = 1
+RESPONSE_VERSION = hashlib.sha1(
+    repr((RESPONSE_FORMAT, PROPERTY_LIST_FIELDS, PropertySerializer.Meta.fields)).encode("utf-8")
+).hexdigest()[:8]
+
+
+def inventory_conditional(scope):
+    """
+    Conditional GET (ETag / Last-Modified, 304) for a view whose response
+    only depends on the request and one broker's inventory version, bumped
+    by the Property, MediaAsset and Broker signals. scope(request) names
+    the broker; unscoped requests are served as usual. A 304 is decided from
+    Redis alone, before the view runs a query.
+    """
+    def lookup(request):
+        broker_id = scope(request)
+        if not broker_id:
+            return None, None, None
+        try:
+            return (broker_id, *inventory_version.snapshot(broker_id))
+        except Exception:
+            logging.exception("Inventory version lookup failed")
+            return None, None, None
+
+    def versions(request):
+        # etag and last_modified both ask; one MGET per request.
+        if not hasattr(request, "_inventory_versions"):
+            request._inventory_versions = lookup(request)
+        return request._inventory_versions
+
+    def etag(request, *args, **kwargs):
+        broker_id, version, modified = versions(request)
+        if broker_id is None:
+            return None
+        key = f"{broker_id}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+        return f'W/"{RESPONSE_VERSION}-{version}-{modified or 0}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}"'
+
+    def last_modified(request, *args, **kwargs):
+        broker_id, version, modified = versions(request)
+        return datetime.datetime.fromtimestamp(modified, tz=datetime.timezone.utc) if modified else None
+
+    def validators_on_success(view):
+        # condition() tags every GET; an error must not be revalidated into a 304 later.
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                del response["ETag"]
+                del response["Last-Modified"]
+            return response
+        return wrapped
+
+    # no-cache: browsers revalidate every poll instead of guessing a freshness.
+    return method_decorator([
+        cache_control(private=True, no_cache=True),
+        validators_on_success,
+        condition(etag_func=etag, last_modified_func=last_modified),
+    ])
+
+
 class BrokerMeView(APIView):
     permission_classes = [IsAuthenticated]
+
+    @inventory_conditional(lambda request: request.user.pk)
     def get(self, request):
         broker = request.user
         serializer = BrokerSerializer(broker)
@@ -263,16 +337,65 @@ class BrokerViewSet(viewsets.ModelViewSet):
         return Response({"id": broker.id, "name": broker.name, "phone_number": broker.phone_number})
     
 
+class PropertyCursorPagination(CursorPagination):
+    # Newest first; pages are range reads on the (broker, created_at) index.
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class PropertyRankPagination(LimitOffsetPagination):
+    # Text searches keep search.search()'s best-match-first order, which a
+    # created_at cursor would replace; ?page_size= and ?offset= page them.
+    default_limit = PropertyCursorPagination.page_size
+    limit_query_param = "page_size"
+    max_limit = PropertyCursorPagination.max_page_size
+
+
 class PropertyViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = Property.objects.all().select_related("broker").prefetch_related("media")
+    queryset = Property.objects.all().select_related("broker").prefetch_related("media").defer("embedding", "search_vector")
     serializer_class = PropertySerializer
+    pagination_class = PropertyCursorPagination
 
     def get_queryset(self):
         broker_id = self.request.query_params.get("broker")
         if broker_id:
             return self.queryset.filter(broker_id= broker_id)
         return self.queryset
+
+    @inventory_conditional(lambda request: request.query_params.get("broker"))
+    def list(self, request, *args, **kwargs):
+        return self.page_response(self.get_queryset(), request)
+
+    def page_response(self, qs, request, ranked=False):
+        """
+        A page of qs. Pages of one broker's inventory come from the shared
+        response cache until that inventory changes.
+        """
+        broker_id = request.query_params.get("broker")
+        if not broker_id:
+            return Response(self.list_page(qs, request, ranked))
+        key = request.build_absolute_uri()
+        return Response(inventory_version.cached(broker_id, f"response:{RESPONSE_VERSION}", key, lambda: self.list_page(qs, request, ranked)))
+
+    def list_page(self, qs, request, ranked=False):
+        """
+        One page of qs: compact .values() rows, or full serializer rows when
+        media is asked for. ranked pages keep qs's order (by offset) instead
+        of the newest-first cursor.
+        """
+        paginator = PropertyRankPagination() if ranked else self.paginator
+        fields = property_list_fields(request.query_params.get("fields"))
+        if "media" in fields:
+            page = paginator.paginate_queryset(qs, request, view=self)
+            return paginator.get_paginated_response(self.get_serializer(page, many=True).data).data
+
+        # The cursor is read from the page's last row.
+        columns = list(dict.fromkeys([*fields, "created_at"]))
+        page = paginator.paginate_queryset(qs.select_related(None).prefetch_related(None).values(*columns), request, view=self)
+        return paginator.get_paginated_response(property_rows(page, fields)).data
     
     
     @action(detail=False, methods=["post"])
@@ -302,34 +425,23 @@ class PropertyViewSet(viewsets.ModelViewSet):
     
 
     @action(detail=False, methods=["get"])
+    @inventory_conditional(lambda request: request.query_params.get("broker"))
     def search(self, request):
-        qs = self.get_queryset()
-
-        city = request.query_params.get("city")
-        bhk = request.query_params.get("bhk")
-        sale_or_rent = request.query_params.get("sale_or_rent")
-        price = request.query_params.get("price")
-
-        if city:
-            qs = qs.filter(city__icontains = city)
-        if bhk:
-            qs = qs.filter(bhk = bhk)
-        if sale_or_rent:
-            qs = qs.filter(sale_or_rent = sale_or_rent)
-        if price:
-            qs = qs.filter(price__lte = price)
-
-        query_text = request.query_params.get("query_text")
-
-        if query_text:
-            qs = qs.filter(
-                Q(title__icontains = query_text) |
-                Q(description_beautified__icontains  = query_text) |
-                Q(locality__icontains  = query_text) 
-            )
-        
-        serializer = self.get_serializer(qs, many = True)
-        return Response(serializer.data)
+        spec = filters.compile_filters(request.query_params)
+        qs = filters.apply(spec, self.get_queryset())
+        # With a text query, search.search() orders by relevance.
+        return self.page_response(qs, request, ranked=bool(spec.text))
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """Counts per city, bhk, furnishing, sale_or_rent and price bucket for the search filters."""
+        spec = filters.compile_filters(request.query_params)
+        qs = filters.apply(spec, self.get_queryset())
+
+        broker_id = request.query_params.get("broker")
+        if broker_id:
+            return Response(facets.cached_facet_counts(broker_id, qs, key=spec.cache_key()))
+        return Response(facets.facet_counts(qs))
 
     
     @action(detail = True, methods=["post"])
@@ -5,7 +5,7 @@ from urllib.parse import parse_qs
 from .views_twilio import EDIT_FIELDS_MAP
 
 from .models import Broker, Property
-from inventory.services.redis_setup import get_session, set_session, clear_session, is_media_processed, mark_media_processed, add_media_to_queue, pop_media_queue
+from inventory.services.redis_setup import get_session, set_session, clear_session, is_media_processed, mark_media_processed, add_media_to_queue, pop_media_queue, bump_media_upload_token
 from inventory.services.ai_intent import classify_intent
 from .models import Broker, Property, MediaAsset
 from .views_twilio import (
@@ -14,6 +14,7 @@ from .views_twilio import (
     handle_profile, handle_editprofile, handle_help, handle_new_property, handle_edit_broker_session, handle_done, handle_desc, handle_media, handle_bot_url
 )
 from .services.sender_meta import send_whatsapp_text, send_whatsapp_media
+from .services.webhook_recorder import record_webhook
 import json
 
 COMMANDS = {
@@ -36,6 +37,7 @@ COMMANDS = {
 def whatsaap_webhook(request):
     if request.method != "POST":
         return HttpResponse("Invalid request", status=400)
+    record_webhook(request, "twilio")
 
     body = request.body.decode("utf-8")
     data = parse_qs(body)
@@ -173,23 +175,8 @@ def make_response():
 
 
 from inventory.services.redis_setup import get_session, set_session
-
-def is_duplicate_message(msg_id: str) -> bool:
-    """
-    Check if a WhatsApp message ID was already processed.
-    Uses Redis to mark processed IDs.
-    """
-    if not msg_id:
-        return False
-
-    key = f"msg_processed:{msg_id}"
-    if get_session(key):
-        return True  # already handled
-    # store with short TTL (e.g. 1 day)
-    set_session(key, True, ttl=3600)
-    return False
-
-
+from inventory.services import idempotency
+from inventory.services.delivery_metrics import ingest_statuses, set_delivery_context, update_delivery_context
 
 
 import requests, cloudinary.uploader,os
@@ -235,10 +222,6 @@ def handle_meta_media_upload(broker, property_obj, media_id, from_number):
         return None
 
 
-from threading import Timer
-
-upload_timers = {}  # global dict to avoid multiple timers per broker
-
 def schedule_media_upload(broker, property_obj, phone):
     broker_id = broker.id
     media_batch = pop_media_queue(broker_id)
@@ -259,7 +242,6 @@ def schedule_media_upload(broker, property_obj, phone):
         "If you have more, send them now.\n"
         "When you're done, type *done* or *skip* to finish adding this property."
     )
-    upload_timers.pop(broker_id, None)
     # Timer(10.0, lambda: send_whatsapp_text(
     #     phone,
     #     "💡 Looks like you’re done sending images!\n"
@@ -273,9 +255,12 @@ def schedule_media_upload(broker, property_obj, phone):
 
 
 import logging
+from .tasks import submit_to_lane, flush_media_uploads
+
 @csrf_exempt
 def whatsapp_webhook_meta(request):
     logging.info(f"Webhook called: {request.method} {request.path}")
+    record_webhook(request, "meta")
     if request.method == "GET":
         mode = request.GET.get("hub.mode")
         token = request.GET.get("hub.verify_token")
@@ -291,29 +276,96 @@ def whatsapp_webhook_meta(request):
     except Exception:
         return HttpResponse("Invalid JSON", status=400)
     
-    entry = body.get("entry", [])[0]
-    changes = entry.get("changes", [])[0]
-    value = changes.get("value",{})
-    messages = value.get("messages",[])
+    statuses = list(iter_meta_statuses(body))
+    if statuses:
+        try:
+            ingest_statuses(statuses)
+        except Exception:
+            logging.exception("[ERROR] Failed to ingest Meta statuses")
 
+    messages = list(iter_meta_messages(body))
     if not messages:
-        return HttpResponse("No messages", status=200)
-    
-    msg_obj = messages[0]
-    msg_id = msg_obj.get("id")
-    msg = msg_obj.get("text", {}).get("body","").strip()
-    phone = msg_obj.get("from")
+        return HttpResponse("Statuses recorded" if statuses else "No messages", status=200)
+
+    # Each sender gets its own lane: their messages run in order (sessions
+    # are read-modify-write) while different senders run in parallel.
+    by_sender = {}
+    for msg_obj in messages:
+        msg_id = msg_obj.get("id")
+        if msg_id:
+            state = idempotency.claim(msg_id)
+            if state != "claimed":
+                logging.info(f"Duplicate message {msg_id} ({state}), ignoring.")
+                continue
+        sender = normalize_meta_phone(msg_obj.get("from") or "")
+        by_sender.setdefault(sender, []).append(msg_obj)
+
+    if not by_sender:
+        return HttpResponse("Duplicate message", status=200)
+
+    # The slow part (LLM calls, uploads, replies) runs on a Celery worker so
+    # Meta gets its 200 right away and does not retry.
+    queued = set()
+    for sender, msg_objs in by_sender.items():
+        try:
+            submit_to_lane(f"meta:{sender}", msg_objs)
+        except Exception:
+            logging.exception(f"[ERROR] Failed to queue Meta messages from {sender}")
+            break
+        queued.add(sender)
+
+    if len(queued) < len(by_sender):
+        # submit_to_lane raises only when nothing was pushed, so release
+        # exactly the senders that were not queued; Meta's retry gets them.
+        for sender, msg_objs in by_sender.items():
+            if sender in queued:
+                continue
+            for msg_obj in msg_objs:
+                if msg_obj.get("id"):
+                    idempotency.release(msg_obj["id"])
+        return HttpResponse("Queue unavailable", status=503)
+
+    return HttpResponse("Queued", status=200)
+
+
+def iter_meta_values(body):
+    """
+    Yields every change value in a webhook payload. Meta batches several
+    entries and changes into one POST under load.
+    """
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            yield change.get("value") or {}
+
+
+def iter_meta_messages(body):
+    for value in iter_meta_values(body):
+        yield from value.get("messages") or []
+
+
+def iter_meta_statuses(body):
+    for value in iter_meta_values(body):
+        yield from value.get("statuses") or []
+
+
+def normalize_meta_phone(phone):
     if phone.startswith("whatsapp:"):
         phone = phone.replace("whatsapp:", "").strip()
     if phone.startswith("+91"):
         phone = phone[3:]
     elif phone.startswith("91") and len(phone) == 12:
         phone = phone[2:]
-    phone = phone.strip()[-10:]
+    return phone.strip()[-10:]
 
-    if msg_id and is_duplicate_message(msg_id):
-        logging.info(f"Duplicate message {msg_id} from {phone}, ignoring.")
-        return HttpResponse("Duplicate message", status=200)
+
+def handle_meta_message(msg_obj):
+    """
+    Runs one Meta message through onboarding, the active session or intent
+    classification and replies over the Graph API. Called from the worker.
+    """
+    msg = msg_obj.get("text", {}).get("body","").strip()
+    phone = normalize_meta_phone(msg_obj.get("from") or "")
+    set_delivery_context(tag="onboarding")
 
     try:
         broker = Broker.objects.get(phone_number=phone)
@@ -336,9 +388,10 @@ def whatsapp_webhook_meta(request):
             except Exception as e:
                 print(f"[ERROR] Failed to send onboarding media: {e}")
 
-        return HttpResponse("Onboarding handled safely", status=200)
+        return "Onboarding handled safely"
 
     session = get_session(broker.id)
+    set_delivery_context(broker_id=broker.id, tag=session.get("mode") if session else None)
     if session:
         mode = session.get("mode")
 
@@ -349,19 +402,19 @@ def whatsapp_webhook_meta(request):
             if not property_id:
                 clear_session(broker.id)
                 send_whatsapp_text(phone, "⚠️ Edit session ended. Please restart with 'edit <property_id>'.")
-                return HttpResponse("Session cleared", status=200)
+                return "Session cleared"
 
             try:
                 prop = Property.objects.get(broker=broker, property_id=property_id)
             except Property.DoesNotExist:
                 clear_session(broker.id)
                 send_whatsapp_text(phone, "⚠️ Property not found. Edit session cleared.")
-                return HttpResponse("Property not found", status=200)
+                return "Property not found"
 
             if step == "choose_field":
                 if msg not in EDIT_FIELDS_MAP:
                     send_whatsapp_text(phone, "⚠️ Invalid choice. Reply with 1-5.")
-                    return HttpResponse("Invalid choice", status=200)
+                    return "Invalid choice"
 
                 field = EDIT_FIELDS_MAP[msg]
                 session["step"] = "awaiting_value"
@@ -369,7 +422,7 @@ def whatsapp_webhook_meta(request):
                 set_session(broker.id, session)
 
                 send_whatsapp_text(phone, f"✏️ Send me the new {field}.")
-                return HttpResponse("Awaiting value", status=200)
+                return "Awaiting value"
 
             elif step == "awaiting_value":
                 field = session.get("field")
@@ -380,12 +433,12 @@ def whatsapp_webhook_meta(request):
                         new_value = int(new_value)
                     except ValueError:
                         send_whatsapp_text(phone, "⚠️ Please enter a valid number.")
-                        return HttpResponse("Invalid number", status=200)
+                        return "Invalid number"
 
                 elif field == "status":
                     if new_value.lower() not in ["active", "disabled", "disable"]:
                         send_whatsapp_text(phone, "⚠️ Invalid status. Use 'active' or 'disable'.")
-                        return HttpResponse("Invalid status", status=200)
+                        return "Invalid status"
                     if new_value.lower() == "disable":
                         new_value = "disabled"
                     if new_value.lower() == "active":
@@ -396,7 +449,7 @@ def whatsapp_webhook_meta(request):
 
                 clear_session(broker.id)
                 send_whatsapp_text(phone, f"✅ Updated {field} for {prop.property_id} | {prop.title} to {new_value}.")
-                return HttpResponse("Property updated", status=200)
+                return "Property updated"
         elif mode == "new_property":
             if msg.lower() in ["done", "skip"]:
                 resp= handle_done(broker)
@@ -404,7 +457,7 @@ def whatsapp_webhook_meta(request):
                     send_whatsapp_text(phone, txt)
                 send_whatsapp_text(phone, "🎯 All set! Your property is live now. You can view it in your dashboard or type 'list' to see all properties.")
 
-                return HttpResponse("Done handled", status=200)
+                return "Done handled"
 
             # num_media = len(msg_obj.get("image", [])) + len(msg_obj.get("video", []))
             # if num_media > 0:
@@ -413,7 +466,7 @@ def whatsapp_webhook_meta(request):
             #         send_whatsapp_text(phone, txt)
             #     for media in resp.get("medias", []):
             #         send_whatsapp_media(phone, media["url"], media["type"])
-            #     return HttpResponse("Media handled", status=200)
+            #     return "Media handled"
             if "image" in msg_obj or "video" in msg_obj:
                 try:
                     property_id = session.get("property_id")
@@ -421,7 +474,7 @@ def whatsapp_webhook_meta(request):
                 except Property.DoesNotExist:
                     clear_session(broker.id)
                     send_whatsapp_text(phone, "⚠️ Property not found. Please start again.")
-                    return HttpResponse("Property not found", status=200)
+                    return "Property not found"
 
                 media_types = ["image", "video"]
                 for m_type in media_types:
@@ -432,20 +485,18 @@ def whatsapp_webhook_meta(request):
                     if isinstance(media_obj, dict) and "id" in media_obj:
                         add_media_to_queue(broker.id, media_obj["id"])
 
-                if broker.id in upload_timers:
-                    upload_timers[broker.id].cancel()
-
-                upload_timers[broker.id] = Timer(3.0, schedule_media_upload, args=(broker, property_obj, phone))
-                upload_timers[broker.id].start()
+                # Debounce: only the flush scheduled after the last media item uploads the batch.
+                token = bump_media_upload_token(broker.id)
+                flush_media_uploads.apply_async(args=(str(broker.id), str(property_obj.pk), phone, token), countdown=3)
 
-                return HttpResponse("Media queued", status=200)
+                return "Media queued"
         elif mode == "edit_broker":
             resp = handle_edit_broker_session(broker, msg, session)
             for txt in resp.get("texts", []):
                 send_whatsapp_text(phone, txt)
             for media in resp.get("medias", []):
                 send_whatsapp_media(phone, media["url"], media["type"])
-            return HttpResponse("Edit broker session handled", status=200)
+            return "Edit broker session handled"
             # ✅ Handle Password Reset via WhatsApp
         elif mode == "reset_password":
             step = session.get("step")
@@ -459,17 +510,17 @@ def whatsapp_webhook_meta(request):
                     broker.save()
                     clear_session(broker.id)
                     send_whatsapp_text(phone, "✅ Your password has been reset successfully!\nYou can now log in to your account.")
-                    return HttpResponse("Password reset successful", status=200)
+                    return "Password reset successful"
                 except Broker.DoesNotExist:
                     clear_session(broker.id)
                     send_whatsapp_text(phone, "⚠️ Something went wrong. Please try again later.")
-                    return HttpResponse("Broker not found", status=400)
+                    return "Broker not found"
 
     # try:
         # ⛔ Skip intent classification for pure media messages
 # ✅ Skip intent classification only if message has media but no text
         # if ("image" in msg_obj or "video" in msg_obj) and not msg.strip():
-        #     return HttpResponse("Media upload handled", status=200)
+        #     return "Media upload handled"
 
     intent = classify_intent(msg)
     # except Exception:
@@ -477,6 +528,7 @@ def whatsapp_webhook_meta(request):
     #     return HttpResponse(status =200)
 
     action = intent.action
+    update_delivery_context(tag=action)
     if action in COMMANDS:
         handler = COMMANDS[action]
         resp = handler(broker, intent, msg=msg)
@@ -487,4 +539,4 @@ def whatsapp_webhook_meta(request):
     else:
         send_whatsapp_text(phone, "⚠️ Sorry, I didn’t understand. Type 'help' for guidance.")
 
-    return HttpResponse(status=200)
+    return "Handled"
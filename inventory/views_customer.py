@@ -2,80 +2,83 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from twilio.twiml.messaging_response import MessagingResponse
 from urllib.parse import parse_qs
-import re
 from .models import Property, Broker, MediaAsset, Session
 from .services.redis_setup import get_session, set_session, clear_session
+from .services.lanes import lane_lock
+from .services.webhook_recorder import record_webhook
 from .services.ai_intent import classify_customer_intent
 from .services.sharing_msg import generate_property_message
+from .services import pagination
+from .services.filters import apply as apply_filters, compile_filters
+from .services.inventory_version import cached_count
+from .services.facets import cached_facet_counts
+from .services import vector_index
+
+# Customers quote rough budgets; show listings up to 15% above.
+CUSTOMER_PRICE_SLACK = 1.15
+
+def listing_line(p):
+    bhk_display = f"{p.bhk} BHK" if p.bhk else ""
+    if p.bhk == 1 and (
+        "studio" in (p.title or "").lower() 
+        or "studio" in (p.description_raw or "").lower()
+    ):
+        bhk_display = "1 RK"
+
+    return (
+        f"[{p.property_id}] {p.title or ''} | {bhk_display} | "
+        f"{p.city or ''} | {p.price or 'N/A'} {p.currency or ''}"
+    )
 
-def handle_list_properties(intent, resp, broker):
-    filters = intent.filters if isinstance(intent.filters, dict) else {}
-
-    page = filters.get("page", 1) or 1
-    city = filters.get("city")
-    bhk = filters.get("bhk")
-    price_filter = filters.get("price")
-    qs = Property.objects.filter(broker=broker,status="active").order_by("-created_at")
-
-    if city:
-        qs = qs.filter(city__iexact=city)
+def available_hint(broker):
+    counts = cached_facet_counts(broker.id, Property.objects.filter(broker=broker, status="active"))
+    cities = [f"{c['value']} ({c['count']})" for c in counts["city"][:5]]
+    if not cities:
+        return ""
+    return "\n\nAvailable now: " + ", ".join(cities) + "\n👉 Try 'list <city>'"
 
-    if bhk:
-        try:
-            bhk_int = int(bhk)
-            qs = qs.filter(bhk=bhk_int)
-        except ValueError:
-            pass
+def handle_list_properties(intent, resp, broker, client_phone=None):
+    scope = f"{broker.id}:{client_phone}"
+    filters, page = pagination.resume(scope, intent.filters if isinstance(intent.filters, dict) else {})
 
-    
-    if price_filter:
-        match = re.match(r"(<=|>=|<|>|=)?\s*([\d,.]+)", str(price_filter))
-        if match:
-            op, val = match.groups()
-            val = float(val.replace(",", ""))
-
-            if op in ("<", "<="):
-                max_val = val * 1.15
-                qs = qs.filter(price__lte=max_val)
-            elif op in (">", ">="):
-                qs = qs.filter(price__gte=val)
-            else:
-                max_val = val * 1.15
-                qs = qs.filter(price__lte=max_val)
+    spec = compile_filters(filters)
+    qs = apply_filters(spec, Property.objects.filter(broker=broker, status="active"), price_slack=CUSTOMER_PRICE_SLACK)
 
-    if not qs.exists():
-        resp.message("No Properties Found.")
+    properties, has_next = pagination.fetch(qs, scope, spec, page)
+    if not properties:
+        resp.message("No more properties." if page > 1 else "No Properties Found." + available_hint(broker))
         return resp
-    
-    page_size = 10
-    start = (page - 1) * page_size
-    end = start + page_size
-    properties = qs[start:end]
-    
-    lines = []
 
-    for p in properties:
-        bhk_display = f"{p.bhk} BHK" if p.bhk else ""
-        if p.bhk == 1 and (
-            "studio" in (p.title or "").lower() 
-            or "studio" in (p.description_raw or "").lower()
-        ):
-            bhk_display = "1 RK"
+    lines = [listing_line(p) for p in properties]
 
-        lines.append(
-            f"[{p.property_id}] {p.title or ''} | {bhk_display} | "
-            f"{p.city or ''} | {p.price or 'N/A'} {p.currency or ''}"
-        )
-
-    total_pages = (qs.count() + page_size - 1) // page_size
+    total_pages = max((cached_count(broker.id, qs, key=f"customer:{spec.cache_key()}") + pagination.PAGE_SIZE - 1) // pagination.PAGE_SIZE, page)
 
     reply_text = (
         f"📋 Available Properties (Page {page}/{total_pages}):\n\n" +
         "\n".join(lines)
     )
-    if page < total_pages:
-        reply_text += f"\n\n👉 Reply 'list {page+1}' for next page"
+    if has_next:
+        reply_text += f"\n\n👉 Reply 'next' or 'list {page+1}' for next page"
+
+    resp.message(reply_text)
+    return resp
+
+def handle_search_properties(intent, resp, broker, msg=""):
+    filters = intent.filters if isinstance(intent.filters, dict) else {}
+    query = filters.get("query") or msg
+    matches = vector_index.search(broker.id, query, k=5)
+    if not matches:
+        resp.message("No matching properties. Try 'list' to see everything available.")
+        return resp
 
+    found = {str(pk): p for pk, p in Property.objects.in_bulk([pk for pk, _ in matches]).items()}
+    lines = [listing_line(found[pk]) for pk, _ in matches if pk in found]
+
+    reply_text = (
+        "🔎 Closest matches:\n\n" +
+        "\n".join(lines) +
+        "\n\n👉 Reply 'view <id>' for details"
+    )
     resp.message(reply_text)
     return resp
 
@@ -122,8 +125,71 @@ def handle_help(resp):
     return resp
 
 
+def handle_customer_message(msg, to_number, from_number):
+    resp = MessagingResponse()
+    
+    # session_key = f"permission:{broker.id}:{from_number}"
+    # session = get_session(session_key)
+
+    # if not session:
+    #     permission_msg = (
+    #         f"📩 Customer {from_number} wants to see properties.\n\n"
+    #         f"Message:\n{msg}\n\n"
+    #         f"Reply YES {from_number} to allow or NO {from_number} to decline."
+    #     )
+    #     broker_resp = MessagingResponse()
+    #     broker_resp.message(permission_msg)
+    #     set_session(session_key, {"pending_msg":msg})
+    #     resp.message("Please wait..")
+    #     return HttpResponse(str(resp), content_type = "application/xml")
+    
+    # elif session.get("allowd"):
+
+    if msg.startswith("KD-BROKER-"):
+        broker = Broker.objects.filter(broker_code__iexact = msg.strip()).first()
+        if broker:
+            Session.objects.update_or_create(
+                client_phone = from_number,
+                defaults={"broker": broker}
+            )
+            resp.message(f"Hey, I am {broker.name}'s assistant! Ask me about properties anytime.")
+            return resp
+        else:
+            resp.message("Broker not found")
+            return resp
+    
+    session = Session.objects.filter(client_phone = from_number).first()
+    if session:
+        broker = session.broker
+    else:
+        broker = Broker.objects.filter(phone_number = to_number).first()
+    
+    if not broker:
+        resp.message("⚠️ Broker not found. Please click your broker’s link to start.")
+        return resp
+
+
+    intent = classify_customer_intent(msg)
+
+    COMMANDS = {
+        "list_properties": lambda intent, resp, broker: handle_list_properties(intent, resp, broker, from_number),
+        "search_properties": lambda intent, resp, broker: handle_search_properties(intent, resp, broker, msg),
+        "view_property": handle_view_property,
+        "help": lambda intent, resp, broker: handle_help(resp),
+    }
+
+    if intent.action in COMMANDS:
+        handler = COMMANDS[intent.action]
+        resp = handler(intent, resp, broker)
+    else:
+        resp.message("⚠️ Sorry, I didn’t understand. You can say 'show flats in Mumbai' or 'view 10'.")
+
+    return resp
+
+
 @csrf_exempt
 def customer_webhook(request):
+    record_webhook(request, "customer")
     if request.method == "POST":
         body = request.body.decode("utf-8")
         data = parse_qs(body)
@@ -131,62 +197,13 @@ def customer_webhook(request):
         to_number = data.get("To", [""])[0].replace("whatsapp:","")
         from_number = data.get("From", [""])[0].replace("whatsapp:", "")
 
-
-        resp = MessagingResponse()
-        
-        # session_key = f"permission:{broker.id}:{from_number}"
-        # session = get_session(session_key)
-
-        # if not session:
-        #     permission_msg = (
-        #         f"📩 Customer {from_number} wants to see properties.\n\n"
-        #         f"Message:\n{msg}\n\n"
-        #         f"Reply YES {from_number} to allow or NO {from_number} to decline."
-        #     )
-        #     broker_resp = MessagingResponse()
-        #     broker_resp.message(permission_msg)
-        #     set_session(session_key, {"pending_msg":msg})
-        #     resp.message("Please wait..")
-        #     return HttpResponse(str(resp), content_type = "application/xml")
-        
-        # elif session.get("allowd"):
-
-        if msg.startswith("KD-BROKER-"):
-            broker = Broker.objects.filter(broker_code__iexact = msg.strip()).first()
-            if broker:
-                Session.objects.update_or_create(
-                    client_phone = from_number,
-                    defaults={"broker": broker}
-                )
-                resp.message(f"Hey, I am {broker.name}'s assistant! Ask me about properties anytime.")
-                return HttpResponse(str(resp), content_type="application/xml")
+        # One customer's messages are handled one at a time, across workers.
+        with lane_lock(f"customer:{from_number}") as acquired:
+            if acquired:
+                resp = handle_customer_message(msg, to_number, from_number)
             else:
-                resp.message("Broker not found")
-                return HttpResponse(str(resp), content_type= "application/xml")
-        
-        session = Session.objects.filter(client_phone = from_number).first()
-        if session:
-            broker = session.broker
-        else:
-            broker = Broker.objects.filter(phone_number = to_number).first()
-        
-        if not broker:
-            resp.message("⚠️ Broker not found. Please click your broker’s link to start.")
-            return HttpResponse(str(resp), content_type="application/xml")
-
-
-        intent = classify_customer_intent(msg)
-
-        COMMANDS = {
-            "list_properties": handle_list_properties,
-            "view_property": handle_view_property,
-        }
-
-        if intent.action in COMMANDS:
-            handler = COMMANDS[intent.action]
-            resp = handler(intent, resp, broker)
-        else:
-            resp.message("⚠️ Sorry, I didn’t understand. You can say 'show flats in Mumbai' or 'view 10'.")
+                resp = MessagingResponse()
+                resp.message("⏳ Still working on your previous message. Please send this one again in a moment.")
 
         return HttpResponse(str(resp), content_type="application/xml")
 
@@ -2,24 +2,31 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from twilio.twiml.messaging_response import MessagingResponse
 from inventory.services.extract import extract
+from inventory.services.dup_index import find_similar
+from inventory.services.extract import field_snapshot
+from inventory.services.listing_rules import pre_extract
+from inventory.services import pagination
+from inventory.services.filters import apply as apply_filters, compile_filters
+from inventory.services.inventory_version import cached_count
+from django.db import transaction
+from .tasks import enrich_property
 from .models import Broker, Property, MediaAsset
 from urllib.parse import parse_qs
 from inventory.services.redis_setup import set_session, get_session, clear_session
 from dotenv import load_dotenv
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+import logging
 import os
 import requests
 import cloudinary.uploader
 from .services.sharing_msg import generate_property_message
 from .services.ai_intent import classify_customer_intent
-from twilio.rest import Client
 # from inventory.views_customer import handle_list_customer, handle_view_customer
 
 load_dotenv()
 TWILIO_SID = os.getenv("TWILIO_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
 def make_response():
     return {"texts": [], "medias": []}
 
@@ -326,9 +333,14 @@ def handle_new_property(broker, intent=None, msg=None):
         except Property.DoesNotExist:
             clear_session(broker.id)
 
-    prop = extract(broker, description=desc)
-    prop.status = "active"
+    similar = find_similar(desc, broker_id=broker.id)
+
+    # Save a draft with what the listing rules can read instantly and let
+    # the worker fill in the rest, so the broker can send media right away.
+    prop = Property(broker=broker, description_raw=desc, status="draft", **pre_extract(desc))
+    prop.moderation_flags = {"enrichment": "pending", "draft": field_snapshot(prop)}
     prop.save()
+    transaction.on_commit(lambda: enqueue_enrichment(prop))
 
     session = {
         "mode": "new_property",
@@ -339,12 +351,71 @@ def handle_new_property(broker, intent=None, msg=None):
     }
     set_session(broker.id, session)
 
+    details = " ".join(part for part in [
+        f"{prop.bhk} BHK" if prop.bhk else "",
+        f"in {prop.city}" if prop.city else "",
+        f"for {prop.sale_or_rent}" if prop.sale_or_rent else "",
+    ] if part)
+    if prop.moderation_flags.get("enrichment") == "failed":
+        next_step = f"⚠️ Couldn't read all the details. Reply 'edit {prop.property_id}' to fill them in.\n\n"
+    else:
+        next_step = "⏳ Reading the rest of the details, I'll send a summary shortly.\n\n"
     resp["texts"].append(
-        f"✅ Property created: [{prop.property_id}] {prop.title or 'Property'}\n\n"
+        f"✅ Property saved: [{prop.property_id}] {details}\n"
+        + next_step +
         "📸 Now upload images/videos. Type *done* when finished, or *skip* if none."
     )
+    warning = duplicate_warning(broker, similar)
+    if warning:
+        resp["texts"].append(warning)
     return resp
 
+
+def enqueue_enrichment(prop):
+    # The draft is already saved; if the broker is unreachable, leave it to
+    # the edit command rather than failing the message (and getting a retry
+    # that saves a second draft).
+    try:
+        enrich_property.delay(str(prop.pk))
+    except Exception:
+        logging.exception(f"Failed to queue enrichment for property {prop.pk}")
+        prop.moderation_flags = {**(prop.moderation_flags or {}), "enrichment": "failed"}
+        prop.save(update_fields=["moderation_flags", "updated_at"])
+
+
+def enrichment_summary(prop):
+    lines = [f"📋 Details for [{prop.property_id}] {prop.title or 'Property'}"]
+    if prop.bhk or prop.city:
+        lines.append(f" {prop.bhk or ''} BHK in {prop.city or ''} for {prop.sale_or_rent}".replace("  ", " "))
+    if prop.area_sqft:
+        lines.append(f" {prop.area_sqft} sqft")
+    if prop.furnishing:
+        lines.append(f" {prop.furnishing}")
+    if prop.price:
+        lines.append(f" {prop.price} {prop.currency or ''}")
+    if prop.deposit:
+        lines.append(f" Deposit: {prop.deposit}")
+    if prop.locality:
+        lines.append(f" near {prop.locality}")
+    lines.append(f"\n👉 Reply 'edit {prop.property_id}' if anything is wrong")
+    return "\n".join(lines)
+
+
+def duplicate_warning(broker, similar):
+    if not similar:
+        return None
+    ids = (
+        Property.objects.filter(broker=broker, pk__in=[pk for pk, _ in similar])
+        .values_list("property_id", flat=True)
+    )
+    ids = [f"[{pid}]" for pid in ids if pid]
+    if not ids:
+        return None
+    return (
+        f"⚠️ This looks like property {', '.join(ids)} you already added.\n"
+        f"👉 Reply 'delete <id>' to remove the copy if it is a duplicate."
+    )
+
 def handle_help(broker, intent, msg=None):
     resp = make_response()
     resp["texts"].append(
@@ -478,71 +549,27 @@ def handle_list(broker, intent, msg=None):
     # parts = msg.split()
     # page = int(parts[1]) if len(parts) > 1 else 1
     resp = make_response()
-    filters = intent.filters if intent and intent.filters else {}
-    page = int(filters.get("page", 1))
-    qs = Property.objects.filter(broker=broker).order_by("-created_at")
-
-    if "city" in filters:
-        qs = qs.filter(city__iexact=filters["city"])
-    if "location" in filters:
-        qs = qs.filter(locality__icontains=filters["location"])
-    if "status" in filters:
-        qs = qs.filter(status__iexact=filters["status"])
-    if "furnishing" in filters:
-        furnishing_val = filters["furnishing"].strip().lower()
-        if furnishing_val in ["fully-furnished", "fully furnished"]:
-            qs = qs.filter(furnishing__iexact="fully-furnished")
-        elif furnishing_val in ["semi-furnished", "semi furnished"]:
-            qs = qs.filter(furnishing__iexact="semi-furnished")
-        elif furnishing_val in ["not furnished", "unfurnished", "not-furnished"]:
-            qs = qs.filter(furnishing__iexact="not furnished")
-    if "bhk" in filters:
-        try:
-            qs = qs.filter(bhk=int(filters["bhk"]))
-        except ValueError:
-            pass
-    if "price_min" in filters:
-        try:
-            qs = qs.filter(price__gte=float(filters["price_min"]))
-        except ValueError:
-            pass
-    if "price_max" in filters:
-        try:
-            qs = qs.filter(price__lte=float(filters["price_max"]))
-        except ValueError:
-            pass
-    if "deposit_min" in filters:
-        try:
-            qs = qs.filter(deposit__gte=float(filters["deposit_min"]))
-        except ValueError:
-            pass
-    if "deposit_max" in filters:
-        try:
-            qs = qs.filter(deposit__lte=float(filters["deposit_max"]))
-        except ValueError:
-            pass
+    filters, page = pagination.resume(broker.id, intent.filters if intent and intent.filters else {})
+    spec = compile_filters(filters)
+    qs = apply_filters(spec, Property.objects.filter(broker=broker))
 
-    if not qs.exists():
-        resp["texts"].append("⚠️ No properties found.")
+    props, has_next = pagination.fetch(qs, broker.id, spec, page)
+    if not props:
+        resp["texts"].append("⚠️ No more properties." if page > 1 else "⚠️ No properties found.")
         return resp
 
-    page_size = 10
-    start = (page - 1) * page_size
-    end = start + page_size
-    props = qs[start:end]
-
     lines = []
     for p in props:
         line = f"[{p.property_id}] | {p.title} | {p.city or ''} | {p.status}"
         lines.append(line)
 
-    total_pages = (qs.count() + page_size - 1) // page_size
+    total_pages = max((cached_count(broker.id, qs, key=f"list:{spec.cache_key()}") + pagination.PAGE_SIZE - 1) // pagination.PAGE_SIZE, page)
     reply_text = (
         f"📋 Your properties (Page {page}/{total_pages}):\n\n" +
         "\n".join(lines)
     )
-    if page < total_pages:
-        reply_text += f"\n\n👉 Reply 'list {page+1}' for next page"
+    if has_next:
+        reply_text += f"\n\n👉 Reply 'next' or 'list {page+1}' for next page"
 
     resp["texts"].append(reply_text)
     return resp
@@ -873,15 +900,17 @@ def handle_done(broker):
     media = session["media"]
 
     # prop = extract(broker, description=description, media_urls=[m["url"] for m in media])
-    prop.status = "active"
-    prop.save()
+    # Only the status: enrich_property may have filled in the other fields since get().
+    if prop.status == "draft":
+        prop.status = "active"
+        prop.save(update_fields=["status", "updated_at"])
     for m in media:
         MediaAsset.objects.create(property=prop, media_type=m["type"], storage_url=m["url"], order=m["order"])
 
     clear_session(broker.id)
     resp["texts"].append(
         f" New property added.\n\n"
-        f"[{prop.property_id}] {prop.title} \n"
+        f"[{prop.property_id}] {prop.title or 'Property'} \n"
         f" {prop.bhk or ''} BHK in {prop.city or ''} for {prop.sale_or_rent}\n"
         f" {prop.area_sqft or 'N/A'} sqrt\n"
         f" {prop.furnishing or ''}\n"
@@ -1070,7 +1099,6 @@ def handle_share(broker, intent, msg = None):
         resp["medias"].append({"url": media.storage_url, "type": media.media_type})
     return resp
 
-import re
 def handle_share_all_to_client(broker, intent, msg=None):
     resp = make_response()
     client_number = intent.client_number
@@ -1080,35 +1108,15 @@ def handle_share_all_to_client(broker, intent, msg=None):
         resp["texts"].append("⚠️ Please specify a customer number. Example:\nshare all 2BHK in Pune to +919876543210")
         return resp
 
-    qs = Property.objects.filter(broker=broker, status="active").order_by("-created_at")
-
-    if "city" in filters:
-        qs = qs.filter(city__iexact=filters["city"])
-    if "bhk" in filters:
-        try:
-            qs = qs.filter(bhk=int(filters["bhk"]))
-        except ValueError:
-            pass
-    if "price" in filters:
-        import re
-        price_filter = filters["price"]
-        match = re.match(r"(<=|>=|<|>|=)?\s*([\d,.]+)", str(price_filter))
-        if match:
-            op, val = match.groups()
-            val = float(val.replace(",", ""))
-            if op in ("<", "<="):
-                qs = qs.filter(price__lte=val)
-            elif op in (">", ">="):
-                qs = qs.filter(price__gte=val)
-            else:
-                qs = qs.filter(price__lte=val)
-
-    if not qs.exists():
+    spec = compile_filters(filters)
+    qs = apply_filters(spec, Property.objects.filter(broker=broker, status="active")).order_by("-created_at")
+    props = list(qs[:5])  # send up to 5
+    if not props:
         resp["texts"].append("⚠️ No matching properties found.")
         return resp
 
     sent_props = []
-    for prop in qs[:5]:  # send up to 5
+    for prop in props:
         text_msg = generate_property_message(prop, broker)
         # client.messages.create(
         #     from_=f"whatsapp:+14155238886",
@@ -1128,8 +1136,6 @@ def handle_share_all_to_client(broker, intent, msg=None):
             send_whatsapp_media(client_number, media.storage_url, media.media_type)
         sent_props.append(prop.property_id)
 
-        sent_props.append(prop.property_id)
-
     # ClientRequest.objects.create(
     #     broker=broker,
     #     query=msg,